@@ -8,7 +8,15 @@ from .lifespan_services import (
     shutdown_redis_client,
     init_httpx_client,
     shutdown_httpx_client,
-    load_all_handbooks
+    init_fias_services,
+    shutdown_fias_services,
+    load_all_handbooks,
+    start_handbooks_loading,
+    stop_handbooks_loading,
+    init_nsi_refresh_scheduler,
+    shutdown_nsi_refresh_scheduler,
+    init_handbooks_reload_subscriber,
+    shutdown_handbooks_reload_subscriber
 )
 
 
@@ -20,8 +28,16 @@ __all__ = [
     "handbooks_storage",
     "load_handbook",
     "load_all_handbooks",
+    "start_handbooks_loading",
+    "stop_handbooks_loading",
+    "init_nsi_refresh_scheduler",
+    "shutdown_nsi_refresh_scheduler",
+    "init_handbooks_reload_subscriber",
+    "shutdown_handbooks_reload_subscriber",
     "init_httpx_client",
     "shutdown_httpx_client",
+    "init_fias_services",
+    "shutdown_fias_services",
     "init_redis_client",
     "shutdown_redis_client",
     "get_redis_client",
@@ -0,0 +1,37 @@
+"""
+Атомарная запись файлов, которые одновременно пишут несколько воркеров (справочники, таблицы, кэши).
+
+Файл пишется во временный файл с уникальным именем в том же каталоге и подменяется через os.replace:
+читатель видит либо старый, либо новый файл целиком, а одновременные писатели не пишут в один временный файл.
+Модуль не зависит от остального app.core.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+# Права итогового файла (mkstemp создает файл только для владельца)
+FILE_MODE = 0o644
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = "wb", encoding: Optional[str] = None, fsync: bool = False) -> Iterator[IO]:
+    """Открывает временный файл рядом с path; при успешном выходе из блока он заменяет path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            os.fchmod(f.fileno(), FILE_MODE)
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
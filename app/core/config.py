@@ -33,15 +33,46 @@ class Settings(BaseSettings):
     REDIS_DB: int  # Номер базы - это число
     REDIS_COOKIES_KEY: str
     REDIS_COOKIES_TTL: int  # TTL - это число (секунды)
+    REDIS_SEARCH_ROWS_PREFIX: str = "search_row:"  # префикс ключей кэша строк поиска (searchData)
+    REDIS_SEARCH_ROWS_TTL: int = 900  # TTL строк поиска в кэше (секунды)
+    REDIS_EVENT_CACHE_PREFIX: str = "event:"  # префикс ключей кэша готовых ответов /get_event
+    REDIS_EVENT_CACHE_TTL: int = 0  # TTL кэша /get_event (секунды), 0 - кэш выключен
+    REDIS_HANDBOOKS_CHANNEL: str = "handbooks:reload"  # канал событий об обновлении справочников
+    REDIS_HANDBOOKS_PREFIX: str = "handbooks:"  # префикс ключей версий/подтверждений справочников
+
+    # === NSI Refresh ===
+    NSI_REFRESH_ENABLED: bool = True  # фоновое обновление справочников НСИ
+    NSI_REFRESH_INTERVAL: int = 6 * 3600  # период проверки (секунды)
+    NSI_REFRESH_MAX_AGE: int = 7 * 24 * 3600  # без проверки версии: обновлять, если файл старше (секунды)
+    # Адрес архива справочника НСИ с {code}: включает проверку версии (ETag/Last-Modified, sha256 архива)
+    NSI_ARCHIVE_URL: str = ""
+    NSI_REFRESH_INITIAL_DELAY: int = 300  # задержка первой проверки после старта (секунды)
 
     # === Local File Paths ===
     HANDBOOKS_DIR: str  # Можно оставить строкой или сделать Path
+    HANDBOOKS_LAZY: str = "gender,medical_care_profiles"  # справочники, загружаемые при первом обращении
+    HANDBOOKS_SHARED_MMAP: str = "medical_organizations"  # справочники, читаемые из общего для воркеров mmap
+    HANDBOOKS_BACKGROUND_LOAD: bool = True  # загружать справочники в фоне, не задерживая старт приложения
+    HANDBOOKS_READY_TIMEOUT: int = 60  # сколько запрос ждет окончания стартовой загрузки справочников (секунды)
+    ORG_NAME_MATCH_THRESHOLD: float = 0.8  # минимальное сходство названий МО для нечеткого поиска (0..1)
+    ORG_NAME_CACHE_SIZE: int = 4096  # сколько разрешенных названий МО хранить в кэше
     TEMP_DIR: str  # Можно оставить строкой или сделать Path
 
     # === Logging & Debugging ===
     LOGS_LEVEL: str
+    LOGS_ENQUEUE: bool = True  # писать логи через очередь в фоновом потоке, не блокируя запросы
+    LOGS_JSON: bool = True  # дополнительно писать logs/app.json (JSON-записи с request_id/event_id)
+    LOGS_DEBUG_RATE_LIMIT: int = 50  # максимум DEBUG-записей в секунду с одного места вызова, 0 - без ограничения
     DEBUG_HTTP: bool = False
     DEBUG_ROUTE: bool = False
+    TRACING_ENABLED: bool = True  # трассировка запросов (спаны шагов и внешних вызовов)
+    TRACING_BUFFER_SIZE: int = 200  # сколько последних трасс хранить в памяти воркера
+    TRACING_OTLP_FILE: str = ""  # файл для экспорта трасс в OTLP/JSON, пусто - без экспорта
+    TRACING_SERVICE_NAME: str = "gis_oms_web"  # service.name в экспортируемых трассах
+    PROFILING_TOKEN: str = ""  # токен для X-Profile-Token (профилирование запроса), пусто - выключено
+    PROFILING_DIR: str = ""  # каталог отчетов профилировщика, пусто - <TEMP_DIR>/profiles
+    PROFILING_MAX_REPORTS: int = 20  # сколько последних отчетов хранить
+    MEMORY_TRACEMALLOC_FRAMES: int = 10  # глубина стека tracemalloc при включении через /api/health/memory
 
     # === TFOMS XML Parameters ===
     MO_CODE_ERMO: str
@@ -49,6 +80,15 @@ class Settings(BaseSettings):
     # === FIAS API === 
     FIAS_API_BASE_URL: str
     FIAS_TOKEN_URL: str
+    FIAS_TOKEN_TTL: int = 3600  # сколько считаем токен ФИАС действующим (секунды)
+    FIAS_TOKEN_REFRESH_MARGIN: int = 60  # за сколько секунд до истечения обновлять токен
+    REDIS_FIAS_TOKEN_KEY: str = "fias:token"
+    FIAS_ADDRESS_CACHE_TTL: int = 30 * 24 * 3600  # TTL найденных адресов (секунды)
+    FIAS_ADDRESS_CACHE_NEGATIVE_TTL: int = 24 * 3600  # TTL адресов, которых нет в ФИАС (секунды)
+    FIAS_ADDRESS_CACHE_MEMORY_SIZE: int = 20000  # максимум записей кэша адресов в памяти воркера
+    REDIS_FIAS_ADDRESS_PREFIX: str = "fias:address:"
+    FIAS_RESOLVE_CONCURRENCY: int = 8  # одновременных запросов к ФИАС при разборе пачки адресов
+    FIAS_OFFLINE_INDEX_PATH: str = ""  # офлайн-индекс ОКАТО (по умолчанию HANDBOOKS_DIR/fias_okato_index.mmt)
 
     model_config = SettingsConfigDict(
         env_file=".env",  # Явно указываем путь к .env в корне проекта
@@ -6,6 +6,7 @@ from typing import Callable, Awaitable, Any, Type, Dict, TypeVar, ParamSpec
 from fastapi import HTTPException, status, Request
 
 from app.core import logger, get_settings
+from app.core.server_timing import record_timing
 
 settings = get_settings()
 
@@ -144,8 +145,13 @@ def route_handler(debug: bool = True, custom_errors: Dict[Type[Exception], int]
     Returns:
         Callable[..., Awaitable[Any]]: Обернутая функция.
 
+    Ставится ПОД декоратором роутера: FastAPI регистрирует то, что получил @router.*,
+    поэтому декоратор, стоящий выше, в обработку запроса не попадает.
+    Время выполнения роута добавляется в Server-Timing (метрика route).
+
     Example:
         ```python
+        @router.get("/my_route")
         @route_handler(debug=True, custom_errors={ValueError: 400})
         async def my_route(request: Request):
             raise ValueError("Неверные данные")
@@ -193,6 +199,7 @@ def route_handler(debug: bool = True, custom_errors: Dict[Type[Exception], int]
             try:
                 # Выполняем роут
                 result = await func(*args, **kwargs)
+                record_timing("route", time.perf_counter() - start_time, func_name)
                 duration = round(time.perf_counter() - start_time, 2)
                 # Логирование успешного выполнения
                 if debug:
@@ -203,11 +210,13 @@ def route_handler(debug: bool = True, custom_errors: Dict[Type[Exception], int]
 
             except HTTPException as e:
                 # Логируем HTTP-ошибки и пробрасываем дальше
+                record_timing("route", time.perf_counter() - start_time, func_name)
                 logger.warning(f"[ROUTE] {method} {route_path} — HTTP ошибка: {e.status_code} - {e.detail}")
                 raise
 
             except Exception as e:
                 # Обработка непредвиденных ошибок
+                record_timing("route", time.perf_counter() - start_time, func_name)
                 duration = round(time.perf_counter() - start_time, 2)
                 tb = traceback.extract_tb(e.__traceback__)
                 last_frame = tb[-1] if tb else None
@@ -1,14 +1,18 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Annotated, Optional
 import redis.asyncio as redis
-from fastapi import Request
+from fastapi import Header, Request, HTTPException, status
 
-from app.core import HTTPXClient
+from app.core import HTTPXClient, get_settings
 from app.core.handbooks import HandbooksStorage
+from app.core.profiling import is_valid_profile_token, profiling_enabled
 
 # Условный импорт для статического анализа и автодополнения
 if TYPE_CHECKING:
     from httpx import AsyncClient
 
+settings = get_settings()
+
+
 async def get_redis_client(request: Request) -> redis.Redis:
     """
     FastAPI зависимость для получения клиента Redis из app.state.
@@ -30,5 +34,22 @@ async def get_http_service(request: Request) -> HTTPXClient:
 async def get_handbooks_storage(request: Request) -> HandbooksStorage:
     """
     DI: отдаёт глобальный HandbooksStorage из app.state.
+    Пока идет стартовая загрузка справочников, ждет ее окончания (не дольше HANDBOOKS_READY_TIMEOUT).
     """
-    return request.app.state.handbooks_storage
\ No newline at end of file
+    storage: HandbooksStorage = request.app.state.handbooks_storage
+    if not storage.is_ready and not await storage.wait_ready(settings.HANDBOOKS_READY_TIMEOUT):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Справочники еще загружаются, повторите запрос позже"
+        )
+    return storage
+
+
+async def verify_profile_token(
+        x_profile_token: Annotated[Optional[str], Header(description="Токен профилирования (PROFILING_TOKEN)")] = None
+) -> None:
+    """DI: доступ к отчетам профилировщика только с верным X-Profile-Token; без PROFILING_TOKEN роуты выключены."""
+    if not profiling_enabled():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Профилирование выключено")
+    if not is_valid_profile_token(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Неверный токен профилирования")
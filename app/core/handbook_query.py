@@ -0,0 +1,217 @@
+"""
+Чтение справочников из текущего снимка: поиск по ключу, префиксный/подстрочный поиск по полям,
+курсорная пагинация и выбор полей. Снимок неизменяем, поэтому запросы идут без блокировок.
+
+Курсор - непрозрачная строка (версия справочника + смещение). Если справочник обновился между страницами,
+курсор устаревает (CursorExpiredError) и обход нужно начать заново.
+"""
+import base64
+import binascii
+import json
+from bisect import bisect_left
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from app.core.handbooks import (
+    HANDBOOK_INDEXES,
+    HANDBOOK_KEY_FIELDS,
+    HandbookSnapshot,
+    HandbooksStorage,
+    MmapHandbookPayload,
+    normalize_index_key,
+)
+
+MAX_PAGE_SIZE = 500
+MATCH_MODES = ("prefix", "contains")
+
+# Отсортированные значения индексированных полей для префиксного поиска:
+# (справочник, поле) -> (версия справочника, [(нормализованное значение, ключ записи)])
+_sorted_index_keys: Dict[Tuple[str, str], Tuple[float, List[Tuple[str, str]]]] = {}
+
+
+class CursorExpiredError(ValueError):
+    """Курсор выдан для другой версии справочника."""
+
+
+def _encode_cursor(stamp: float, offset: int) -> str:
+    raw = json.dumps({"v": stamp, "o": offset}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: Optional[str], stamp: float) -> int:
+    if not cursor:
+        return 0
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        version, offset = data["v"], int(data["o"])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise ValueError("Некорректный курсор")
+    if version != stamp:
+        raise CursorExpiredError("Справочник обновился, начните обход заново")
+    return max(offset, 0)
+
+
+def project(value: Any, fields: Optional[Sequence[str]]) -> Any:
+    """Оставляет в записи (или в каждой записи списка) только указанные поля."""
+    if not fields:
+        return value
+    if isinstance(value, list):
+        return [project(item, fields) for item in value]
+    if isinstance(value, Mapping):
+        return {field: value.get(field) for field in fields if field in value}
+    return value
+
+
+def _records(value: Any) -> List[Any]:
+    return value if isinstance(value, list) else [value]
+
+
+def _is_indexed(handbook_name: str, field: str) -> bool:
+    return field in HANDBOOK_INDEXES.get(handbook_name, {}).values()
+
+
+def _iter_items(payload: Mapping[str, Any]) -> Iterator[Tuple[str, Any]]:
+    if isinstance(payload, MmapHandbookPayload):
+        return ((key, payload[key]) for key in payload)
+    return iter(payload.items())
+
+
+def _get_sorted_index_keys(snapshot: HandbookSnapshot, handbook_name: str, field: str) -> List[Tuple[str, str]]:
+    """
+    Пары (нормализованное значение поля, ключ) по всем записям справочника, по возрастанию значения.
+    Индексы снимка хранят по значению только первую запись, поэтому для поиска пары строятся отдельно.
+    """
+    stamp = snapshot.updated_at.get(handbook_name)
+    cached = _sorted_index_keys.get((handbook_name, field))
+    if cached is None or cached[0] != stamp:
+        pairs = set()
+        for key, value in _iter_items(snapshot.payloads[handbook_name]):
+            for record in _records(value):
+                if isinstance(record, Mapping) and record.get(field) is not None:
+                    pairs.add((normalize_index_key(record.get(field)), key))
+        cached = (stamp, sorted(pairs))
+        _sorted_index_keys[(handbook_name, field)] = cached
+    return cached[1]
+
+
+def sorted_index_keys_count() -> int:
+    """Сколько пар (значение, ключ) хранится в кэше префиксного поиска (для /api/health/memory)."""
+    return sum(len(keys) for _, keys in _sorted_index_keys.values())
+
+
+def _matches(value: Any, needle: str, match: str) -> bool:
+    if value is None:
+        return False
+    normalized = normalize_index_key(value)
+    return normalized.startswith(needle) if match == "prefix" else needle in normalized
+
+
+def _iter_matches(snapshot: HandbookSnapshot, handbook_name: str, payload: Mapping[str, Any],
+                  field: Optional[str], needle: str, match: str) -> Iterator[Tuple[str, Any]]:
+    """(ключ, значение) записей справочника, подходящих под условие поиска."""
+    key_field = HANDBOOK_KEY_FIELDS.get(handbook_name)
+    if field is None or field == key_field:
+        # Поиск по ключам справочника
+        for key in payload:
+            if _matches(key, needle, match):
+                yield key, payload[key]
+        return
+
+    if match == "prefix" and _is_indexed(handbook_name, field):
+        # Поле с индексом - двоичный поиск по отсортированным значениям (результаты по возрастанию значения)
+        pairs = _get_sorted_index_keys(snapshot, handbook_name, field)
+        position = bisect_left(pairs, (needle,))
+        seen = set()
+        while position < len(pairs) and pairs[position][0].startswith(needle):
+            key = pairs[position][1]
+            if key not in seen:
+                seen.add(key)
+                yield key, payload[key]
+            position += 1
+        return
+
+    # Поле без индекса и поиск подстроки - последовательный просмотр записей
+    for key, value in _iter_items(payload):
+        if any(isinstance(record, Mapping) and _matches(record.get(field), needle, match) for record in _records(value)):
+            yield key, value
+
+
+def query_handbook(
+        snapshot: HandbookSnapshot,
+        handbook_name: str,
+        q: Optional[str] = None,
+        field: Optional[str] = None,
+        match: str = "contains",
+        fields: Optional[Sequence[str]] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+) -> Dict[str, Any]:
+    """
+    Страница записей справочника.
+    Args:
+        q: строка поиска (без учета регистра и лишних пробелов); без q - все записи по порядку.
+        field: поле поиска; без него (или ключевое поле) - поиск по ключам справочника.
+               Для полей с индексом (nsi_handbooks_mapper "indexes") префиксный поиск идет по отсортированным
+               значениям, остальные - просмотром записей; набор найденных записей от индекса не зависит.
+        match: "prefix" или "contains".
+        fields: какие поля записей вернуть (по умолчанию все).
+    Raises:
+        KeyError: справочника нет в снимке. ValueError/CursorExpiredError: неверные параметры/курсор.
+    """
+    payload = snapshot.payloads.get(handbook_name)
+    if not isinstance(payload, Mapping):
+        raise KeyError(handbook_name)
+    if match not in MATCH_MODES:
+        raise ValueError(f"match должен быть одним из: {', '.join(MATCH_MODES)}")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stamp = snapshot.updated_at.get(handbook_name)
+    offset = _decode_cursor(cursor, stamp)
+
+    if q:
+        matched = _iter_matches(snapshot, handbook_name, payload, field, normalize_index_key(q), match)
+    else:
+        # Без поиска значения декодируются только для ключей текущей страницы
+        matched = ((key, None) for key in payload)
+    page = list(islice(matched, offset, offset + limit + 1))
+    has_more = len(page) > limit
+    items = [
+        {"key": key, "data": project(payload.get(key) if value is None else value, fields)}
+        for key, value in page[:limit]
+    ]
+    return {
+        "handbook": handbook_name,
+        "total": None if q else len(payload),
+        "items": items,
+        "next_cursor": _encode_cursor(stamp, offset + limit) if has_more else None,
+    }
+
+
+def get_handbook_record(snapshot: HandbookSnapshot, handbook_name: str, key: str,
+                        fields: Optional[Sequence[str]] = None) -> Optional[Any]:
+    """Запись (или список записей) справочника по ключу."""
+    payload = snapshot.payloads.get(handbook_name)
+    if not isinstance(payload, Mapping):
+        raise KeyError(handbook_name)
+    value = payload.get(key)
+    return None if value is None else project(value, fields)
+
+
+def handbook_summary(handbooks_storage: HandbooksStorage, handbook_name: str) -> Dict[str, Any]:
+    """Краткие сведения о справочнике вместо его содержимого (для ответов роутов обновления)."""
+    snapshot = handbooks_storage.snapshot
+    payload = snapshot.payloads.get(handbook_name)
+    return {
+        "handbook": handbook_name,
+        "records": len(payload) if isinstance(payload, Mapping) else None,
+        "indexes": {name: len(index) for name, index in snapshot.indexes.get(handbook_name, {}).items()},
+        "snapshot_version": snapshot.version,
+        "updated_at": snapshot.updated_at.get(handbook_name),
+    }
+
+
+def handbooks_overview(handbooks_storage: HandbooksStorage, expected: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Список справочников с состоянием загрузки и размером."""
+    return [
+        {**handbook_summary(handbooks_storage, name), "status": state}
+        for name, state in handbooks_storage.status(expected).items()
+    ]
@@ -1,26 +1,671 @@
+import asyncio
 import json
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterator, List, Mapping, MutableMapping, Optional, Tuple
 
-import aiofiles
+import msgpack
 
 from app.core import logger, get_settings
+from app.core.mappings import nsi_handbooks_mapper
+from app.core.mmap_table import MmapTable, write_table
+from app.core.server_timing import timed
 
 settings = get_settings()
 HANDBOOKS_DIR = Path(settings.HANDBOOKS_DIR)
 
+# Бинарный формат справочника: таблица MmapTable "ключ записи -> msgpack", рядом с JSON-файлом
+HANDBOOK_TABLE_SUFFIX = ".mmt"
+HANDBOOK_TABLE_FORMAT = 1
+
+# Индексы справочников: storage_key -> {имя_индекса: поле записи}
+HANDBOOK_INDEXES: Dict[str, Dict[str, str]] = {
+    details["handbook_storage_key"]: details.get("indexes", {})
+    for details in nsi_handbooks_mapper.values()
+}
+# Ключевые поля справочников (по ним сгруппированы записи в 'data'): storage_key -> поле
+HANDBOOK_KEY_FIELDS: Dict[str, str] = {
+    details["handbook_storage_key"]: details["key_field"]
+    for details in nsi_handbooks_mapper.values()
+}
+# Проекции справочников: storage_key -> поля записей, которые остаются в памяти (только для справочников с "fields"
+# в маппере; ключевое поле и поля индексов входят всегда). Полные записи остаются в JSON-файле на диске.
+HANDBOOK_PROJECTIONS: Dict[str, Tuple[str, ...]] = {
+    details["handbook_storage_key"]: tuple(dict.fromkeys(
+        [details["key_field"], *details.get("indexes", {}).values(), *details["fields"]]
+    ))
+    for details in nsi_handbooks_mapper.values()
+    if "fields" in details
+}
+# Справочники, которые читаются прямо из mmap-таблицы, без построения словаря в памяти каждого воркера
+SHARED_HANDBOOKS = frozenset(name.strip() for name in settings.HANDBOOKS_SHARED_MMAP.split(",") if name.strip())
+
+
+def normalize_index_key(value: Any) -> str:
+    """Ключ индекса: строка без лишних пробелов и без учета регистра."""
+    return " ".join(str(value).split()).casefold()
+
+
+def _extract_payload(content: Any) -> Any:
+    """Полезная нагрузка справочника: значение 'data', если оно есть, иначе содержимое как есть."""
+    if isinstance(content, dict) and "data" in content:
+        return content["data"]
+    return content
+
+
+class HandbookRecord(Mapping):
+    """
+    Компактная запись справочника: только поля проекции, хранятся в __slots__ (без словаря на каждую запись).
+    Ведет себя как неизменяемый словарь (get, [], in, items), поэтому код обогащения работает с ней как раньше.
+    Конкретные классы создает record_type().
+    """
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+    _field_set: frozenset = frozenset()
+
+    def __init__(self, source: Mapping[str, Any]):
+        for field in self._fields:
+            object.__setattr__(self, field, source.get(field))
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._field_set:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._field_set:
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._field_set
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} неизменяема")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+_record_types: Dict[str, type] = {}
+
+
+def record_type(handbook_name: str) -> Optional[type]:
+    """Класс компактных записей справочника или None, если проекция для него не задана."""
+    fields = HANDBOOK_PROJECTIONS.get(handbook_name)
+    if fields is None:
+        return None
+    cls = _record_types.get(handbook_name)
+    if cls is None:
+        invalid = [field for field in fields if not field.isidentifier()]
+        if invalid:
+            raise ValueError(f"Поля проекции справочника {handbook_name} не являются идентификаторами: {invalid}")
+        cls = type(f"{handbook_name}_record", (HandbookRecord,),
+                   {"__slots__": fields, "_fields": fields, "_field_set": frozenset(fields)})
+        _record_types[handbook_name] = cls
+    return cls
+
+
+def _map_records(value: Any, convert: Callable[[Mapping[str, Any]], Any]) -> Any:
+    if isinstance(value, list):
+        return [convert(item) if isinstance(item, Mapping) else item for item in value]
+    return convert(value) if isinstance(value, Mapping) else value
+
+
+def _projected_dict(fields: Tuple[str, ...]) -> Callable[[Mapping[str, Any]], Dict[str, Any]]:
+    return lambda record: {field: record.get(field) for field in fields if field in record}
+
+
+def project_handbook(handbook_name: str, handbook: Any) -> Any:
+    """
+    Справочник в памяти: записи заменяются компактными HandbookRecord с полями проекции.
+    Справочники без проекции и mmap-представления возвращаются как есть.
+    """
+    cls = record_type(handbook_name)
+    if cls is None:
+        return handbook
+    payload = _extract_payload(handbook)
+    if not isinstance(payload, dict):
+        return handbook
+    projected = {key: _map_records(value, cls) for key, value in payload.items()}
+    if isinstance(handbook, dict) and "data" in handbook:
+        return {**handbook, "data": projected}
+    return projected
+
+
+class MmapHandbookPayload(Mapping):
+    """
+    Записи справочника прямо из mmap-таблицы (см. write_handbook_table): значение декодируется при обращении,
+    словарь всех записей не строится. Страницы файла общие для всех воркеров (страничный кэш ОС),
+    поэтому память воркера почти не зависит от размера справочника.
+    """
+
+    def __init__(self, table: MmapTable):
+        self._table = table
+
+    def __getitem__(self, key: str) -> Any:
+        return msgpack.unpackb(self._table[key])
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._table
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def iter_decoded(self) -> Iterator[Any]:
+        """Последовательный обход декодированных значений (быстрее, чем values())."""
+        for _, raw in self._table.iter_items():
+            yield msgpack.unpackb(raw)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._table.size_bytes
+
+
+class _KeyFieldIndex:
+    """
+    Индекс по ключевому полю mmap-справочника: поиск идет по ключам самой таблицы, копия записей в памяти не нужна.
+    Как и словарные индексы, без учета регистра и лишних пробелов: в памяти хранятся только ключи,
+    которые от нормализации меняются (нормализованный ключ -> ключ таблицы).
+    """
+    __slots__ = ("_payload", "_aliases")
+
+    def __init__(self, payload: MmapHandbookPayload):
+        self._payload = payload
+        aliases: Dict[str, str] = {}
+        for key in payload:
+            normalized = normalize_index_key(key)
+            if normalized != key:
+                aliases.setdefault(normalized, key)
+        self._aliases = aliases
+
+    def record(self, key: Any) -> Optional[Mapping[str, Any]]:
+        normalized = normalize_index_key(key)
+        records = self._payload.get(self._aliases.get(normalized, normalized))
+        if isinstance(records, list):
+            return records[0] if records else None
+        return records
+
+    def __len__(self) -> int:
+        return len(self._payload)
+
+
+def iter_handbook_records(payload: Any) -> Iterator[Mapping[str, Any]]:
+    """Все записи справочника (значения payload - записи или списки записей)."""
+    if not isinstance(payload, Mapping):
+        return
+    values = payload.iter_decoded() if isinstance(payload, MmapHandbookPayload) else payload.values()
+    for records in values:
+        for record in (records if isinstance(records, list) else [records]):
+            if isinstance(record, Mapping):
+                yield record
+
+
+def _build_indexes(payload: Any, index_fields: Mapping[str, str], key_field: Optional[str] = None) -> Dict[str, Any]:
+    """Строит индексы "значение поля -> первая запись" по записям справочника (значения payload - списки записей)."""
+    indexes: Dict[str, Any] = {index_name: {} for index_name in index_fields}
+    if not index_fields or not isinstance(payload, Mapping):
+        return {name: MappingProxyType(index) for name, index in indexes.items()}
+
+    if isinstance(payload, MmapHandbookPayload):
+        # Индексы по ключевому полю - это сама таблица; остальные строятся декодированием записей
+        for index_name, field in index_fields.items():
+            if field == key_field:
+                indexes[index_name] = _KeyFieldIndex(payload)
+        index_fields = {name: field for name, field in index_fields.items() if field != key_field}
+        if not index_fields:
+            return indexes
+
+    for record in iter_handbook_records(payload):
+        for index_name, field in index_fields.items():
+            value = record.get(field)
+            if value is not None:
+                indexes[index_name].setdefault(normalize_index_key(value), record)
+    return {
+        name: index if isinstance(index, _KeyFieldIndex) else MappingProxyType(index)
+        for name, index in indexes.items()
+    }
+
+
+# Payload справочника и его индексы, готовые к публикации в снимке
+PreparedHandbook = Tuple[Any, Mapping[str, Mapping[str, Any]]]
+
+
+def prepare_handbook(handbook_name: str, content: Any) -> PreparedHandbook:
+    """Извлекает payload справочника и строит его индексы. Синхронно, для больших справочников - вне цикла событий."""
+    payload = _extract_payload(content)
+    indexes = _build_indexes(payload, HANDBOOK_INDEXES.get(handbook_name, {}), HANDBOOK_KEY_FIELDS.get(handbook_name))
+    return payload, MappingProxyType(indexes)
+
+
+class HandbookSnapshot:
+    """
+    Неизменяемый снимок всех справочников с заранее построенными индексами.
+    Снимок никогда не меняется после создания: обновление справочника = новый снимок.
+    """
+    __slots__ = ("version", "created_at", "updated_at", "handbooks", "payloads", "indexes")
+
+    def __init__(self, handbooks: Mapping[str, Any], version: int, updated_at: Optional[Mapping[str, float]] = None,
+                 prepared: Optional[Mapping[str, PreparedHandbook]] = None):
+        self.version = version
+        self.created_at = time.time()
+        # Когда каждый справочник последний раз публиковался (для сравнения с файлами на диске)
+        self.updated_at: Mapping[str, float] = MappingProxyType({
+            name: (updated_at or {}).get(name, self.created_at) for name in handbooks
+        })
+        self.handbooks: Mapping[str, Any] = MappingProxyType(dict(handbooks))
+        # Готовые payload и индексы (неизменившиеся справочники прошлого снимка, собранные вне цикла событий)
+        # берутся как есть, строятся только недостающие
+        prepared = prepared or {}
+        built = {
+            name: prepared[name] if name in prepared else prepare_handbook(name, content)
+            for name, content in self.handbooks.items()
+        }
+        self.payloads: Mapping[str, Any] = MappingProxyType({name: item[0] for name, item in built.items()})
+        self.indexes: Mapping[str, Mapping[str, Mapping[str, Any]]] = MappingProxyType(
+            {name: item[1] for name, item in built.items()}
+        )
+
+    def prepared(self, handbook_name: str) -> PreparedHandbook:
+        """Payload и индексы справочника этого снимка (для переноса в следующий снимок без перестроения)."""
+        return self.payloads[handbook_name], self.indexes[handbook_name]
+
+    def lookup(self, handbook_name: str, index_name: str, key: Any) -> Optional[Mapping[str, Any]]:
+        """Запись справочника по значению индексированного поля или None."""
+        if key is None:
+            return None
+        index = self.indexes.get(handbook_name, {}).get(index_name)
+        if index is None:
+            return None
+        if isinstance(index, _KeyFieldIndex):
+            return index.record(key)
+        return index.get(normalize_index_key(key))
+
+
+class _HandbooksView(MutableMapping):
+    """
+    Совместимый с прежним API словарь справочников текущего снимка (устарел: в новом коде - snapshot,
+    get_payload/lookup и await ensure_loaded).
+    Запись (storage.handbooks[name] = data) не меняет снимок, а публикует новый.
+    Чтение незагруженного ленивого справочника из асинхронного кода - ошибка (см. ensure_loaded_sync).
+    """
+
+    def __init__(self, storage: "HandbooksStorage"):
+        self._storage = storage
+
+    def __getitem__(self, key: str) -> Any:
+        return self._storage.ensure_loaded_sync(key).handbooks[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._storage.replace({key: value})
+
+    def __delitem__(self, key: str) -> None:
+        self._storage.replace({}, remove=[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._storage.snapshot.handbooks)
+
+    def __len__(self) -> int:
+        return len(self._storage.snapshot.handbooks)
+
 
 class HandbooksStorage:
-    """ Хранилище справочников, доступные глобально"""
-    handbooks: Dict[str, Dict[str, Any]] = {}
+    """
+    Хранилище справочников, доступные глобально.
+    Читатели работают с текущим неизменяемым снимком (без блокировок),
+    обновления собирают новый снимок и атомарно подменяют ссылку на него.
+    Редко используемые справочники могут быть "ленивыми": загружаются при первом обращении (в пуле потоков).
+    """
+
+    def __init__(self):
+        self._snapshot = HandbookSnapshot({}, version=0)
+        self._write_lock = threading.Lock()
+        self._lazy_loaders: Dict[str, Callable[[], Any]] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self._ready = asyncio.Event()
+        self._listeners: List[Tuple[frozenset, Callable[[HandbookSnapshot], None]]] = []
+
+    @property
+    def snapshot(self) -> HandbookSnapshot:
+        return self._snapshot
+
+    @property
+    def handbooks(self) -> MutableMapping[str, Any]:
+        return _HandbooksView(self)
+
+    def replace(self, updates: Mapping[str, Any], remove: Optional[list] = None) -> HandbookSnapshot:
+        """
+        Публикует новый снимок: текущие справочники + updates (без remove).
+        Индексы строятся только для updates и в вызывающем потоке; из цикла событий используйте replace_async.
+        """
+        prepared = {name: prepare_handbook(name, content) for name, content in updates.items()}
+        return self._publish(updates, remove, prepared)
+
+    async def replace_async(self, updates: Mapping[str, Any], remove: Optional[list] = None) -> HandbookSnapshot:
+        """Как replace, но индексы обновленных справочников строятся в пуле потоков; в цикле только подмена снимка."""
+        prepared = await asyncio.to_thread(
+            lambda: {name: prepare_handbook(name, content) for name, content in updates.items()}
+        )
+        return self._publish(updates, remove, prepared)
+
+    def _publish(self, updates: Mapping[str, Any], remove: Optional[list],
+                 prepared: Mapping[str, PreparedHandbook]) -> HandbookSnapshot:
+        with self._write_lock:
+            current = self._snapshot
+            handbooks = {**current.handbooks, **updates}
+            for name in remove or []:
+                handbooks.pop(name, None)
+            # Неизменившиеся справочники переходят в новый снимок вместе с уже построенными индексами
+            carried = {name: current.prepared(name) for name in handbooks if name not in updates}
+            new_snapshot = HandbookSnapshot(
+                handbooks,
+                version=current.version + 1,
+                updated_at={name: ts for name, ts in current.updated_at.items() if name not in updates},
+                prepared={**carried, **prepared},
+            )
+            self._snapshot = new_snapshot
+            for name in updates:
+                self._lazy_loaders.pop(name, None)
+        logger.info(
+            f"Справочники: опубликован снимок v{new_snapshot.version} "
+            f"(обновлены: {', '.join(updates) or '-'}; всего: {len(new_snapshot.handbooks)})"
+        )
+        changed = set(updates) | set(remove or [])
+        for handbook_names, callback in self._listeners:
+            if changed & handbook_names:
+                try:
+                    callback(new_snapshot)
+                except Exception as e:
+                    logger.error(f"Справочники: ошибка обработчика обновления снимка v{new_snapshot.version}: {e}")
+        return new_snapshot
+
+    def add_listener(self, handbook_names: List[str], callback: Callable[[HandbookSnapshot], None]) -> None:
+        """
+        Вызывает callback(снимок) после публикации снимка, в котором изменился любой из handbook_names.
+        Обработчик вызывается синхронно, тяжелую работу он должен сам уносить в фон.
+        """
+        self._listeners.append((frozenset(handbook_names), callback))
+
+    def register_lazy(self, handbook_name: str, loader: Callable[[], Any]) -> None:
+        """Регистрирует синхронный загрузчик справочника, который будет вызван при первом обращении к нему."""
+        self._lazy_loaders[handbook_name] = loader
+
+    async def ensure_loaded(self, handbook_name: str) -> HandbookSnapshot:
+        """
+        Возвращает снимок, в котором загружен справочник (если для него есть ленивый загрузчик).
+        Загрузчик выполняется в пуле потоков; параллельные первые обращения ждут одну загрузку.
+        """
+        snapshot = self._snapshot
+        if handbook_name in snapshot.handbooks or handbook_name not in self._lazy_loaders:
+            return snapshot
+        async with self._load_locks.setdefault(handbook_name, asyncio.Lock()):
+            loader = self._lazy_loaders.get(handbook_name)
+            if loader is None:  # уже загружен параллельным обращением
+                return self._snapshot
+            logger.info(f"Справочник '{handbook_name}': загрузка по первому обращению")
+            try:
+                data = await asyncio.to_thread(loader)
+            except (OSError, ValueError, TypeError) as e:
+                logger.error(f"Не удалось загрузить ленивый справочник '{handbook_name}': {e}")
+                return self._snapshot
+            return await self.replace_async({handbook_name: data})
+
+    def ensure_loaded_sync(self, handbook_name: str) -> HandbookSnapshot:
+        """
+        Синхронный вариант ensure_loaded для кода вне цикла событий (словарь handbooks).
+        Raises:
+            RuntimeError: справочник нужно загрузить, а вызов идет из потока с работающим циклом событий.
+        """
+        snapshot = self._snapshot
+        if handbook_name in snapshot.handbooks or handbook_name not in self._lazy_loaders:
+            return snapshot
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                f"Справочник '{handbook_name}' еще не загружен: в асинхронном коде используйте "
+                f"await handbooks_storage.ensure_loaded('{handbook_name}')"
+            )
+        with self._write_lock:
+            loader = self._lazy_loaders.get(handbook_name)
+        if loader is None:  # уже загружен параллельным обращением
+            return self._snapshot
+        logger.info(f"Справочник '{handbook_name}': загрузка по первому обращению")
+        try:
+            data = loader()
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Не удалось загрузить ленивый справочник '{handbook_name}': {e}")
+            return self._snapshot
+        return self.replace({handbook_name: data})
+
+    async def get_payload(self, handbook_name: str) -> Optional[Any]:
+        with timed("handbooks", "handbook lookups"):
+            return (await self.ensure_loaded(handbook_name)).payloads.get(handbook_name)
+
+    async def lookup(self, handbook_name: str, index_name: str, key: Any) -> Optional[Mapping[str, Any]]:
+        with timed("handbooks", "handbook lookups"):
+            return (await self.ensure_loaded(handbook_name)).lookup(handbook_name, index_name, key)
+
+    def status(self, expected: Optional[List[str]] = None) -> Dict[str, str]:
+        """Состояние справочников: "hot" - в памяти, "lazy" - загрузится при обращении, "missing" - нет."""
+        snapshot = self._snapshot
+        names = set(snapshot.handbooks) | set(self._lazy_loaders) | set(expected or [])
+        return {
+            name: "hot" if name in snapshot.handbooks else "lazy" if name in self._lazy_loaders else "missing"
+            for name in sorted(names)
+        }
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def mark_ready(self) -> None:
+        self._ready.set()
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Ждет окончания стартовой загрузки справочников. Возвращает False по таймауту."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
 
 
 handbooks_storage = HandbooksStorage()
 
 
+def handbook_table_path(handbook_name: str) -> Path:
+    return HANDBOOKS_DIR / f"{handbook_name}{HANDBOOK_TABLE_SUFFIX}"
+
+
+def _split_handbook(handbook: Any) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+    """
+    Раскладывает справочник на (вид, записи, остальные поля) для записи в таблицу.
+    Виды: "data" - {'data': {...}, ...прочее}, "dict" - плоский словарь, "list" - список записей.
+    """
+    if isinstance(handbook, dict) and isinstance(handbook.get("data"), dict):
+        rest = {key: value for key, value in handbook.items() if key != "data"}
+        return "data", handbook["data"], rest
+    if isinstance(handbook, dict):
+        return "dict", handbook, {}
+    if isinstance(handbook, list):
+        return "list", {f"{i:010d}": item for i, item in enumerate(handbook)}, {}
+    raise TypeError(f"Неподдерживаемый тип справочника: {type(handbook)}")
+
+
+def write_handbook_table(handbook_name: str, handbook: Any) -> int:
+    """
+    Синхронно и атомарно записывает справочник в бинарную таблицу HANDBOOKS_DIR/<имя>.mmt.
+    Для справочников с проекцией в таблицу попадают только поля проекции (полные записи - в JSON).
+    Возвращает количество записей.
+    """
+    kind, entries, rest = _split_handbook(handbook)
+    fields = HANDBOOK_PROJECTIONS.get(handbook_name)
+    meta = msgpack.packb({"format": HANDBOOK_TABLE_FORMAT, "kind": kind, "rest": rest,
+                          "fields": list(fields) if fields is not None else None})
+    to_stored = _projected_dict(fields) if fields is not None else None
+    return write_table(
+        handbook_table_path(handbook_name),
+        ((str(key), msgpack.packb(_map_records(value, to_stored) if to_stored else value))
+         for key, value in entries.items()),
+        meta=meta,
+    )
+
+
+def _read_table_meta(table: MmapTable, path: Path) -> Dict[str, Any]:
+    meta = msgpack.unpackb(table.meta)
+    if meta.get("format") != HANDBOOK_TABLE_FORMAT:
+        raise ValueError(f"Неизвестная версия формата справочника в {path}: {meta.get('format')}")
+    fields = HANDBOOK_PROJECTIONS.get(path.stem)
+    if meta.get("fields") != (list(fields) if fields is not None else None):
+        raise ValueError(f"Проекция справочника в {path} не совпадает с текущей, таблица будет пересобрана")
+    return meta
+
+
+def read_handbook_table(path: Path) -> Any:
+    """Синхронно читает справочник из бинарной таблицы (через mmap) в исходном виде."""
+    table = MmapTable(path)
+    try:
+        meta = _read_table_meta(table, path)
+        entries = {key: msgpack.unpackb(value) for key, value in table.iter_items()}
+    finally:
+        table.close()
+
+    kind = meta.get("kind")
+    if kind == "data":
+        return {**meta.get("rest", {}), "data": entries}
+    if kind == "list":
+        return list(entries.values())
+    return entries
+
+
+def open_handbook_table(path: Path) -> Any:
+    """
+    Открывает справочник из бинарной таблицы без декодирования записей: 'data' (или сам справочник)
+    становится MmapHandbookPayload. Таблица остается открытой, пока на нее ссылается снимок.
+    """
+    table = MmapTable(path)
+    try:
+        meta = _read_table_meta(table, path)
+    except (ValueError, TypeError, msgpack.UnpackException):
+        table.close()
+        raise
+
+    kind = meta.get("kind")
+    if kind == "list":
+        table.close()
+        return read_handbook_table(path)
+    payload = MmapHandbookPayload(table)
+    if kind == "data":
+        return {**meta.get("rest", {}), "data": payload}
+    return payload
+
+
+def _table_is_fresh(table_path: Path, handbook_path: Path) -> bool:
+    """Бинарная таблица есть и не старше JSON-файла."""
+    try:
+        return table_path.stat().st_mtime >= handbook_path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def read_handbook(handbook_name: str) -> Any:
+    """
+    Синхронно читает справочник из HANDBOOKS_DIR.
+    Сначала читается бинарная таблица <имя>.mmt (если она не старше JSON-файла),
+    иначе - <имя>.json; после чтения JSON таблица создается, чтобы следующий старт был быстрым.
+    Справочники из SHARED_HANDBOOKS не декодируются, а открываются через mmap (см. open_handbook_table),
+    записи остальных справочников с проекцией становятся компактными HandbookRecord (см. project_handbook).
+    Raises:
+        FileNotFoundError: если файл не найден.
+        json.JSONDecodeError: если JSON некорректен.
+    """
+    handbook_path = HANDBOOKS_DIR / f"{handbook_name}.json"
+    table_path = handbook_table_path(handbook_name)
+    shared = handbook_name in SHARED_HANDBOOKS
+    table_rejected = False
+
+    try:
+        table_mtime = table_path.stat().st_mtime
+        json_mtime = handbook_path.stat().st_mtime if handbook_path.exists() else 0.0
+        if table_mtime >= json_mtime:
+            handbook = open_handbook_table(table_path) if shared else project_handbook(
+                handbook_name, read_handbook_table(table_path)
+            )
+            logger.info(f"Handbook {handbook_name} loaded successfully (binary{', shared mmap' if shared else ''})")
+            return handbook
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, TypeError, msgpack.UnpackException) as e:
+        logger.warning(f"Бинарный справочник {table_path.name} не прочитан ({e}), используется JSON.")
+        table_rejected = True
+
+    with open(handbook_path, mode="r", encoding="utf-8") as file:
+        handbook = json.loads(file.read())
+    logger.info(f"Handbook {handbook_name} loaded successfully")
+
+    try:
+        # При старте JSON разбирают все воркеры: если пока шел разбор таблицу уже записал другой, не переписываем ее
+        if table_rejected or not _table_is_fresh(table_path, handbook_path):
+            write_handbook_table(handbook_name, handbook)
+        if shared:
+            return open_handbook_table(table_path)
+    except (OSError, TypeError) as e:
+        logger.warning(f"Не удалось создать бинарную копию справочника {handbook_name}: {e}")
+    return project_handbook(handbook_name, handbook)
+
+
+async def to_storage_form(handbook_name: str, handbook: Any) -> Any:
+    """
+    Готовит только что синхронизированный справочник к публикации в HandbooksStorage:
+    справочники из SHARED_HANDBOOKS записываются в таблицу и публикуются как mmap-представление,
+    у остальных записи проецируются (см. project_handbook).
+    """
+    if handbook_name not in SHARED_HANDBOOKS:
+        if handbook_name not in HANDBOOK_PROJECTIONS:
+            return handbook
+        return await asyncio.to_thread(project_handbook, handbook_name, handbook)
+
+    def _write_and_open() -> Any:
+        write_handbook_table(handbook_name, handbook)
+        return open_handbook_table(handbook_table_path(handbook_name))
+
+    return await asyncio.to_thread(_write_and_open)
+
+
+def handbook_file_exists(handbook_name: str) -> bool:
+    return handbook_table_path(handbook_name).exists() or (HANDBOOKS_DIR / f"{handbook_name}.json").exists()
+
+
+def handbook_file_mtime(handbook_name: str) -> Optional[float]:
+    """Время изменения самого свежего файла справочника (.mmt или .json) или None, если файлов нет."""
+    mtimes = [
+        path.stat().st_mtime
+        for path in (handbook_table_path(handbook_name), HANDBOOKS_DIR / f"{handbook_name}.json")
+        if path.exists()
+    ]
+    return max(mtimes) if mtimes else None
+
+
 async def load_handbook(handbook_name: str) -> Dict[str, Any]:
     """
-    Асинхронно загружает указанный справочник из директории HANDBOOKS_DIR.
+    Асинхронно загружает указанный справочник из директории HANDBOOKS_DIR (см. read_handbook).
+    Чтение и разбор выполняются в пуле потоков и не блокируют event loop,
+    поэтому несколько справочников можно загружать параллельно.
     Args:
         handbook_name (str): Название справочника (без расширения, например, "referred_by").
     Returns:
@@ -29,13 +674,4 @@ async def load_handbook(handbook_name: str) -> Dict[str, Any]:
         FileNotFoundError: если файл не найден (обработка у вызывающего).
         json.JSONDecodeError: если JSON некорректен (обработка у вызывающего).
     """
-    handbook_path = HANDBOOKS_DIR / f"{handbook_name}.json"
-    async with aiofiles.open(handbook_path, mode="r", encoding="utf-8") as file:
-        content = await file.read()
-        handbook = json.loads(content)
-    logger.info(f"Handbook {handbook_name} loaded successfully")
-    return handbook
-
-
-
-
+    return await asyncio.to_thread(read_handbook, handbook_name)
@@ -0,0 +1,177 @@
+"""
+Согласованное обновление справочников во всех воркерах через Redis pub/sub.
+
+Воркер, обновивший справочник (роут или планировщик НСИ), увеличивает его версию (INCR
+<префикс>version:<имя>) и публикует событие {handbook, version, origin} в канал REDIS_HANDBOOKS_CHANNEL.
+Остальные воркеры в фоне перечитывают справочник с диска (файлы уже записаны обновившим воркером),
+атомарно подменяют его в HandbooksStorage и подтверждают версию в хэше <префикс>ack:<имя> (воркер -> версия).
+Pub/sub не хранит сообщения, поэтому после (пере)подключения воркер сверяет версии и догружает пропущенное.
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.core import get_settings, logger
+from app.core.handbooks import HandbooksStorage, read_handbook
+
+settings = get_settings()
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _version_key(handbook_name: str) -> str:
+    return f"{settings.REDIS_HANDBOOKS_PREFIX}version:{handbook_name}"
+
+
+def _ack_key(handbook_name: str) -> str:
+    return f"{settings.REDIS_HANDBOOKS_PREFIX}ack:{handbook_name}"
+
+
+async def publish_handbook_refresh(redis_client: Optional[redis.Redis], handbook_name: str) -> Optional[int]:
+    """
+    Сообщает остальным воркерам, что справочник обновлен (файл на диске и память этого воркера уже актуальны).
+    Возвращает новую версию справочника или None, если Redis недоступен.
+    """
+    if redis_client is None:
+        return None
+    try:
+        version = int(await redis_client.incr(_version_key(handbook_name)))
+        await redis_client.hset(_ack_key(handbook_name), WORKER_ID, version)
+        message = json.dumps({"handbook": handbook_name, "version": version, "origin": WORKER_ID})
+        receivers = await redis_client.publish(settings.REDIS_HANDBOOKS_CHANNEL, message)
+        handbook_reload_subscriber.versions[handbook_name] = version
+        logger.info(f"Справочник '{handbook_name}' v{version}: событие обновления отправлено ({receivers} получателей)")
+        return version
+    except RedisError as e:
+        logger.error(f"Не удалось опубликовать обновление справочника '{handbook_name}': {e}")
+        return None
+
+
+async def get_handbook_acks(redis_client: redis.Redis, handbook_names: Iterable[str]) -> Dict[str, Any]:
+    """Текущая версия каждого справочника и подтвержденные воркерами версии."""
+    result = {}
+    for name in handbook_names:
+        version = await redis_client.get(_version_key(name))
+        acks = await redis_client.hgetall(_ack_key(name))
+        result[name] = {
+            "version": int(version) if version is not None else 0,
+            "acks": {worker.decode(): int(acked) for worker, acked in acks.items()},
+        }
+    return result
+
+
+class HandbookReloadSubscriber:
+    """Фоновый подписчик канала обновлений справочников."""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.versions: Dict[str, int] = {}
+        self.last_reload: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, redis_client: redis.Redis, handbooks_storage: HandbooksStorage) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(redis_client, handbooks_storage))
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _reload(self, redis_client: redis.Redis, handbooks_storage: HandbooksStorage,
+                      handbook_name: str, version: int) -> None:
+        if self.versions.get(handbook_name, 0) >= version:
+            return
+        started = time.perf_counter()
+        try:
+            data = await asyncio.to_thread(read_handbook, handbook_name)
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Справочник '{handbook_name}' v{version}: не удалось перечитать с диска: {e}")
+            return
+        await handbooks_storage.replace_async({handbook_name: data})
+        self.versions[handbook_name] = version
+        self.last_reload[handbook_name] = {"version": version, "at": time.time(),
+                                           "duration": round(time.perf_counter() - started, 3)}
+        try:
+            await redis_client.hset(_ack_key(handbook_name), WORKER_ID, version)
+        except RedisError as e:
+            logger.warning(f"Справочник '{handbook_name}' v{version}: подтверждение не записано: {e}")
+        logger.info(f"Справочник '{handbook_name}' v{version}: перечитан по событию из Redis")
+
+    async def _reload_safely(self, redis_client: redis.Redis, handbooks_storage: HandbooksStorage,
+                             handbook_name: str, version: int) -> None:
+        """Ошибка перечитывания одного справочника не должна останавливать подписчика."""
+        try:
+            await self._reload(redis_client, handbooks_storage, handbook_name, version)
+        except (asyncio.CancelledError, RedisError):
+            raise
+        except Exception as e:
+            logger.exception(f"Справочник '{handbook_name}' v{version}: ошибка перечитывания: {e}")
+
+    async def _reconcile(self, redis_client: redis.Redis, handbooks_storage: HandbooksStorage,
+                         initial: bool) -> None:
+        """Сверяет версии с Redis. При старте текущие версии принимаются как уже загруженные с диска."""
+        names = set(handbooks_storage.status()) | set(self.versions)
+        for name in names:
+            raw = await redis_client.get(_version_key(name))
+            version = int(raw) if raw is not None else 0
+            if initial:
+                self.versions.setdefault(name, version)
+                if version:
+                    await redis_client.hset(_ack_key(name), WORKER_ID, version)
+            elif version > self.versions.get(name, 0):
+                await self._reload_safely(redis_client, handbooks_storage, name, version)
+
+    async def _run(self, redis_client: redis.Redis, handbooks_storage: HandbooksStorage) -> None:
+        await handbooks_storage.wait_ready()
+        initial = True
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                await self._reconcile(redis_client, handbooks_storage, initial)
+                initial = False
+                logger.info(f"Подписка на обновления справочников '{self.channel}' активна ({WORKER_ID})")
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        event = json.loads(message["data"])
+                        handbook_name, version = event["handbook"], int(event["version"])
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning(f"Некорректное событие обновления справочника: {e}")
+                        continue
+                    if event.get("origin") == WORKER_ID:
+                        continue
+                    await self._reload_safely(redis_client, handbooks_storage, handbook_name, version)
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                logger.warning(f"Подписка на обновления справочников прервана: {e}. Переподключение через 5 с.")
+                await asyncio.sleep(5)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except (RedisError, AttributeError):
+                    pass
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "worker_id": WORKER_ID,
+            "subscribed": self._task is not None and not self._task.done(),
+            "versions": self.versions,
+            "last_reload": self.last_reload,
+        }
+
+
+handbook_reload_subscriber = HandbookReloadSubscriber(settings.REDIS_HANDBOOKS_CHANNEL)
@@ -1,15 +1,30 @@
+import asyncio
+import hashlib
 import json
-from typing import Optional, Dict, Any
+import os
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+from urllib.parse import urlsplit
+
+import aiofiles
 
 # from fastapi import Request
 from httpx import AsyncClient, Response, HTTPStatusError, RequestError,TimeoutException
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 
 from app.core import logger, get_settings
+from app.core.atomic_files import atomic_write
 from app.core.decorators import log_and_catch
+from app.core.server_timing import timed
+from app.core.tracing import span
 
 settings = get_settings()
 
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_PART_SUFFIX = ".part"
+DOWNLOAD_META_SUFFIX = ".meta.json"
+
 # ---- Вспомогательная функция для retry ----
 def _is_retryable_exception(exception) -> bool:
     """Определяет, стоит ли повторять запрос при этой ошибке."""
@@ -23,6 +38,56 @@ def _is_retryable_exception(exception) -> bool:
     ))
 
 
+def upstream_name(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Имя внешнего вызова для трасс и таймингов: метод ЕВМИАС (c/m из параметров) или хост."""
+    if params and "c" in params and "m" in params:
+        return f"{params['c']}/{params['m']}"
+    return urlsplit(url).netloc or url
+
+
+def upstream_metric(url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+    """Метрика Server-Timing для внешнего вызова: (имя, описание). ЕВМИАС - по методу, ФИАС - одной метрикой."""
+    name = upstream_name(url, params)
+    if params and "c" in params and "m" in params:
+        return f"evmias.{params['c']}.{params['m']}", name
+    if url.startswith((settings.FIAS_API_BASE_URL, settings.FIAS_TOKEN_URL)):
+        return "fias", name
+    return f"upstream.{name}", name
+
+
+def _is_text_content_type(content_type: str) -> bool:
+    """Текстовый ли ответ (пустой Content-Type считаем текстовым, как и раньше)."""
+    return not content_type or content_type.startswith("text/") or any(
+        marker in content_type for marker in ("json", "xml", "javascript", "x-www-form-urlencoded")
+    )
+
+
+def _file_sha256(path: Path, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_download_meta(path: Path) -> Dict[str, Any]:
+    """Сведения о последней загрузке файла (etag, last_modified, size, sha256) из файла-спутника <файл>.meta.json."""
+    try:
+        with open(Path(f"{path}{DOWNLOAD_META_SUFFIX}"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json_atomic(path: Path, payload: Dict[str, Any]) -> None:
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+
+
+class DownloadVerificationError(Exception):
+    """Скачанный файл не совпал с ожидаемым размером или контрольной суммой."""
+
+
 class HTTPXClient:
     """
     Асинхронный HTTP-клиент-сервис с повторными попытками (retry) и логированием.
@@ -48,9 +113,9 @@ class HTTPXClient:
             try:
                 if response.content:
                     json_data = response.json()
-                    logger.debug(f"Успешно распарсен JSON (application/json) ответ для {url}")
+                    logger.debug("Успешно распарсен JSON (application/json) ответ для {}", url)
                 else:
-                    logger.debug(f"Content-Type application/json, но тело ответа пустое для {url}")
+                    logger.debug("Content-Type application/json, но тело ответа пустое для {}", url)
             except json.JSONDecodeError as e:
                 logger.warning(
                     f"Не удалось декодировать JSON (application/json) из ответа {url}: {e}. Текст: {response.text[:200]}...")
@@ -58,20 +123,21 @@ class HTTPXClient:
             if response.text:
                 try:
                     json_data = json.loads(response.text)
-                    logger.debug(f"Успешно распарсен JSON (из text/html) ответа для {url}")
+                    logger.debug("Успешно распарсен JSON (из text/html) ответа для {}", url)
                 except json.JSONDecodeError:
-                    logger.debug(f"Content-Type text/html для {url}, но тело не является JSON.")
+                    logger.debug("Content-Type text/html для {}, но тело не является JSON.", url)
             else:
-                logger.debug(f"Content-Type text/html для {url}, но тело ответа пустое.")
+                logger.debug("Content-Type text/html для {}, но тело ответа пустое.", url)
         else:
-            logger.debug(f"Content-Type '{content_type}' для {url}. JSON парсинг не выполняется.")
+            logger.debug("Content-Type '{}' для {}. JSON парсинг не выполняется.", content_type, url)
 
         result = {
             "status_code": response.status_code,
             "headers": dict(response.headers),
             "cookies": dict(response.cookies),
             "content": response.content,
-            "text": response.text,
+            # Бинарные тела (zip и т.п.) в текст не декодируются: text - пустая строка
+            "text": response.text if _is_text_content_type(content_type) else "",
             "json": json_data
         }
         return result
@@ -109,33 +175,199 @@ class HTTPXClient:
         """
         request_timeout = timeout if timeout is not None else 30.0  # Используем стандартный таймаут httpx, если не передан
 
-        # --- Шаг 1: Выполнение запроса ---
-        response: Response = await self.client.request(
-            method=method,
-            url=url,
-            params=params,
-            data=data,
-            headers=headers,
-            cookies=cookies,
-            timeout=request_timeout,
-            **kwargs
-        )
+        # Каждая попытка (в т.ч. повтор через @retry) - отдельный спан трассы
+        with span(f"HTTP {method} {upstream_name(url, params)}", **{"http.url": url}) as current, \
+                timed(*upstream_metric(url, params)):
+            # --- Шаг 1: Выполнение запроса ---
+            response: Response = await self.client.request(
+                method=method,
+                url=url,
+                params=params,
+                data=data,
+                headers=headers,
+                cookies=cookies,
+                timeout=request_timeout,
+                **kwargs
+            )
+            if current is not None:
+                current.attributes["http.status_code"] = response.status_code
 
-        # --- Шаг 2: Проверка статуса (если нужно) ---
-        # Ошибки будут пойманы и обработаны декоратором @retry (если retryable)
-        if raise_for_status:
-            try:
-                response.raise_for_status()
-            except HTTPStatusError as http_error:
-                # Логируем 4xx/5xx ошибки, но пробрасываем дальше для retry
-                logger.warning(f"[HTTPX] Статус ответа {http_error.response.status_code} для {url}.")
-                raise http_error
-
-        # --- Шаг 3: Обработка ответа ---
-        # Ошибки здесь (кроме JSONDecodeError) будут пойманы @log_and_catch,
-        # но НЕ вызовут retry (т.к. не подходят под _is_retryable_exception)
-        processed_result = self._process_response(response, url)
+            # --- Шаг 2: Проверка статуса (если нужно) ---
+            # Ошибки будут пойманы и обработаны декоратором @retry (если retryable)
+            if raise_for_status:
+                try:
+                    response.raise_for_status()
+                except HTTPStatusError as http_error:
+                    # Логируем 4xx/5xx ошибки, но пробрасываем дальше для retry
+                    logger.warning(f"[HTTPX] Статус ответа {http_error.response.status_code} для {url}.")
+                    raise http_error
+
+            # --- Шаг 3: Обработка ответа ---
+            # Ошибки здесь (кроме JSONDecodeError) будут пойманы @log_and_catch,
+            # но НЕ вызовут retry (т.к. не подходят под _is_retryable_exception)
+            processed_result = self._process_response(response, url)
         return processed_result
 
+    async def _stream_to_part(
+            self,
+            url: str,
+            part_path: Path,
+            method: str,
+            headers: Dict[str, str],
+            params: Optional[Dict[str, Any]],
+            validators: Dict[str, Any],
+            timeout: float,
+            chunk_size: int,
+    ) -> Dict[str, Any]:
+        """Одна попытка: докачивает part_path (Range, если часть уже есть). Возвращает сведения об ответе."""
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        request_headers = dict(headers)
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+            # If-Range: если файл на сервере изменился, сервер отдаст его целиком (200), а не продолжение
+            validator = validators.get("etag") or validators.get("last_modified")
+            if validator:
+                request_headers["If-Range"] = validator
+
+        async with self.client.stream(
+                method, url, headers=request_headers, params=params, timeout=timeout
+        ) as response:
+            if response.status_code == 416 and offset:
+                # Запрошенный диапазон за концом файла: часть уже скачана целиком
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                if total.isdigit() and int(total) == offset:
+                    return {"status_code": 206, "headers": dict(response.headers), "total_size": offset,
+                            "resumed": True}
+                # Часть длиннее файла на сервере - она от другой версии, начинаем заново
+                logger.warning(f"[HTTPX] Незаконченная загрузка {part_path.name} не подходит к {url}, удаляем.")
+                part_path.unlink(missing_ok=True)
+                validators.clear()
+                return await self._stream_to_part(
+                    url, part_path, method, headers, params, validators, timeout, chunk_size
+                )
+            response.raise_for_status()
+
+            resumed = response.status_code == 206 and offset > 0
+            if not resumed:
+                if offset:
+                    logger.info(f"[HTTPX] Сервер не продолжил загрузку {url} с {offset} байт, скачиваем заново.")
+                # Версию начатой загрузки запоминаем сразу: после обрыва (даже после перезапуска) докачка
+                # пойдет с If-Range и не склеит части разных версий файла
+                response_headers = {key.lower(): value for key, value in response.headers.items()}
+                validators.clear()
+                validators.update({
+                    "etag": response_headers.get("etag"),
+                    "last_modified": response_headers.get("last-modified"),
+                })
+                await asyncio.to_thread(_write_json_atomic, Path(f"{part_path}{DOWNLOAD_META_SUFFIX}"), validators)
+            total_size = None
+            if resumed:
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                total_size = int(total) if total.isdigit() else None
+            elif response.headers.get("Content-Length", "").isdigit():
+                total_size = int(response.headers["Content-Length"])
+
+            async with aiofiles.open(part_path, "ab" if resumed else "wb") as f:
+                async for chunk in response.aiter_bytes(chunk_size):
+                    await f.write(chunk)
+
+            return {"status_code": response.status_code, "headers": dict(response.headers),
+                    "total_size": total_size, "resumed": resumed}
+
+    async def download(
+            self,
+            url: str,
+            dest_path: Path | str,
+            method: str = "GET",
+            headers: Optional[Dict[str, str]] = None,
+            params: Optional[Dict[str, Any]] = None,
+            expected_size: Optional[int] = None,
+            expected_sha256: Optional[str] = None,
+            timeout: Optional[float] = None,
+            chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+            max_attempts: int = 5,
+    ) -> Dict[str, Any]:
+        """
+        Скачивает файл потоком прямо на диск, не держа тело ответа в памяти и не декодируя его в текст.
+        Загрузка идет в <dest>.part; при обрыве следующая попытка (или следующий вызов) продолжает ее
+        с места остановки через HTTP Range. Готовый файл проверяется по размеру (expected_size или
+        Content-Length/Content-Range) и, если задано, по sha256, после чего атомарно переименовывается в dest_path.
+        Рядом сохраняется <dest>.meta.json с ETag/Last-Modified для условных запросов.
+        Returns:
+            dict: path, size, sha256, status_code, headers, etag, last_modified, resumed.
+        Raises:
+            DownloadVerificationError: размер или контрольная сумма не совпали (часть удаляется).
+            HTTPStatusError / RequestError: после исчерпания попыток.
+        """
+        dest_path = Path(dest_path)
+        part_path = Path(f"{dest_path}{DOWNLOAD_PART_SUFFIX}")
+        part_meta_path = Path(f"{part_path}{DOWNLOAD_META_SUFFIX}")
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        request_timeout = timeout if timeout is not None else 300.0
+
+        # Валидаторы версии, для которой начата незаконченная загрузка
+        validators: Dict[str, Any] = {}
+        if part_path.exists():
+            validators = read_download_meta(part_path)
+
+        started = time.perf_counter()
+        result: Dict[str, Any] = {}
+        for attempt in range(1, max_attempts + 1):
+            try:
+                result = await self._stream_to_part(
+                    url, part_path, method, headers or {}, params, validators, request_timeout, chunk_size
+                )
+            except Exception as e:
+                if not _is_retryable_exception(e) or attempt == max_attempts:
+                    logger.error(f"[HTTPX] Загрузка {url} не удалась (попытка {attempt}): {e}")
+                    raise
+                done = part_path.stat().st_size if part_path.exists() else 0
+                logger.warning(f"[HTTPX] Обрыв загрузки {url} на {done} байт (попытка {attempt}): {e}. Продолжаем.")
+                await asyncio.sleep(min(2 ** attempt, 10))
+                continue
 
+            size = part_path.stat().st_size
+            total_size = expected_size or result.get("total_size")
+            if total_size is not None and size < total_size and attempt < max_attempts:
+                logger.warning(f"[HTTPX] Загрузка {url} неполная ({size} из {total_size} байт), продолжаем.")
+                continue
+            break
 
+        size = part_path.stat().st_size
+        total_size = expected_size or result.get("total_size")
+        if total_size is not None and size != total_size:
+            await asyncio.to_thread(part_path.unlink, True)
+            await asyncio.to_thread(part_meta_path.unlink, True)
+            raise DownloadVerificationError(f"Размер {dest_path.name}: {size} байт, ожидалось {total_size}")
+
+        sha256 = await asyncio.to_thread(_file_sha256, part_path, chunk_size)
+        if expected_sha256 and sha256.lower() != expected_sha256.lower():
+            await asyncio.to_thread(part_path.unlink, True)
+            await asyncio.to_thread(part_meta_path.unlink, True)
+            raise DownloadVerificationError(f"Контрольная сумма {dest_path.name} не совпала: {sha256}")
+
+        await asyncio.to_thread(os.replace, part_path, dest_path)
+        meta = {
+            "url": url,
+            "etag": validators.get("etag"),
+            "last_modified": validators.get("last_modified"),
+            "size": size,
+            "sha256": sha256,
+            "downloaded_at": time.time(),
+        }
+        await asyncio.to_thread(_write_json_atomic, Path(f"{dest_path}{DOWNLOAD_META_SUFFIX}"), meta)
+        await asyncio.to_thread(part_meta_path.unlink, True)
+        logger.info(
+            f"[HTTPX] Скачан {dest_path.name}: {size} байт за {time.perf_counter() - started:.1f} с"
+            f"{' (с докачкой)' if result.get('resumed') else ''}"
+        )
+        return {
+            "path": dest_path,
+            "size": size,
+            "sha256": sha256,
+            "status_code": result.get("status_code"),
+            "headers": result.get("headers", {}),
+            "etag": meta["etag"],
+            "last_modified": meta["last_modified"],
+            "resumed": bool(result.get("resumed")),
+        }
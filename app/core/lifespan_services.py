@@ -1,14 +1,28 @@
 import asyncio
 import json
+import time
+from functools import partial
 
 import httpx
 import redis.asyncio as redis
 from fastapi import FastAPI
 
 from app.core import logger, get_settings, load_handbook, HandbooksStorage, HTTPXClient
+from app.core.handbooks import (
+    handbooks_storage as global_handbooks_storage,
+    read_handbook,
+    handbook_file_exists,
+    to_storage_form
+)
+from app.core.handbooks_reload import handbook_reload_subscriber
+from app.core.referral_orgs import referral_org_table
 from app.core.mappings import nsi_handbooks_mapper
 from app.services.handbooks.sync_evmias import sync_referred_by, sync_referred_org
 from app.services.cookies.cookies import get_new_cookies, check_existing_cookies, load_cookies_from_redis
+from app.services.fias.address_cache import address_cache
+from app.services.fias.fias_token import fias_token_manager
+from app.services.fias.offline_index import offline_okato_resolver
+from app.services.nsi_refresh.scheduler import nsi_refresh_scheduler
 # from app.services.handbooks.nsi_ffoms_maps import NSI_HANDBOOKS_MAP
 from app.services.handbooks.nsi_ffoms import fetch_and_process_handbook
 
@@ -69,6 +83,24 @@ async def shutdown_redis_client(app: FastAPI):
             logger.error(f"Ошибка при закрытии Redis клиента: {e}", exc_info=True)
 
 
+async def init_fias_services(app: FastAPI):
+    """
+    Подключает сервисы ФИАС к общему Redis (токен АПИ и кэш адресов разделяются между воркерами)
+    и прогревает кэш адресов из снимка на диске. Открывает офлайн-индекс ОКАТО, если он построен.
+    """
+    fias_token_manager.bind_redis(app.state.redis_client)
+    address_cache.bind_redis(app.state.redis_client)
+    await address_cache.load_snapshot()
+    offline_okato_resolver.open()
+    logger.info("Сервисы ФИАС подключены к Redis")
+
+
+async def shutdown_fias_services(app: FastAPI):  # noqa
+    """Сохраняет кэш адресов ФИАС на диск для следующего запуска."""
+    await address_cache.save_snapshot()
+    offline_okato_resolver.close()
+
+
 async def _get_evmias_cookies_for_lifespan(http_client: HTTPXClient, redis_client: redis.Redis) -> dict | None:
     """Вспомогательная функция для получения cookies ЕВМИАС в lifespan."""
     cookies = await load_cookies_from_redis(redis_client)
@@ -90,7 +122,7 @@ async def load_all_handbooks(app: FastAPI) -> None:
     2. Если файла нет или он поврежден, вызывает сервисную функцию для скачивания/обновления.
     """
     if not hasattr(app.state, 'handbooks_storage') or app.state.handbooks_storage is None:
-        app.state.handbooks_storage = HandbooksStorage()
+        app.state.handbooks_storage = global_handbooks_storage
 
     handbooks_storage: HandbooksStorage = app.state.handbooks_storage
     http_client: HTTPXClient = app.state.http_client_service
@@ -124,95 +156,115 @@ async def load_all_handbooks(app: FastAPI) -> None:
             storage_key = details.get("handbook_storage_key")
             expected_storage_keys.append(storage_key)
     expected_storage_keys = list(set(expected_storage_keys))
+    app.state.expected_handbooks = sorted(expected_storage_keys)
 
     tasks_to_run_in_parallel = []
     active_sync_tasks_info = []  # Для логирования результатов gather
 
-    # --- Шаг 1: Проверка локальных файлов и планирование задач синхронизации ---
+    # Справочники с диска публикуются одним снимком после проверки всех файлов
+    loaded_from_disk = {}
+
+    # Ленивые справочники, файлы которых уже есть, не читаем при старте
+    lazy_keys = {name.strip() for name in settings.HANDBOOKS_LAZY.split(",") if name.strip()}
+    keys_to_load = []
     for key_name in expected_storage_keys:
-        needs_sync = False
-        try:
-            data = await load_handbook(key_name)  # Пытаемся загрузить с диска
-            handbooks_storage.handbooks[key_name] = data
-            logger.info(f"Справочник '{key_name}' успешно загружен из файла.")
-        except FileNotFoundError:
+        if key_name in lazy_keys and handbook_file_exists(key_name):
+            handbooks_storage.register_lazy(key_name, partial(read_handbook, key_name))
+            logger.info(f"Справочник '{key_name}' будет загружен при первом обращении.")
+        else:
+            keys_to_load.append(key_name)
+
+    # --- Шаг 1: Параллельная загрузка локальных файлов и планирование задач синхронизации ---
+    load_results = await asyncio.gather(*(load_handbook(key) for key in keys_to_load), return_exceptions=True)
+    keys_to_sync = []
+    for key_name, data in zip(keys_to_load, load_results):
+        if isinstance(data, FileNotFoundError):
             logger.warning(f"Файл справочника '{key_name}.json' не найден. Требуется синхронизация.")
-            needs_sync = True
-        except json.JSONDecodeError:
+            keys_to_sync.append(key_name)
+        elif isinstance(data, json.JSONDecodeError):
             logger.error(f"Файл справочника '{key_name}.json' поврежден. Требуется синхронизация.")
-            needs_sync = True
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке справочника '{key_name}' из файла: {e}. Требуется синхронизация.",
-                         exc_info=True)
-            needs_sync = True
-
-        if needs_sync:
-            # Ищем, как синхронизировать этот справочник
-            if key_name in EVMIAS_SYNC_MAP:
-                service_func = EVMIAS_SYNC_MAP[key_name]
-                # Откладываем получение cookies до момента, когда они точно нужны
-                if evmias_cookies is None and not hasattr(app.state, 'evmias_startup_cookies_fetched'):
-                    # ... (логика получения evmias_cookies, как раньше) ...
-                    fetched_cookies = await _get_evmias_cookies_for_lifespan(http_client, redis_client)
-                    if fetched_cookies:
-                        evmias_cookies = fetched_cookies
-                        app.state.evmias_startup_cookies_fetched = True
-                    else:
-                        logger.error("Не удалось получить cookies ЕВМИАС. Пропуск синхронизации ЕВМИАС справочников.")
-                        # Устанавливаем флаг, чтобы не пытаться снова
-                        app.state.evmias_startup_cookies_fetched = True
-                        continue  # Пропускаем добавление этой задачи
-
-                if evmias_cookies:  # Если куки есть (или были получены успешно)
-                    logger.info(f"Lifespan: Планирую синхронизацию ЕВМИАС справочника '{key_name}'...")
-                    tasks_to_run_in_parallel.append(
-                        service_func(
-                            http_client=http_client,
-                            cookies=evmias_cookies,
-                            handbooks_storage=handbooks_storage,
-                            handbook_name=key_name,
-                        )
-                    )
-                    active_sync_tasks_info.append({"name": key_name, "type": "evmias"})
-                else:
-                    logger.warning(f"Пропуск синхронизации ЕВМИАС справочника '{key_name}' из-за отсутствия cookies.")
+            keys_to_sync.append(key_name)
+        elif isinstance(data, Exception):
+            logger.error(f"Ошибка при загрузке справочника '{key_name}' из файла: {data}. Требуется синхронизация.",
+                         exc_info=data)
+            keys_to_sync.append(key_name)
+        else:
+            loaded_from_disk[key_name] = data
+            logger.info(f"Справочник '{key_name}' успешно загружен из файла.")
 
-            else:
-                # Ищем соответствующий NSI код по storage_key (key_name)
-                found_nsi_code = None
-                for code, details in nsi_handbooks_mapper.items():
-                    current_storage_key = details.get("handbook_storage_key")
-                    if current_storage_key == key_name and code in NSI_CODES_TO_PROCESS:
-                        found_nsi_code = code
-                        break
-
-                if found_nsi_code:
-                    logger.info(
-                        f"Lifespan: Планирую синхронизацию НСИ справочника '{key_name}' (код {found_nsi_code})...")
-
-                    # Напрямую вызываем fetch_and_process_handbook, она сама сохранит и вернет данные
-                    # Нам нужно обновить storage, если функция вернула данные
-                    # Обернем вызов в корутину, которая обновит storage
-                    async def nsi_sync_wrapper(code_to_sync, key_to_update):
-                        try:
-                            data_ = await fetch_and_process_handbook(code_to_sync, http_client)
-                            if data_:
-                                handbooks_storage.handbooks[key_to_update] = data_
-                                return True  # Возвращаем True при успехе
-                            else:
-                                return False  # Возвращаем False, если данные не получены/обработаны
-                        except Exception:
-                            # Логирование ошибки произойдет внутри fetch_and_process_handbook или здесь
-                            logger.error(f"Исключение в nsi_sync_wrapper для кода {code_to_sync}", exc_info=True)
-                            return False  # Возвращаем False при исключении
-
-                    tasks_to_run_in_parallel.append(nsi_sync_wrapper(found_nsi_code, key_name))
-                    active_sync_tasks_info.append({"name": key_name, "type": "nsi", "code": found_nsi_code})
+    # Загруженное с диска доступно сразу, не дожидаясь синхронизации остальных справочников
+    if loaded_from_disk:
+        await handbooks_storage.replace_async(loaded_from_disk)
+
+    for key_name in keys_to_sync:
+        # Ищем, как синхронизировать этот справочник
+        if key_name in EVMIAS_SYNC_MAP:
+            service_func = EVMIAS_SYNC_MAP[key_name]
+            # Откладываем получение cookies до момента, когда они точно нужны
+            if evmias_cookies is None and not hasattr(app.state, 'evmias_startup_cookies_fetched'):
+                # ... (логика получения evmias_cookies, как раньше) ...
+                fetched_cookies = await _get_evmias_cookies_for_lifespan(http_client, redis_client)
+                if fetched_cookies:
+                    evmias_cookies = fetched_cookies
+                    app.state.evmias_startup_cookies_fetched = True
                 else:
-                    logger.warning(
-                        f"Для справочника '{key_name}' не найден файл и не найдена соответствующая функция синхронизации. "
-                        f"Пропуск синхронизации."
+                    logger.error("Не удалось получить cookies ЕВМИАС. Пропуск синхронизации ЕВМИАС справочников.")
+                    # Устанавливаем флаг, чтобы не пытаться снова
+                    app.state.evmias_startup_cookies_fetched = True
+                    continue  # Пропускаем добавление этой задачи
+
+            if evmias_cookies:  # Если куки есть (или были получены успешно)
+                logger.info(f"Lifespan: Планирую синхронизацию ЕВМИАС справочника '{key_name}'...")
+                tasks_to_run_in_parallel.append(
+                    service_func(
+                        http_client=http_client,
+                        cookies=evmias_cookies,
+                        handbooks_storage=handbooks_storage,
+                        handbook_name=key_name,
                     )
+                )
+                active_sync_tasks_info.append({"name": key_name, "type": "evmias"})
+            else:
+                logger.warning(f"Пропуск синхронизации ЕВМИАС справочника '{key_name}' из-за отсутствия cookies.")
+
+        else:
+            # Ищем соответствующий NSI код по storage_key (key_name)
+            found_nsi_code = None
+            for code, details in nsi_handbooks_mapper.items():
+                current_storage_key = details.get("handbook_storage_key")
+                if current_storage_key == key_name and code in NSI_CODES_TO_PROCESS:
+                    found_nsi_code = code
+                    break
+
+            if found_nsi_code:
+                logger.info(
+                    f"Lifespan: Планирую синхронизацию НСИ справочника '{key_name}' (код {found_nsi_code})...")
+
+                # Напрямую вызываем fetch_and_process_handbook, она сама сохранит и вернет данные
+                # Нам нужно обновить storage, если функция вернула данные
+                # Обернем вызов в корутину, которая обновит storage
+                async def nsi_sync_wrapper(code_to_sync, key_to_update):
+                    try:
+                        data_ = await fetch_and_process_handbook(code_to_sync, http_client)
+                        if data_:
+                            await handbooks_storage.replace_async(
+                                {key_to_update: await to_storage_form(key_to_update, data_)}
+                            )
+                            return True  # Возвращаем True при успехе
+                        else:
+                            return False  # Возвращаем False, если данные не получены/обработаны
+                    except Exception:
+                        # Логирование ошибки произойдет внутри fetch_and_process_handbook или здесь
+                        logger.error(f"Исключение в nsi_sync_wrapper для кода {code_to_sync}", exc_info=True)
+                        return False  # Возвращаем False при исключении
+
+                tasks_to_run_in_parallel.append(nsi_sync_wrapper(found_nsi_code, key_name))
+                active_sync_tasks_info.append({"name": key_name, "type": "nsi", "code": found_nsi_code})
+            else:
+                logger.warning(
+                    f"Для справочника '{key_name}' не найден файл и не найдена соответствующая функция синхронизации. "
+                    f"Пропуск синхронизации."
+                )
 
     # --- Шаг 2: Выполнение всех запланированных задач синхронизации ---
     successful_syncs_count = 0
@@ -245,3 +297,73 @@ async def load_all_handbooks(app: FastAPI) -> None:
         f"Успешно синхронизировано сервисами: {successful_syncs_count}. "
         f"Всего в памяти: {final_in_memory_count} из {len(expected_storage_keys)} ожидаемых."
     )
+
+
+async def _load_handbooks_and_mark_ready(app: FastAPI) -> None:
+    """Загружает справочники и в любом случае снимает ожидание готовности (как и раньше, без части справочников
+    приложение работает, а их отсутствие видно в /api/health/ready)."""
+    started = time.perf_counter()
+    try:
+        await load_all_handbooks(app)
+    except Exception as e:
+        logger.error(f"Lifespan: Ошибка загрузки справочников: {e}", exc_info=True)
+    finally:
+        app.state.handbooks_storage.mark_ready()
+        logger.info(f"Lifespan: Справочники готовы через {time.perf_counter() - started:.2f} с.")
+
+
+async def start_handbooks_loading(app: FastAPI) -> None:
+    """
+    Запускает загрузку справочников. При HANDBOOKS_BACKGROUND_LOAD приложение начинает принимать запросы сразу,
+    а зависимости, которым нужны справочники, ждут готовности (см. get_handbooks_storage).
+    """
+    if not hasattr(app.state, 'handbooks_storage') or app.state.handbooks_storage is None:
+        app.state.handbooks_storage = global_handbooks_storage
+    # Производные структуры перестраиваются при каждой публикации справочников-источников
+    referral_org_table.bind(app.state.handbooks_storage)
+
+    if settings.HANDBOOKS_BACKGROUND_LOAD:
+        app.state.handbooks_loading_task = asyncio.create_task(_load_handbooks_and_mark_ready(app))
+        logger.info("Lifespan: Загрузка справочников запущена в фоне.")
+    else:
+        await _load_handbooks_and_mark_ready(app)
+
+
+async def stop_handbooks_loading(app: FastAPI) -> None:
+    """Отменяет фоновую загрузку справочников, если она еще идет."""
+    task = getattr(app.state, 'handbooks_loading_task', None)
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        logger.info("Lifespan: Фоновая загрузка справочников отменена.")
+
+
+async def init_nsi_refresh_scheduler(app: FastAPI) -> None:
+    """Запускает фоновую проверку новых версий справочников НСИ (после стартовой загрузки справочников)."""
+    if not settings.NSI_REFRESH_ENABLED:
+        logger.info("Фоновое обновление справочников НСИ отключено (NSI_REFRESH_ENABLED=false)")
+        return
+    nsi_refresh_scheduler.start(
+        http_service=app.state.http_client_service,
+        handbooks_storage=app.state.handbooks_storage,
+        redis_client=app.state.redis_client,
+    )
+
+
+async def shutdown_nsi_refresh_scheduler(app: FastAPI) -> None:  # noqa
+    await nsi_refresh_scheduler.stop()
+
+
+async def init_handbooks_reload_subscriber(app: FastAPI) -> None:
+    """Подписывает воркер на события обновления справочников в Redis (перечитывание с диска в фоне)."""
+    handbook_reload_subscriber.start(
+        redis_client=app.state.redis_client,
+        handbooks_storage=app.state.handbooks_storage,
+    )
+
+
+async def shutdown_handbooks_reload_subscriber(app: FastAPI) -> None:  # noqa
+    await handbook_reload_subscriber.stop()
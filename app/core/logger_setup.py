@@ -1,10 +1,99 @@
 import logging
 import sys
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+import orjson
 from loguru import logger
 
+from .request_context import event_id_var, request_id_var
+
+TEXT_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {extra[request_id]} | {message}"
+
+
+class DebugSampler:
+    """
+    Ограничивает частоту DEBUG-сообщений: не больше limit записей в секунду с одного места вызова
+    (модуль + строка). Лишние записи отбрасываются, их число добавляется к следующей пропущенной.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.suppressed_total = 0
+        self._windows: Dict[Tuple[str, int], list] = {}  # место вызова -> [начало окна, пропущено, отброшено]
+        self._lock = threading.Lock()
+
+    def allow(self, record: Dict[str, Any]) -> bool:
+        if self.limit <= 0 or record["level"].no > logging.DEBUG:
+            return True
+        key = (record["name"], record["line"])
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= 1.0:
+                dropped = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if dropped:
+                    record["extra"]["suppressed"] = dropped
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed_total += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limit": self.limit, "call_sites": len(self._windows), "suppressed_total": self.suppressed_total}
+
+
+debug_sampler = DebugSampler(limit=0)
+
+
+def _patch_record(record: Dict[str, Any]) -> None:
+    """Добавляет в запись идентификаторы запроса/госпитализации и решение семплера (один раз на запись)."""
+    extra = record["extra"]
+    extra["request_id"] = extra.get("request_id") or request_id_var.get() or "-"
+    extra["event_id"] = extra.get("event_id") or event_id_var.get()
+    extra["sampled"] = debug_sampler.allow(record)
+
+
+def _sampled(record: Dict[str, Any]) -> bool:
+    return record["extra"].get("sampled", True)
+
+
+def _json_format(record: Dict[str, Any]) -> str:
+    """Запись в одну строку JSON; сама строка кладется в extra, чтобы loguru не разбирал фигурные скобки."""
+    extra = record["extra"]
+    data = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "module": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "request_id": extra.get("request_id"),
+        "event_id": extra.get("event_id"),
+    }
+    if extra.get("suppressed"):
+        data["suppressed"] = extra["suppressed"]
+    if record["exception"] is not None:
+        data["exception"] = repr(record["exception"].value)
+    extra["json"] = orjson.dumps(data, default=str).decode()
+    return "{extra[json]}\n"
+
+
 # Убираем импорт get_settings из глобальной области
-def configure_logger(log_level: str = "INFO"):
-    """Настраивает loguru для логирования приложения. Вызывается при импорте модуля."""
+def configure_logger(log_level: str = "INFO", enqueue: bool = True, json_logs: bool = True,
+                     debug_rate_limit: int = 0):
+    """
+    Настраивает loguru для логирования приложения. Вызывается при импорте модуля.
+    Args:
+        enqueue: запись в синки через очередь в отдельном потоке, запрос не ждет вывода на диск/в консоль.
+        json_logs: дополнительно писать logs/app.json (одна JSON-запись на строку, с request_id/event_id).
+        debug_rate_limit: максимум DEBUG-записей в секунду с одного места вызова (0 - без ограничения).
+    """
     # Очистка стандартных хендлеров logging
     root_logger = logging.getLogger()
     root_logger.handlers.clear()
@@ -13,29 +102,46 @@ def configure_logger(log_level: str = "INFO"):
         logging.getLogger(name).propagate = False
 
     # Настройка loguru
+    debug_sampler.limit = debug_rate_limit
     logger.remove()
+    logger.configure(patcher=_patch_record)
     logger.add(
         sys.stderr,
-        format="<green>{time:HH:mm:ss}</green> | <level>{level}</level> | <cyan>{message}</cyan>",
+        format="<green>{time:HH:mm:ss}</green> | <level>{level}</level> | {extra[request_id]} | <cyan>{message}</cyan>",
         level=log_level,
         colorize=True,
+        filter=_sampled,
+        enqueue=enqueue,
     )
     logger.add(
         "logs/app.log",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
+        format=TEXT_FORMAT,
         level="INFO",
         rotation="10 MB",
         retention="14 days",
         compression="zip",
+        enqueue=enqueue,
     )
     logger.add(
         "logs/errors.log",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
+        format=TEXT_FORMAT,
         level="ERROR",
         rotation="5 MB",
         retention="10 days",
         compression="zip",
+        enqueue=enqueue,
     )
+    if json_logs:
+        logger.add(
+            "logs/app.json",
+            format=_json_format,
+            level=log_level,
+            rotation="20 MB",
+            retention="14 days",
+            compression="zip",
+            filter=_sampled,
+            enqueue=enqueue,
+        )
 
     # Перехват логов FastAPI
     class InterceptHandler(logging.Handler):
@@ -49,4 +155,9 @@ def configure_logger(log_level: str = "INFO"):
 # Вызываем конфигурацию с настройками
 from .config import get_settings
 settings = get_settings()
-configure_logger(settings.LOGS_LEVEL)
\ No newline at end of file
+configure_logger(
+    settings.LOGS_LEVEL,
+    enqueue=settings.LOGS_ENQUEUE,
+    json_logs=settings.LOGS_JSON,
+    debug_rate_limit=settings.LOGS_DEBUG_RATE_LIMIT,
+)
@@ -6,12 +6,19 @@ nsi_handbooks_mapper = {
         "filename": "insurance_companies.json",
         "handbook_storage_key": "insurance_companies",
         "key_field": "nam_smop",
+        # индексы снимка справочников: имя индекса -> поле записи (см. app.core.handbooks)
+        "indexes": {"by_name": "nam_smop"},
+        # поля записей, которые держатся в памяти (ключевое поле и поля индексов добавляются сами);
+        # полные записи остаются в JSON-файле справочника
+        "fields": ("TF_OKATO", "smocod"),
     },
     "F032": {
         "root_key": "zap",
         "filename": "medical_organizations.json",
         "handbook_storage_key": "medical_organizations",
         "key_field": "OID_MO",
+        "indexes": {"by_token": "OID_MO"},
+        "fields": ("NAM_MOP", "NAM_MOK", "IDMO"),
     },
     "V002": { # профиль медицинской помощи
         "root_key": "zap",
@@ -30,11 +37,15 @@ nsi_handbooks_mapper = {
         "filename": "medical_care_conditions.json",
         "handbook_storage_key": "medical_care_conditions",
         "key_field": "UMPNAME",
+        "indexes": {"by_code": "IDUMP", "by_name": "UMPNAME"},
+        "fields": (),
     },
     "V014": { # формы оказания медицинской помощи
         "root_key": "zap",
         "filename": "medical_care_forms.json",
         "handbook_storage_key": "medical_care_forms",
         "key_field": "IDFRMMP",
+        "indexes": {"by_code": "IDFRMMP", "by_name": "FRMMPNAME"},
+        "fields": (),
     },
 }
@@ -0,0 +1,169 @@
+"""
+Из чего складывается память воркера: справочники, кэши, запросы и задачи в работе, места аллокаций.
+
+Размеры объектов приблизительные: для больших коллекций глубокий размер считается по выборке
+из первых SAMPLE_SIZE элементов и экстраполируется на всю коллекцию. Справочники из общего mmap
+(HANDBOOKS_SHARED_MMAP) в память воркера не входят - для них показывается размер отображенного файла.
+tracemalloc включается по требованию; каждый запрос diff сравнивает с предыдущим снимком.
+"""
+import asyncio
+import gc
+import resource
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Mapping, Optional
+
+from app.core import logger
+from app.core.handbooks import HandbooksStorage, MmapHandbookPayload
+
+SAMPLE_SIZE = 200
+MAX_DEPTH = 6
+
+
+def approx_deep_size(obj: Any, sample: int = SAMPLE_SIZE, _depth: int = 0, _seen: Optional[set] = None) -> int:
+    """Приблизительный глубокий размер объекта в байтах (общие объекты учитываются один раз)."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen or _depth > MAX_DEPTH:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, MmapHandbookPayload):
+        return size  # данные в отображенном файле, не в куче воркера
+
+    if isinstance(obj, Mapping):
+        items = obj.items()
+        total = len(obj)
+        parts = ((key, value) for key, value in items)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        total = len(obj)
+        parts = ((item,) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        total = 1
+        parts = iter([tuple(getattr(obj, slot, None) for slot in obj.__slots__)])
+    elif hasattr(obj, "__dict__"):
+        total = 1
+        parts = iter([(vars(obj),)])
+    else:
+        return size
+
+    measured, counted = 0, 0
+    for part in parts:
+        if counted >= sample:
+            break
+        measured += sum(approx_deep_size(item, sample, _depth + 1, seen) for item in part)
+        counted += 1
+    if counted and total > counted:
+        measured = int(measured * total / counted)
+    return size + measured
+
+
+def process_memory() -> Dict[str, Any]:
+    """RSS процесса (текущий и пиковый) и счетчики сборщика мусора."""
+    result: Dict[str, Any] = {
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "gc_counts": gc.get_count(),
+        "gc_objects": len(gc.get_objects()),
+    }
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "RssAnon:", "RssFile:")):
+                    name, value = line.split(":", 1)
+                    result[f"{name.lower()}_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except (OSError, ValueError):
+        pass  # не Linux - остается только ru_maxrss
+    return result
+
+
+def handbooks_memory(handbooks_storage: HandbooksStorage) -> Dict[str, Any]:
+    """Приблизительный размер каждого справочника текущего снимка и его индексов."""
+    snapshot = handbooks_storage.snapshot
+    handbooks = {}
+    for name, payload in snapshot.payloads.items():
+        item: Dict[str, Any] = {"records": len(payload) if isinstance(payload, Mapping) else None}
+        if isinstance(payload, MmapHandbookPayload):
+            item.update(storage="mmap", mapped_bytes=payload.size_bytes, approx_bytes=0)
+        else:
+            item.update(storage="memory", approx_bytes=approx_deep_size(payload))
+        item["index_bytes"] = sum(approx_deep_size(index) for index in snapshot.indexes.get(name, {}).values())
+        handbooks[name] = item
+    return {
+        "snapshot_version": snapshot.version,
+        "total_approx_bytes": sum(item["approx_bytes"] + item["index_bytes"] for item in handbooks.values()),
+        "handbooks": dict(sorted(handbooks.items(), key=lambda entry: -entry[1]["approx_bytes"])),
+    }
+
+
+def tasks_summary(top: int = 20) -> Dict[str, Any]:
+    """Незавершенные asyncio-задачи текущего цикла, сгруппированные по корутине."""
+    tasks = [task for task in asyncio.all_tasks() if not task.done()]
+    names = Counter(getattr(task.get_coro(), "__qualname__", task.get_name()) for task in tasks)
+    return {"count": len(tasks), "by_coroutine": dict(names.most_common(top))}
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+class TracemallocSampler:
+    """Включение tracemalloc по требованию и разница с предыдущим снимком по местам аллокаций."""
+
+    def __init__(self):
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._previous_at: Optional[float] = None
+
+    def start(self, frames: int) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.warning(f"tracemalloc включен ({frames} кадров): аллокации замедляются, не забудьте выключить")
+        self._previous, self._previous_at = _take_snapshot(), time.time()
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc выключен")
+        self._previous = self._previous_at = None
+        return self.status()
+
+    def diff(self, top: int = 20) -> Dict[str, Any]:
+        """Топ мест аллокаций по приросту с прошлого снимка; текущий снимок становится базой для следующего."""
+        if not tracemalloc.is_tracing():
+            return {**self.status(), "top": []}
+        snapshot = _take_snapshot()
+        stats = snapshot.compare_to(self._previous, "lineno") if self._previous is not None \
+            else snapshot.statistics("lineno")
+        result = {
+            **self.status(),
+            "since": self._previous_at,
+            "top": [
+                {
+                    "site": str(stat.traceback[0]),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "size_diff_kb": round(getattr(stat, "size_diff", stat.size) / 1024, 1),
+                    "count": stat.count,
+                    "count_diff": getattr(stat, "count_diff", stat.count),
+                }
+                for stat in stats[:top]
+            ],
+        }
+        self._previous, self._previous_at = snapshot, time.time()
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_mb": round(current / 1024 / 1024, 1),
+            "peak_mb": round(peak / 1024 / 1024, 1),
+        }
+
+
+tracemalloc_sampler = TracemallocSampler()
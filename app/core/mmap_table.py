@@ -0,0 +1,130 @@
+"""
+Компактная отсортированная таблица "строковый ключ -> байты" на диске с доступом через mmap.
+
+Формат файла:
+    MAGIC(4) | count: uint64 | meta_len: uint64 | meta | index: count * (key_off: uint64, key_len: uint32, val_len: uint32) | data
+Ключи в index отсортированы по UTF-8 байтам, значение лежит в data сразу за ключом.
+Поиск - бинарный по index, без загрузки таблицы в память процесса: страницы файла делит ОС,
+поэтому несколько процессов, открывших один файл, не дублируют его содержимое.
+"""
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional, Tuple
+
+from app.core.atomic_files import atomic_write
+
+MAGIC = b"MMT1"
+_HEADER = struct.Struct("<4sQQ")
+_ENTRY = struct.Struct("<QII")
+
+
+def write_table(path: Path, items: Iterable[Tuple[str, bytes]], meta: bytes = b"") -> int:
+    """
+    Атомарно записывает таблицу (через временный файл с уникальным именем и os.replace, см. atomic_write).
+    При повторяющихся ключах побеждает последнее значение. Возвращает количество записей.
+    """
+    records = {key.encode("utf-8"): value for key, value in items}
+    keys = sorted(records)
+
+    with atomic_write(path, fsync=True) as f:
+        f.write(_HEADER.pack(MAGIC, len(keys), len(meta)))
+        f.write(meta)
+        offset = 0
+        for key in keys:
+            f.write(_ENTRY.pack(offset, len(key), len(records[key])))
+            offset += len(key) + len(records[key])
+        for key in keys:
+            f.write(key)
+            f.write(records[key])
+    return len(keys)
+
+
+class MmapTable(Mapping[str, bytes]):
+    """Read-only отображение таблицы, записанной write_table."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, meta_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Файл {self.path} не является таблицей {MAGIC!r}")
+        self._meta_start = _HEADER.size
+        self._meta_len = meta_len
+        self._index_start = self._meta_start + meta_len
+        self._data_start = self._index_start + self._count * _ENTRY.size
+
+    @property
+    def meta(self) -> bytes:
+        return self._mm[self._meta_start:self._meta_start + self._meta_len]
+
+    def _entry(self, i: int) -> Tuple[int, int, int]:
+        key_off, key_len, val_len = _ENTRY.unpack_from(self._mm, self._index_start + i * _ENTRY.size)
+        return self._data_start + key_off, key_len, val_len
+
+    def _key_bytes(self, i: int) -> bytes:
+        start, key_len, _ = self._entry(i)
+        return self._mm[start:start + key_len]
+
+    def _find(self, key: bytes) -> Optional[int]:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key_bytes(lo) == key:
+            return lo
+        return None
+
+    def __getitem__(self, key: str) -> bytes:
+        i = self._find(key.encode("utf-8"))
+        if i is None:
+            raise KeyError(key)
+        start, key_len, val_len = self._entry(i)
+        return self._mm[start + key_len:start + key_len + val_len]
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key.encode("utf-8")) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self._key_bytes(i).decode("utf-8")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def iter_items(self) -> Iterator[Tuple[str, bytes]]:
+        """Последовательный обход всех записей (быстрее, чем обращение по ключам)."""
+        mm, data_start = self._mm, self._data_start
+        index = mm[self._index_start:data_start]
+        for key_off, key_len, val_len in _ENTRY.iter_unpack(index):
+            start = data_start + key_off
+            yield mm[start:start + key_len].decode("utf-8"), mm[start + key_len:start + key_len + val_len]
+
+    def iter_prefix(self, prefix: str) -> Iterator[Tuple[str, bytes]]:
+        """Записи, ключ которых начинается с prefix (в порядке сортировки)."""
+        encoded = prefix.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_bytes(mid) < encoded:
+                lo = mid + 1
+            else:
+                hi = mid
+        for i in range(lo, self._count):
+            start, key_len, val_len = self._entry(i)
+            key = self._mm[start:start + key_len]
+            if not key.startswith(encoded):
+                break
+            yield key.decode("utf-8"), self._mm[start + key_len:start + key_len + val_len]
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._mm)
+
+    def close(self) -> None:
+        self._mm.close()
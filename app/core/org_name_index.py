@@ -0,0 +1,254 @@
+"""
+Нечеткий поиск направившей медицинской организации по названию.
+
+Индекс строится при каждой публикации справочников medical_organizations (F032: NAM_MOP/NAM_MOK)
+и referred_organizations (ЕВМИАС: name -> token -> F032), плюс ручной маппер referred_org_map
+(перестраивается вместе с таблицей направивших организаций, см. app.core.referral_orgs).
+Названия нормализуются (регистр, ё, кавычки/знаки, типовые формы учреждений сокращаются до аббревиатур),
+кандидаты отбираются по триграммам. Кандидат с другими номерами (№ 1 и № 2, МСЧ 118 и МСЧ 120) отбрасывается,
+остальные оцениваются по вхождению слов более короткого названия в более длинное (слова сравниваются
+по триграммам, поэтому опечатки допустимы), так что "ГОБУЗ Кольская ЦРБ" совпадает с
+"ГОБУЗ Кольская ЦРБ Мурманская область". Побеждает кандидат с наибольшей оценкой.
+Разрешенные названия кэшируются, поэтому повторный поиск - это обращение к словарю.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.core import get_settings, logger
+from app.core.handbooks import HandbookSnapshot, iter_handbook_records
+from app.core.mappings import referred_org_map
+
+settings = get_settings()
+
+ORG_NAME_SOURCES = ("medical_organizations", "referred_organizations")
+
+# Полные формы -> аббревиатуры (применяются к уже нормализованной строке, порядок важен: длинные раньше)
+_ABBREVIATIONS = (
+    ("федеральное государственное бюджетное учреждение здравоохранения", "фгбуз"),
+    ("федеральное государственное бюджетное учреждение", "фгбу"),
+    ("государственное областное автономное учреждение здравоохранения", "гоауз"),
+    ("государственное областное бюджетное учреждение здравоохранения", "гобуз"),
+    ("государственное бюджетное учреждение здравоохранения", "гбуз"),
+    ("государственное автономное учреждение здравоохранения", "гауз"),
+    ("общество с ограниченной ответственностью", "ооо"),
+    ("центральная районная больница", "црб"),
+    ("центральная городская больница", "цгб"),
+    ("областная клиническая больница", "окб"),
+    ("медико санитарная часть", "мсч"),
+    ("федерального медико биологического агентства", "фмба"),
+)
+# Организационно-правовые формы: есть почти в каждом названии, в сравнении слов не участвуют
+_FORM_WORDS = frozenset({"фгбуз", "фгбу", "гоауз", "гобуз", "гбуз", "гауз", "ооо"})
+_NON_WORD = re.compile(r"[^\w]+")
+_NUMBER_SIGN = re.compile(r"№\s*")
+_NUMBER = re.compile(r"\d+")
+
+# Кандидаты, у которых лучший и второй результаты ближе этого зазора, считаются неоднозначными
+AMBIGUITY_MARGIN = 0.03
+# Триграммы, встречающиеся чаще этой доли записей, не используются для отбора кандидатов
+COMMON_TRIGRAM_SHARE = 0.05
+CANDIDATES_TO_SCORE = 50
+
+
+def normalize_org_name(name: Any) -> str:
+    """Нормализованное название организации для сравнения."""
+    text = _NUMBER_SIGN.sub(" n", str(name).casefold().replace("ё", "е"))
+    text = " ".join(_NON_WORD.sub(" ", text).replace("_", " ").split())
+    for full, short in _ABBREVIATIONS:
+        if full in text:
+            text = text.replace(full, short)
+    return text
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(left: set, right: set) -> float:
+    if not left or not right:
+        return 0.0
+    return 2 * len(left & right) / (len(left) + len(right))
+
+
+def _numbers(normalized: str) -> frozenset:
+    """Номера в названии (№ 1, 118, ...): организации с разными номерами - разные организации."""
+    return frozenset(number.lstrip("0") or "0" for number in _NUMBER.findall(normalized))
+
+
+def _similarity(left: str, right: str) -> Tuple[float, float]:
+    """
+    Сходство названий по словам (0..1): (вхождение, общее). Организационно-правовые формы не учитываются.
+    Вхождение - насколько слова более короткого названия входят в более длинное: для каждого слова берется
+    лучшее сходство по Дайсу со словами длинного, среднее взвешивается длиной слов. Общее учитывает и
+    лишние слова длинного названия - по нему выбирается лучший из кандидатов с одинаковым вхождением.
+    """
+    left_words = [word for word in left.split() if word not in _FORM_WORDS]
+    right_words = [word for word in right.split() if word not in _FORM_WORDS]
+    if not left_words or not right_words:
+        return 0.0, 0.0
+    short_total, long_total = sum(map(len, left_words)), sum(map(len, right_words))
+    short, long = left_words, right_words
+    if short_total > long_total:
+        short, long, short_total, long_total = long, short, long_total, short_total
+    long_trigrams = [_trigrams(word) for word in long]
+    matched = sum(
+        len(word) * max(_dice(_trigrams(word), other) for other in long_trigrams)
+        for word in short
+    )
+    return matched / short_total, 2 * matched / (short_total + long_total)
+
+
+def _org_from_f032(record: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": record.get("NAM_MOP"),
+        "nick": record.get("NAM_MOK"),
+        "code": record.get("IDMO"),
+        "token": record.get("OID_MO"),
+    }
+
+
+class _OrgNameState:
+    """
+    Опубликованное состояние индекса. Названия, организации и триграммы после создания не меняются;
+    кэш принадлежит состоянию и сбрасывается вместе с ним. Индекс подменяет состояние одним присваиванием.
+    """
+    __slots__ = ("version", "names", "numbers", "orgs", "postings", "cache", "cache_lock")
+
+    def __init__(self, version: Optional[int], names: Tuple[str, ...], orgs: Tuple[Dict[str, Any], ...],
+                 postings: Mapping[str, Tuple[int, ...]]):
+        self.version = version
+        self.names = names
+        self.numbers = tuple(_numbers(name) for name in names)
+        self.orgs = orgs
+        self.postings = postings
+        self.cache: "OrderedDict[str, Optional[Tuple[Dict[str, Any], float]]]" = OrderedDict()
+        # resolve вызывается и из цикла событий, и из потока сборки таблицы направивших организаций
+        self.cache_lock = threading.Lock()
+
+
+class OrgNameIndex:
+    """Триграммный индекс названий МО с кэшем разрешенных названий."""
+
+    def __init__(self, threshold: float, cache_size: int):
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self._state = _OrgNameState(None, (), (), {})
+        self._build_lock = threading.Lock()
+        self.stats: Dict[str, Any] = {"entries": 0, "hits": 0, "misses": 0, "unresolved": 0, "build_seconds": None}
+
+    def rebuild(self, snapshot: HandbookSnapshot) -> None:
+        """Строит индекс по снимку справочников и атомарно подменяет предыдущий."""
+        with self._build_lock:
+            if self._state.version is not None and self._state.version >= snapshot.version:
+                return
+            started = time.perf_counter()
+            names: List[str] = []
+            orgs: List[Dict[str, Any]] = []
+            seen = set()
+
+            def add(name: Any, org: Dict[str, Any]) -> None:
+                if not name or not org.get("code"):
+                    return
+                normalized = normalize_org_name(name)
+                if normalized and (normalized, org.get("code")) not in seen:
+                    seen.add((normalized, org.get("code")))
+                    names.append(normalized)
+                    orgs.append(org)
+
+            for map_name, org in referred_org_map.items():
+                add(map_name, org)
+                add(org.get("name"), org)
+                add(org.get("nick"), org)
+            for record in iter_handbook_records(snapshot.payloads.get("medical_organizations")):
+                org = _org_from_f032(record)
+                add(record.get("NAM_MOP"), org)
+                add(record.get("NAM_MOK"), org)
+            for record in iter_handbook_records(snapshot.payloads.get("referred_organizations")):
+                f032_record = snapshot.lookup("medical_organizations", "by_token", record.get("token"))
+                if f032_record is not None:
+                    add(record.get("name"), _org_from_f032(f032_record))
+
+            postings: Dict[str, List[int]] = defaultdict(list)
+            for entry_id, name in enumerate(names):
+                for trigram in _trigrams(name):
+                    postings[trigram].append(entry_id)
+
+            self._state = _OrgNameState(
+                snapshot.version, tuple(names), tuple(orgs),
+                {trigram: tuple(entry_ids) for trigram, entry_ids in postings.items()},
+            )
+            self.stats.update(entries=len(names), build_seconds=round(time.perf_counter() - started, 3))
+        logger.info(
+            f"Индекс названий МО построен по снимку v{snapshot.version}: "
+            f"{len(names)} названий за {self.stats['build_seconds']} с"
+        )
+
+    def _search(self, state: _OrgNameState, normalized: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        names, numbers, orgs, postings = state.names, state.numbers, state.orgs, state.postings
+        query = _trigrams(normalized)
+        if not names or not query:
+            return None
+        common_limit = max(50, int(len(names) * COMMON_TRIGRAM_SHARE))
+        counts: Dict[int, int] = defaultdict(int)
+        for trigram in sorted(query, key=lambda t: len(postings.get(t, ()))):
+            entry_ids = postings.get(trigram, ())
+            if len(entry_ids) > common_limit and counts:
+                break
+            for entry_id in entry_ids:
+                counts[entry_id] += 1
+        query_numbers = _numbers(normalized)
+        candidates = [entry_id for entry_id in sorted(counts, key=counts.__getitem__, reverse=True)
+                      if numbers[entry_id] == query_numbers][:CANDIDATES_TO_SCORE]
+
+        scored = sorted(
+            ((_similarity(normalized, names[entry_id]), entry_id) for entry_id in candidates), reverse=True
+        )
+        if not scored or scored[0][0][0] < self.threshold:
+            return None
+        (best_score, best_overall), best_id = scored[0]
+        best_org = orgs[best_id]
+        runner_up = next((similarity for similarity, entry_id in scored[1:]
+                          if orgs[entry_id].get("code") != best_org.get("code")), (0.0, 0.0))
+        # Неоднозначно, если другая организация не хуже ни по вхождению, ни по общему сходству
+        if best_score - runner_up[0] < AMBIGUITY_MARGIN and best_overall - runner_up[1] < AMBIGUITY_MARGIN:
+            return None
+        return best_org, round(best_score, 3)
+
+    def resolve(self, name: Optional[str]) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Организация по названию (как в ЕВМИАС).
+        Returns:
+            (организация {name, nick, code, token}, оценка сходства 0..1) или None, если совпадение не найдено
+            или неоднозначно.
+        """
+        if not name:
+            return None
+        normalized = normalize_org_name(name)
+        state = self._state  # одно чтение: поиск и кэш относятся к одному и тому же построению индекса
+        with state.cache_lock:
+            if normalized in state.cache:
+                self.stats["hits"] += 1
+                state.cache.move_to_end(normalized)
+                return state.cache[normalized]
+        self.stats["misses"] += 1
+        result = self._search(state, normalized)
+        if result is None:
+            self.stats["unresolved"] += 1
+        with state.cache_lock:
+            state.cache[normalized] = result
+            if len(state.cache) > self.cache_size:
+                state.cache.popitem(last=False)
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        return {**self.stats, "cached": len(self._state.cache)}
+
+
+org_name_index = OrgNameIndex(
+    threshold=settings.ORG_NAME_MATCH_THRESHOLD,
+    cache_size=settings.ORG_NAME_CACHE_SIZE,
+)
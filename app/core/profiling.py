@@ -0,0 +1,159 @@
+"""
+Профилирование отдельного запроса по требованию, без передеплоя.
+
+Включается заданием PROFILING_TOKEN. Запрос с заголовком X-Profile-Token: <токен> выполняется под cProfile;
+отчет (.prof для snakeviz/pstats и сведения о запросе) сохраняется в PROFILING_DIR, где хранятся только
+последние PROFILING_MAX_REPORTS отчетов. Id отчета возвращается в заголовке X-Profile-Id,
+список и скачивание - /api/health/profiles (с тем же заголовком).
+
+cProfile снимает весь поток воркера, поэтому в отчет попадают и конкурентные запросы этого воркера;
+одновременно профилируется только один запрос, остальные запросы с токеном выполняются без профиля.
+"""
+import asyncio
+import cProfile
+import hmac
+import io
+import json
+import pstats
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core import get_settings, logger
+from app.core.request_context import request_id_var
+
+settings = get_settings()
+
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_SUFFIX = ".prof"
+META_SUFFIX = ".json"
+TEXT_REPORT_LINES = 60
+TEXT_REPORT_SORTS = ("cumulative", "tottime", "ncalls")
+# Служебные роуты не профилируются: просмотр отчетов вытеснял бы отчеты из кольца,
+# а /api/health/memory принимает тот же токен для управления tracemalloc
+SKIP_PATH_PREFIXES = ("/api/health", "/static")
+
+_UNSAFE_ID_CHARS = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def profiling_enabled() -> bool:
+    return bool(settings.PROFILING_TOKEN)
+
+
+def is_valid_profile_token(token: Optional[str]) -> bool:
+    # Сравниваем байты: compare_digest не принимает строки с не-ASCII символами, а заголовок может их содержать
+    return profiling_enabled() and token is not None and hmac.compare_digest(
+        token.encode("latin-1", "replace"), settings.PROFILING_TOKEN.encode()
+    )
+
+
+def profiles_dir() -> Path:
+    return Path(settings.PROFILING_DIR or Path(settings.TEMP_DIR) / "profiles")
+
+
+def _report_paths(report_id: str) -> Tuple[Path, Path]:
+    base = profiles_dir() / Path(report_id).name  # id не может выйти за пределы каталога
+    return base.with_suffix(PROFILE_SUFFIX), base.with_suffix(META_SUFFIX)
+
+
+def _save_report(profiler: cProfile.Profile, report_id: str, meta: Dict[str, Any]) -> None:
+    directory = profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    prof_path, meta_path = _report_paths(report_id)
+    profiler.dump_stats(prof_path)
+    stats = pstats.Stats(profiler)
+    meta.update(total_calls=stats.total_calls, profiled_seconds=round(stats.total_tt, 4))
+    meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    # Кольцо: старые отчеты удаляются
+    reports = sorted(directory.glob(f"*{PROFILE_SUFFIX}"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in reports[settings.PROFILING_MAX_REPORTS:]:
+        stale.unlink(missing_ok=True)
+        stale.with_suffix(META_SUFFIX).unlink(missing_ok=True)
+
+
+def list_profile_reports() -> List[Dict[str, Any]]:
+    """Сохраненные отчеты, новые первыми."""
+    directory = profiles_dir()
+    if not directory.is_dir():
+        return []
+    reports = []
+    for meta_path in directory.glob(f"*{META_SUFFIX}"):
+        try:
+            reports.append(json.loads(meta_path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return sorted(reports, key=lambda meta: meta.get("created_at", 0), reverse=True)
+
+
+def profile_report_path(report_id: str) -> Optional[Path]:
+    prof_path, _ = _report_paths(report_id)
+    return prof_path if prof_path.is_file() else None
+
+
+def profile_report_text(report_id: str, sort: str = "cumulative", lines: int = TEXT_REPORT_LINES) -> Optional[str]:
+    """Текстовый отчет pstats (топ функций по sort)."""
+    prof_path = profile_report_path(report_id)
+    if prof_path is None:
+        return None
+    buffer = io.StringIO()
+    pstats.Stats(str(prof_path), stream=buffer).strip_dirs().sort_stats(sort).print_stats(lines)
+    return buffer.getvalue()
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware: запрос с верным X-Profile-Token выполняется под cProfile."""
+
+    def __init__(self, app):
+        self.app = app
+        self._busy = False
+
+    @staticmethod
+    def _token(scope) -> Optional[str]:
+        target = PROFILE_TOKEN_HEADER.lower().encode()
+        for name, value in scope.get("headers", ()):
+            if name == target:
+                return value.decode("latin-1")
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_enabled() or self._busy \
+                or scope["path"].startswith(SKIP_PATH_PREFIXES) or not is_valid_profile_token(self._token(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        request_id = request_id_var.get() or "-"
+        report_id = _UNSAFE_ID_CHARS.sub("_", f"{time.strftime('%Y%m%d-%H%M%S')}-{request_id}")
+        meta: Dict[str, Any] = {
+            "id": report_id,
+            "request_id": request_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "created_at": time.time(),
+        }
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                meta["status"] = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()), (PROFILE_ID_HEADER.lower().encode(), report_id.encode())
+                ]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            meta["duration"] = round(time.perf_counter() - started, 4)
+            self._busy = False
+            try:
+                await asyncio.to_thread(_save_report, profiler, report_id, meta)
+                logger.info(f"Профиль запроса {scope['method']} {scope['path']} сохранен: {report_id}")
+            except OSError as e:
+                logger.error(f"Не удалось сохранить профиль запроса {report_id}: {e}")
@@ -0,0 +1,156 @@
+"""
+Таблица направивших медицинских организаций: Org_did (ЕВМИАС) -> итоговые name, nick, code (8 знаков),
+full_code (IDMO полностью), token.
+
+Цепочка разрешения (справочник referred_organizations -> ручной маппер referred_org_map -> F032 по токену ->
+нечеткий поиск по названию) выполняется один раз для всех организаций при каждой публикации справочников
+medical_organizations/referred_organizations, в фоне. Для события остается одно обращение к словарю,
+а организации, которые разрешить не удалось, видны заранее (unresolved).
+Совпадения нечеткого поиска в таблицу не попадают: до подтверждения оператором (записью в referred_org_map)
+они перечислены в unresolved вместе с кандидатом и оценкой, а для события организация не определяется.
+"""
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
+
+from app.core import get_settings, logger
+from app.core.handbooks import HandbookSnapshot, HandbooksStorage
+from app.core.mappings import referred_org_map
+from app.core.org_name_index import ORG_NAME_SOURCES, org_name_index
+
+settings = get_settings()
+
+
+def _final_org(name: Any, nick: Any, code: Any, token: Any, source: str) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "nick": nick,
+        "code": str(code)[:8] if code else None,
+        "full_code": str(code) if code else None,
+        "token": token,
+        "source": source,
+    }
+
+
+def resolve_referred_org(snapshot: HandbookSnapshot, evmias_org: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Итоговые сведения о направившей организации по записи справочника referred_organizations.
+    source: "map" - ручной маппер, "token" - F032 по OID, "name" - нечеткий поиск по названию
+    (только кандидат, см. is_confirmed).
+    """
+    org_evmias_name = evmias_org.get("name")
+    org_evmias_token = evmias_org.get("token")
+
+    org_map = referred_org_map.get(org_evmias_name) if org_evmias_name else None
+    if org_map:
+        return _final_org(org_map.get("name"), org_map.get("nick"), org_map.get("code"), org_map.get("token"), "map")
+
+    org_handbook = snapshot.lookup("medical_organizations", "by_token", org_evmias_token)
+    if org_handbook:
+        return _final_org(org_handbook.get("NAM_MOP"), org_handbook.get("NAM_MOK"), org_handbook.get("IDMO"),
+                          org_evmias_token, "token")
+
+    matched = org_name_index.resolve(org_evmias_name)
+    if matched:
+        org_match, score = matched
+        return {**_final_org(org_match.get("name"), org_match.get("nick"), org_match.get("code"),
+                             org_match.get("token"), "name"), "score": score}
+    return None
+
+
+def is_confirmed(org: Optional[Mapping[str, Any]]) -> bool:
+    """Организацию можно отдавать как направившую: найдена по ручному мапперу или по токену в F032."""
+    return org is not None and org.get("source") != "name"
+
+
+class ReferralOrgTable:
+    """Материализованная таблица Org_did -> направившая организация."""
+
+    def __init__(self):
+        self._table: Mapping[str, Dict[str, Any]] = MappingProxyType({})
+        self._unresolved: List[Dict[str, Any]] = []
+        self._build_lock = threading.Lock()
+        self._built_version: Optional[int] = None
+        self._bound = False
+        self.build_seconds: Optional[float] = None
+
+    def bind(self, handbooks_storage: HandbooksStorage) -> None:
+        """Перестраивает таблицу (и индекс названий МО) в фоне при каждом обновлении справочников-источников."""
+        if not self._bound:
+            handbooks_storage.add_listener(list(ORG_NAME_SOURCES), self.rebuild_in_background)
+            self._bound = True
+
+    def rebuild_in_background(self, snapshot: HandbookSnapshot) -> None:
+        threading.Thread(target=self.rebuild, args=(snapshot,), name="referral-orgs", daemon=True).start()
+
+    def rebuild(self, snapshot: HandbookSnapshot) -> None:
+        with self._build_lock:
+            if self._built_version is not None and self._built_version >= snapshot.version:
+                return
+            started = time.perf_counter()
+            org_name_index.rebuild(snapshot)
+
+            referred_organizations = snapshot.payloads.get("referred_organizations")
+            table: Dict[str, Dict[str, Any]] = {}
+            unresolved: List[Dict[str, Any]] = []
+            if isinstance(referred_organizations, Mapping):
+                for org_did, evmias_org in referred_organizations.items():
+                    if not isinstance(evmias_org, Mapping):
+                        continue
+                    org = resolve_referred_org(snapshot, evmias_org)
+                    if is_confirmed(org):
+                        table[str(org_did)] = org
+                        continue
+                    item = {"org_did": org_did, "name": evmias_org.get("name"), "token": evmias_org.get("token")}
+                    if org is not None:
+                        item.update(candidate=org, score=org.get("score"))
+                    unresolved.append(item)
+
+            self._table, self._unresolved = MappingProxyType(table), unresolved
+            self._built_version = snapshot.version
+            self.build_seconds = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Таблица направивших организаций построена по снимку v{snapshot.version}: "
+            f"{len(table)} разрешено, {len(unresolved)} без подтвержденного соответствия, {self.build_seconds} с"
+        )
+        if unresolved:
+            logger.warning(
+                f"Направившие организации без соответствия в F032: "
+                f"{', '.join(str(org['name']) for org in unresolved[:20])}"
+                f"{' ...' if len(unresolved) > 20 else ''}"
+            )
+
+    def get(self, org_did: Any) -> Optional[Dict[str, Any]]:
+        if org_did is None:
+            return None
+        return self._table.get(str(org_did))
+
+    async def resolve(self, handbooks_storage: HandbooksStorage, org_did: Any) -> Optional[Dict[str, Any]]:
+        """
+        Организация по Org_did: из таблицы, а если ее там нет (таблица еще строится после старта/обновления) -
+        той же цепочкой по текущему снимку.
+        """
+        org = self.get(org_did)
+        if org is not None or org_did is None:
+            return org
+        snapshot = await handbooks_storage.ensure_loaded("referred_organizations")
+        referred_organizations = snapshot.payloads.get("referred_organizations")
+        evmias_org = referred_organizations.get(org_did) if isinstance(referred_organizations, Mapping) else None
+        org = resolve_referred_org(snapshot, evmias_org) if isinstance(evmias_org, Mapping) else None
+        return org if is_confirmed(org) else None
+
+    def unresolved(self) -> List[Dict[str, Any]]:
+        return list(self._unresolved)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "snapshot_version": self._built_version,
+            "resolved": len(self._table),
+            "unresolved": len(self._unresolved),
+            "build_seconds": self.build_seconds,
+            "name_index": org_name_index.status(),
+        }
+
+
+referral_org_table = ReferralOrgTable()
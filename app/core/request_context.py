@@ -0,0 +1,80 @@
+"""
+Контекст текущего запроса: идентификаторы запроса и госпитализации в contextvars.
+
+RequestContextMiddleware назначает каждому HTTP-запросу request_id (берет из заголовка X-Request-ID
+или генерирует) и возвращает его в ответе. Сервисы, узнав ID госпитализации, вызывают set_event_id.
+Логгер добавляет оба идентификатора в каждую запись (см. app.core.logger_setup).
+Модуль не зависит от остального app.core, чтобы его можно было импортировать при настройке логгера.
+"""
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+event_id_var: ContextVar[Optional[str]] = ContextVar("event_id", default=None)
+
+# Запросы, которые сейчас обрабатывает воркер: request_id -> метод, путь, время начала
+_in_flight: Dict[str, Dict[str, Any]] = {}
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+def set_event_id(event_id: Any) -> None:
+    """Запоминает ID госпитализации, которую обрабатывает текущий запрос (для логов)."""
+    event_id_var.set(str(event_id) if event_id is not None else None)
+
+
+def in_flight_requests() -> List[Dict[str, Any]]:
+    """Запросы в работе, самые долгие первыми (с текущим event_id, если он уже известен)."""
+    now = time.time()
+    return sorted(
+        ({"request_id": request_id, **info, "elapsed": round(now - info["started_at"], 3)}
+         for request_id, info in _in_flight.items()),
+        key=lambda item: -item["elapsed"],
+    )
+
+
+def _header_request_id(scope: dict) -> Optional[str]:
+    target = REQUEST_ID_HEADER.lower().encode()
+    for name, value in scope.get("headers", ()):
+        if name == target:
+            # Чужой идентификатор принимаем только короткий и печатный, чтобы он не засорял логи
+            candidate = value.decode("latin-1")[:64]
+            return candidate if candidate.isprintable() else None
+    return None
+
+
+class RequestContextMiddleware:
+    """ASGI-middleware: request_id для каждого HTTP-запроса и заголовок X-Request-ID в ответе."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _header_request_id(scope) or uuid.uuid4().hex[:16]
+        while request_id in _in_flight:  # чужие X-Request-ID могут повторяться
+            request_id = f"{request_id}-{uuid.uuid4().hex[:4]}"
+        request_token = request_id_var.set(request_id)
+        _in_flight[request_id] = {"method": scope["method"], "path": scope["path"], "started_at": time.time()}
+        event_token = event_id_var.set(None)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (REQUEST_ID_HEADER.lower().encode(), request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _in_flight.pop(request_id, None)
+            event_id_var.reset(event_token)
+            request_id_var.reset(request_token)
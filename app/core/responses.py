@@ -0,0 +1,27 @@
+"""
+Быстрые JSON-ответы.
+
+По умолчанию приложение отвечает через ORJSONResponse (см. app.main). Для уже собранных Pydantic-моделей
+ответ формируется сразу из model_dump_json: FastAPI не проверяет модель повторно по response_model
+и не прогоняет ее через jsonable_encoder.
+"""
+from typing import Union
+
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def model_json_bytes(model: BaseModel) -> bytes:
+    """JSON модели (имена полей, не алиасы - как response_model_by_alias=False)."""
+    return model.model_dump_json(by_alias=False).encode()
+
+
+def json_bytes_response(payload: Union[bytes, BaseModel], status_code: int = 200) -> Response:
+    """Ответ из готовых JSON-байтов (например, из кэша) или из модели."""
+    content = model_json_bytes(payload) if isinstance(payload, BaseModel) else payload
+    return Response(content=content, status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+
+__all__ = ["ORJSONResponse", "json_bytes_response", "model_json_bytes", "JSON_MEDIA_TYPE"]
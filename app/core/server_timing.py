@@ -0,0 +1,93 @@
+"""
+Заголовок Server-Timing: на что ушло время запроса.
+
+ServerTimingMiddleware заводит на каждый HTTP-запрос словарь метрик в contextvars и при отправке ответа
+выводит его в Server-Timing (видно во вкладке Network браузера и в логах прокси). Метрики копятся через
+record_timing()/timed(): сессия ЕВМИАС (set_cookies), внешние вызовы по методам ЕВМИАС и ФИАС
+(HTTPXClient.fetch), обращения к справочникам, сам роут (route_handler). Одноименные метрики суммируются.
+Модуль не зависит от остального app.core, чтобы его можно было вызывать из любого слоя.
+"""
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+SERVER_TIMING_HEADER = b"server-timing"
+MAX_METRICS = 30  # заголовок не должен разрастаться: остальные метрики сворачиваются в "other"
+
+_INVALID_TOKEN_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# метрика -> [суммарное время (с), число вызовов, описание]
+_timings: ContextVar[Optional[Dict[str, list]]] = ContextVar("server_timings", default=None)
+
+
+def record_timing(metric: str, seconds: float, description: Optional[str] = None) -> None:
+    """Добавляет время к метрике текущего запроса (вне запроса ничего не делает)."""
+    timings = _timings.get()
+    if timings is None:
+        return
+    entry = timings.get(metric)
+    if entry is None:
+        if len(timings) >= MAX_METRICS:
+            metric, description = "other", None
+            entry = timings.get(metric)
+        if entry is None:
+            entry = timings[metric] = [0.0, 0, description]
+    entry[0] += seconds
+    entry[1] += 1
+
+
+@contextmanager
+def timed(metric: str, description: Optional[str] = None) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(metric, time.perf_counter() - started, description)
+
+
+def metric_token(name: str) -> str:
+    """Имя метрики в допустимом для заголовка виде (token: латиница, цифры, - _ .)."""
+    return _INVALID_TOKEN_CHARS.sub("-", name).strip("-") or "unnamed"
+
+
+def format_server_timing(timings: Dict[str, list], total: float) -> str:
+    parts: List[str] = [f"app;dur={total * 1000:.1f}"]
+    for metric, (seconds, count, description) in sorted(timings.items(), key=lambda item: -item[1][0]):
+        desc = (description or metric).replace('"', "'")
+        if count > 1:
+            desc = f"{desc} x{count}"
+        parts.append(f'{metric_token(metric)};dur={seconds * 1000:.1f};desc="{desc}"')
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """ASGI-middleware: собирает метрики запроса и добавляет заголовок Server-Timing к ответу."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings: Dict[str, list] = {}
+        token = _timings.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                value = format_server_timing(timings, time.perf_counter() - started)
+                # desc может содержать не-ASCII (пути, хосты) - заголовок обязан быть latin-1
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (SERVER_TIMING_HEADER, value.encode("latin-1", errors="replace")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
@@ -0,0 +1,254 @@
+"""
+Легковесная трассировка запросов.
+
+TracingMiddleware открывает трассу на каждый HTTP-запрос (корневой спан "METHOD путь").
+Вложенные спаны создаются через span(): шаги сбора данных (collect_event_data), каждая попытка
+HTTPXClient.fetch и т.п. Текущие трасса и спан хранятся в contextvars, поэтому спаны корректно
+вкладываются и в конкурентных задачах (asyncio.gather копирует контекст). Вне запроса span() ничего не делает.
+
+Завершенные трассы хранятся в кольцевом буфере (TRACING_BUFFER_SIZE) и доступны через
+/api/health/traces в виде «водопада». При заданном TRACING_OTLP_FILE каждая трасса дописывается
+в файл строкой OTLP/JSON (формат otlpjsonfile, читается OpenTelemetry Collector).
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from app.core import get_settings, logger
+from app.core.request_context import request_id_var
+
+settings = get_settings()
+
+MAX_SPANS_PER_TRACE = 500
+WATERFALL_WIDTH = 40
+SKIP_PATH_PREFIXES = ("/static",)
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float  # time.perf_counter()
+    start_unix: float  # time.time()
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+@dataclass(slots=True)
+class Trace:
+    trace_id: str
+    request_id: Optional[str]
+    spans: List[Span] = field(default_factory=list)
+    dropped_spans: int = 0
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Спан внутри текущей трассы. Ошибка внутри блока записывается в спан и пробрасывается дальше.
+    Вне трассы (фоновые задачи, старт приложения) возвращает None и ничего не записывает.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        span_id=_new_id(8),
+        parent_id=parent.span_id if parent is not None else None,
+        start=time.perf_counter(),
+        start_unix=time.time(),
+        attributes=attributes,
+    )
+    if len(trace.spans) < MAX_SPANS_PER_TRACE:
+        trace.spans.append(current)
+    else:
+        trace.dropped_spans += 1
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+class TraceBuffer:
+    """Кольцевой буфер последних завершенных трасс."""
+
+    def __init__(self, size: int):
+        self._traces: Deque[Trace] = deque(maxlen=size)
+
+    def add(self, trace: Trace) -> None:
+        self._traces.append(trace)
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        return next((t for t in self._traces if trace_id in (t.trace_id, t.request_id)), None)
+
+    def slowest(self, limit: int, path_prefix: Optional[str] = None) -> List[Trace]:
+        traces = [
+            t for t in self._traces
+            if not path_prefix or t.root.attributes.get("http.path", "").startswith(path_prefix)
+        ]
+        return sorted(traces, key=lambda t: t.root.duration, reverse=True)[:limit]
+
+
+trace_buffer = TraceBuffer(settings.TRACING_BUFFER_SIZE)
+
+
+def trace_waterfall(trace: Trace) -> Dict[str, Any]:
+    """Трасса в виде «водопада»: спаны по времени начала, смещение и длительность в мс, текстовая полоса."""
+    root = trace.root
+    total = max(root.duration, 1e-9)
+    depths: Dict[Optional[str], int] = {None: -1}
+    spans = []
+    for item in sorted(trace.spans, key=lambda s: s.start):
+        depth = depths.get(item.parent_id, 0) + 1
+        depths[item.span_id] = depth
+        offset = item.start - root.start
+        left = int(offset / total * WATERFALL_WIDTH)
+        width = max(1, round(item.duration / total * WATERFALL_WIDTH))
+        spans.append({
+            "name": item.name,
+            "depth": depth,
+            "offset_ms": round(offset * 1000, 1),
+            "duration_ms": round(item.duration * 1000, 1),
+            "bar": ("·" * left + "█" * width).ljust(WATERFALL_WIDTH, "·")[:WATERFALL_WIDTH],
+            "attributes": item.attributes,
+            "error": item.error,
+        })
+    return {
+        "trace_id": trace.trace_id,
+        "request_id": trace.request_id,
+        "name": root.name,
+        "started_at": root.start_unix,
+        "duration_ms": round(root.duration * 1000, 1),
+        "status": root.attributes.get("http.status_code"),
+        "dropped_spans": trace.dropped_spans,
+        "spans": spans,
+    }
+
+
+# ---- Экспорт в OTLP/JSON ----
+_export_lock = threading.Lock()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def trace_to_otlp(trace: Trace) -> Dict[str, Any]:
+    """Трасса в формате OTLP/JSON (ExportTraceServiceRequest)."""
+    spans = []
+    for item in trace.spans:
+        start_ns = int(item.start_unix * 1e9)
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": 2 if item.parent_id is None else 1,  # SERVER для корневого, INTERNAL для вложенных
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(item.duration * 1e9)),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items()],
+            "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+        }
+        if item.parent_id:
+            otlp_span["parentSpanId"] = item.parent_id
+        spans.append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": settings.TRACING_SERVICE_NAME}},
+            {"key": "service.instance.id", "value": {"stringValue": f"{os.getpid()}"}},
+        ]},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+    }]}
+
+
+def _append_otlp(path: str, trace: Trace) -> None:
+    line = json.dumps(trace_to_otlp(trace), ensure_ascii=False)
+    with _export_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+async def export_trace(trace: Trace) -> None:
+    if not settings.TRACING_OTLP_FILE:
+        return
+    try:
+        await asyncio.to_thread(_append_otlp, settings.TRACING_OTLP_FILE, trace)
+    except OSError as e:
+        logger.warning(f"Не удалось записать трассу в {settings.TRACING_OTLP_FILE}: {e}")
+
+
+class TracingMiddleware:
+    """ASGI-middleware: трасса на каждый HTTP-запрос (кроме статики), после ответа - в буфер и экспорт."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED or scope["path"].startswith(SKIP_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(trace_id=_new_id(16), request_id=request_id_var.get())
+        trace_token = _current_trace.set(trace)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+            await send(message)
+
+        try:
+            with span(f"{scope['method']} {scope['path']}", **{"http.method": scope["method"],
+                                                               "http.path": scope["path"]}) as root:
+                await self.app(scope, receive, send_with_status)
+        finally:
+            _current_trace.reset(trace_token)
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                # В трассе остается шаблон роута, а не сам путь: в пути бывают номера карт и другие данные пациента
+                trace.root.name = f"{scope['method']} {route.path}"
+                trace.root.attributes.update({"http.route": route.path, "http.path": route.path})
+            trace_buffer.add(trace)
+            await export_trace(trace)
@@ -10,9 +10,21 @@ from app.core import (
     shutdown_httpx_client,
     init_redis_client,
     shutdown_redis_client,
-    load_all_handbooks,
+    init_fias_services,
+    shutdown_fias_services,
+    start_handbooks_loading,
+    stop_handbooks_loading,
+    init_nsi_refresh_scheduler,
+    shutdown_nsi_refresh_scheduler,
+    init_handbooks_reload_subscriber,
+    shutdown_handbooks_reload_subscriber,
     HTTPXClient
 )
+from app.core.profiling import ProfilingMiddleware
+from app.core.request_context import RequestContextMiddleware
+from app.core.responses import ORJSONResponse
+from app.core.server_timing import ServerTimingMiddleware
+from app.core.tracing import TracingMiddleware
 from app.route import api_router, web_router
 
 
@@ -26,7 +38,10 @@ async def lifespan(app: FastAPI):
     await init_httpx_client(app)
     await init_redis_client(app)
     app.state.http_client_service = HTTPXClient(client=app.state.http_client)
-    await load_all_handbooks(app)
+    await init_fias_services(app)
+    await start_handbooks_loading(app)
+    await init_nsi_refresh_scheduler(app)
+    await init_handbooks_reload_subscriber(app)
     logger.info("Инициализация завершена.")
 
     # --- Приложение работает ---
@@ -34,9 +49,14 @@ async def lifespan(app: FastAPI):
 
     # --- Shutdown Phase ---
     logger.info("Завершение работы приложения...")
+    await shutdown_handbooks_reload_subscriber(app)
+    await shutdown_nsi_refresh_scheduler(app)
+    await stop_handbooks_loading(app)
+    await shutdown_fias_services(app)
     await shutdown_redis_client(app)  # Закрываем Redis перед HTTPX на всякий случай
     await shutdown_httpx_client(app)
     logger.info("Ресурсы освобождены.")
+    await logger.complete()  # дописываем записи из очереди логгера
 
 
 tags_metadata = [
@@ -47,9 +67,19 @@ app = FastAPI(
     openapi_tags=tags_metadata,
     title="Medical Extractor",
     description="Веб-приложение для сбора данных из ЕВМИАС и генерации XML.",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Профилирование отдельного запроса по X-Profile-Token (при заданном PROFILING_TOKEN)
+app.add_middleware(ProfilingMiddleware)
+# Трассировка запросов; RequestContextMiddleware добавляется последним, чтобы быть внешним (request_id уже задан)
+app.add_middleware(TracingMiddleware)
+# Заголовок Server-Timing (сессия, вызовы ЕВМИАС/ФИАС, справочники, роут)
+app.add_middleware(ServerTimingMiddleware)
+# request_id для логов и заголовка X-Request-ID
+app.add_middleware(RequestContextMiddleware)
+
 # Монтируем статику ДО подключения роутеров
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
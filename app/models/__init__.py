@@ -1,4 +1,5 @@
 from .patient import PatientSearch, EventSearch
+from .search_row import SearchRow, summarize_search_rows, search_rows_as_dicts
 from .event import PersonalData, HospitalizationData, ServiceData, InsuranceData, Event, AddressData
 
 
@@ -10,5 +11,8 @@ __all__ = [
     "ServiceData",
     "InsuranceData",
     "Event",
-    "AddressData"
+    "AddressData",
+    "SearchRow",
+    "summarize_search_rows",
+    "search_rows_as_dicts"
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 from pydantic import BaseModel, Field, model_validator
 
@@ -121,6 +121,10 @@ class ServiceData(BaseModel):
     }
 
 
+# Блоки Event, которые собираются из одной плоской строки ЕВМИАС (разбор алиасов - внутри моделей блоков)
+EVENT_FLAT_GROUPS: Tuple[str, ...] = ("personal", "hospitalization", "service", "insurance", "referral")
+
+
 # --- Основная модель Event ---
 class Event(BaseModel):
     """
@@ -147,17 +151,11 @@ class Event(BaseModel):
         if not isinstance(data, dict):
             raise ValueError("Input data for Event must be a dictionary")
 
-        # Создаем словарь, где ключи - имена полей Event (personal, hospitalization, service),
-        # а значения - это исходный словарь data. Pydantic сам разберется
-        # с алиасами внутри вложенных моделей PersonalData, HospitalizationCoreData, ServiceData.
-        grouped_data = {
-            "personal": data.copy(),  # Копируем, чтобы избежать мутаций, если data используется где-то еще
-            "hospitalization": data.copy(),
-            "service": data.copy(),
-            "insurance": data.copy(),  # Если страховка не найдена, используем пустой словарь
-            "referral": data.copy(),  # Если направление не найдено, используем пустой словарь
-            # Переносим поля для доп. данных, если они вдруг уже есть во входных данных
-            "operations": data.get("operations", []),
-            "diagnoses": data.get("diagnoses", [])
-        }
+        # Все блоки читают одну и ту же строку: Pydantic не изменяет входной словарь, а лишние ключи
+        # отбрасывает на стороне pydantic-core, поэтому копии строки для каждого блока не нужны.
+        grouped_data: Dict[str, Any] = dict.fromkeys(EVENT_FLAT_GROUPS, data)
+        # Переносим поля для доп. данных, если они вдруг уже есть во входных данных
+        grouped_data["operations"] = data.get("operations", [])
+        grouped_data["diagnoses"] = data.get("diagnoses", [])
         return grouped_data
+
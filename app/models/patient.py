@@ -69,3 +69,8 @@ class EventSearch(BaseModel):
         ]
 
     )
+    search_handle: Optional[str] = Field(
+        None,
+        description="Ключ строки поиска из ответа /get_patient (позволяет пропустить повторный поиск в ЕВМИАС)",
+        examples=[None],
+    )
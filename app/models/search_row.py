@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+# Поле SearchRow -> ключ строки Search/searchData (ответ /get_patient сохраняет ключи ЕВМИАС,
+# по ним работает интерфейс и запрос /get_event)
+SEARCH_ROW_FIELDS: Dict[str, str] = {
+    "event_id": "EvnPS_id",
+    "person_id": "Person_id",
+    "card_number": "EvnPS_NumCard",
+    "last_name": "Person_Surname",
+    "first_name": "Person_Firname",
+    "middle_name": "Person_Secname",
+    "birthday": "Person_Birthday",
+    "start_date": "EvnPS_setDate",
+    "end_date": "EvnPS_disDate",
+    "department_name": "LpuSection_Name",
+    "diagnosis_name": "Diag_Name",
+}
+
+
+@dataclass(slots=True, frozen=True)
+class SearchRow:
+    """
+    Компактная строка результата поиска госпитализаций: только поля, которые нужны интерфейсу
+    и запросу /get_event. Полная строка ЕВМИАС хранится в кэше поиска под search_handle.
+    """
+    event_id: Optional[str]
+    person_id: Optional[str]
+    card_number: Optional[str]
+    last_name: Optional[str]
+    first_name: Optional[str] = None
+    middle_name: Optional[str] = None
+    birthday: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    department_name: Optional[str] = None
+    diagnosis_name: Optional[str] = None
+    search_handle: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any], search_handle: Optional[str] = None) -> "SearchRow":
+        return cls(**{field: row.get(key) for field, key in SEARCH_ROW_FIELDS.items()}, search_handle=search_handle)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Словарь с ключами ЕВМИАС (как в ответе /get_patient); search_handle - только если есть."""
+        result = {key: getattr(self, field) for field, key in SEARCH_ROW_FIELDS.items()}
+        if self.search_handle is not None:
+            result["search_handle"] = self.search_handle
+        return result
+
+
+def summarize_search_rows(rows: List[SearchRow], sample: int = 3, max_length: int = 500) -> str:
+    """Краткая сводка для отладочного лога: число строк и несколько первых, не длиннее max_length символов."""
+    head = "; ".join(
+        f"{row.event_id} карта {row.card_number} {row.start_date}-{row.end_date or '...'}" for row in rows[:sample]
+    )
+    summary = f"{len(rows)} строк: {head}{' ...' if len(rows) > sample else ''}"
+    return summary if len(summary) <= max_length else summary[:max_length - 3] + "..."
+
+
+def search_rows_as_dicts(rows: Iterable[SearchRow]) -> List[Dict[str, Any]]:
+    return [row.as_dict() for row in rows]
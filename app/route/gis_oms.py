@@ -1,10 +1,21 @@
 from typing import List, Dict, Any, Annotated
 
+import redis.asyncio as redis
 from fastapi import APIRouter, Depends, Path
 
-from app.core import get_settings, HTTPXClient, get_http_service, logger, HandbooksStorage, get_handbooks_storage
+from app.core import (
+    get_settings,
+    HTTPXClient,
+    get_http_service,
+    logger,
+    HandbooksStorage,
+    get_handbooks_storage,
+    get_redis_client
+)
 from app.core.decorators import route_handler
+from app.core.responses import ORJSONResponse, json_bytes_response, model_json_bytes
 from app.models import PatientSearch, Event, EventSearch
+from app.services.gis_oms.event_cache import get_cached_event_bytes, cache_event_bytes
 from app.services import (
     set_cookies,
     fetch_and_filter,
@@ -17,7 +28,6 @@ settings = get_settings()
 router = APIRouter(prefix="/evmias-oms", tags=["Сбор данных о пациенте из ЕВМИАС"])
 
 
-@route_handler(debug=settings.DEBUG_ROUTE)
 @router.post(
     path="/get_patient",
     summary="Получить список госпитализаций пациента если в них есть операции",
@@ -30,23 +40,28 @@ router = APIRouter(prefix="/evmias-oms", tags=["Сбор данных о пац
         502: {"description": "Ошибка при получении данных от внешней системы (ЕВМИАС)"}
     }
 )
+@route_handler(debug=settings.DEBUG_ROUTE)
 async def get_patient(
         patient_search: PatientSearch,
         cookies: Annotated[dict[str, str], Depends(set_cookies)],
-        http_service: Annotated[HTTPXClient, Depends(get_http_service)]
+        http_service: Annotated[HTTPXClient, Depends(get_http_service)],
+        redis_client: Annotated[redis.Redis, Depends(get_redis_client)]
 ) -> List[Dict[str, Any]]:
     """
     Ищет госпитализации пациента по ФИО/дате рождения и возвращает список данных
     ТОЛЬКО тех госпитализаций, в которых подтверждено наличие операций.
+    Каждая запись содержит 'search_handle' для последующего запроса /get_event.
     """
-    return await fetch_and_filter(
+    rows = await fetch_and_filter(
         patient_search_data=patient_search,
         cookies=cookies,
-        http_service=http_service
+        http_service=http_service,
+        redis_client=redis_client
     )
+    # Сырые строки ЕВМИАС сериализуются orjson напрямую, без проверки по response_model и jsonable_encoder
+    return ORJSONResponse(content=rows)
 
 
-@route_handler(debug=settings.DEBUG_ROUTE)
 @router.post(
     path="/get_event",
     summary="Получение данных о пациенте, его госпитализации и операциях по ФИО и номеру карты",
@@ -60,31 +75,42 @@ async def get_patient(
         502: {"description": "Ошибка при получении данных от внешней системы (ЕВМИАС)"},
     }
 )
+@route_handler(debug=settings.DEBUG_ROUTE)
 async def get_event_details_by_fio_and_card_number(
         event_search: EventSearch,
         cookies: Annotated[dict[str, str], Depends(set_cookies)],
         http_service: Annotated[HTTPXClient, Depends(get_http_service)],
         storage: Annotated[HandbooksStorage, Depends(get_handbooks_storage)],
+        redis_client: Annotated[redis.Redis, Depends(get_redis_client)],
 ):
     """
     Сбор стартовых данных о госпитализации по ФИО пациента и номеру карты. (Фамилия и номер карты обязательны)
+    Если передан search_handle из /get_patient, стартовые данные берутся из кэша поиска.
+    При REDIS_EVENT_CACHE_TTL > 0 готовый ответ кэшируется и повторно отдается без сбора данных.
     """
     logger.info(
         f"Запрос деталей для карты № {event_search.card_number} "
         f"пациента с ФИО {event_search.last_name} {event_search.first_name} {event_search.middle_name}"
     )
+    cached = await get_cached_event_bytes(redis_client, event_search)
+    if cached is not None:
+        return json_bytes_response(cached)
+
     # Вызываем сервис. Он вернет словарь или выбросит исключение.
     # Исключения будут пойманы декоратором @route_handler.
     result = await collect_event_data_by_fio_and_card_number(
         cookies=cookies,
         http_service=http_service,
         handbooks_storage=storage,
-        event_search_data=event_search
+        event_search_data=event_search,
+        redis_client=redis_client
     )
-    return result
+    # Event уже проверен при сборке: сериализуем один раз, без повторной валидации по response_model
+    payload = model_json_bytes(result)
+    await cache_event_bytes(redis_client, event_search, payload)
+    return json_bytes_response(payload)
 
 
-@route_handler(debug=settings.DEBUG_ROUTE)
 @router.get(
     path="/get_event/{card_number}",
     summary="Получение данных о пациенте, его госпитализации и операциях по номеру карты",
@@ -98,6 +124,7 @@ async def get_event_details_by_fio_and_card_number(
         502: {"description": "Ошибка при получении данных от внешней системы (ЕВМИАС)"},
     }
 )
+@route_handler(debug=settings.DEBUG_ROUTE)
 async def get_event_details_by_card(
         cookies: Annotated[dict[str, str], Depends(set_cookies)],
         http_service: Annotated[HTTPXClient, Depends(get_http_service)],
@@ -116,4 +143,4 @@ async def get_event_details_by_card(
         handbooks_storage=storage,
         card_number=card_number
     )
-    return result
+    return json_bytes_response(result)
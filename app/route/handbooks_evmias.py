@@ -3,6 +3,9 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 
 from app.core import logger, HTTPXClient, get_settings, get_http_service, HandbooksStorage
+from app.core.handbook_query import handbook_summary
+from app.core.handbooks_reload import publish_handbook_refresh
+from app.core.referral_orgs import referral_org_table
 from app.services import set_cookies, save_handbook
 from app.services.handbooks.sync_evmias import sync_referred_by, sync_referred_org
 
@@ -31,6 +34,7 @@ async def get_referred_by_handbook(
     """
     Инициирует обновление справочника 'Кем направлен' (referred_by).
     Данные скачиваются, сохраняются на диск и обновляются в памяти.
+    В ответе - краткие сведения о справочнике; записи доступны через /api/handbooks/{имя}/records.
     """
 
     # Получаем экземпляр HandbooksStorage из app.state
@@ -52,9 +56,11 @@ async def get_referred_by_handbook(
     )
 
     if success:
+        version = await publish_handbook_refresh(getattr(request.app.state, "redis_client", None), "referred_by")
         return {
             "message": "Справочник 'referred_by' успешно обновлен.",
-            "data": handbooks_storage.handbooks.get("referred_by")
+            **handbook_summary(handbooks_storage, "referred_by"),
+            "cluster_version": version,
         }
     else:
         raise HTTPException(
@@ -75,6 +81,7 @@ async def get_referred_organizations_handbook(
     """
     Инициирует обновление справочника 'Организации, которые направляли пациента' (referred_organizations).
     Данные скачиваются, сохраняются на диск и обновляются в памяти.
+    В ответе - краткие сведения о справочнике; записи доступны через /api/handbooks/{имя}/records.
     """
     if not hasattr(request.app.state, 'handbooks_storage'):
         logger.error("HandbooksStorage не инициализирован в app.state. Невозможно обновить справочник.")
@@ -93,9 +100,11 @@ async def get_referred_organizations_handbook(
     )
 
     if success:
+        version = await publish_handbook_refresh(getattr(request.app.state, "redis_client", None), "referred_organizations")
         return {
             "message": "Справочник 'referred_organizations' успешно обновлен.",
-            "data": handbooks_storage.handbooks.get("referred_organizations")
+            **handbook_summary(handbooks_storage, "referred_organizations"),
+            "cluster_version": version,
         }
     else:
         raise HTTPException(
@@ -104,6 +113,20 @@ async def get_referred_organizations_handbook(
         )
 
 
+@router.get(
+    path="/referred_organizations/unresolved",
+    summary="Направившие организации без соответствия в справочнике МО (F032)"
+)
+async def get_unresolved_referred_organizations():
+    """
+    Организации справочника 'referred_organizations', для которых при последней сборке таблицы направивших
+    организаций не нашлось ни записи в referred_org_map, ни МО в F032 по токену. Если нечеткий поиск
+    по названию нашел МО, она приведена в candidate с оценкой score - для подтверждения оператором
+    (добавлением в referred_org_map).
+    """
+    return {**referral_org_table.status(), "data": referral_org_table.unresolved()}
+
+
 @router.get("/lpu_departments")
 async def get_lpu_departments_handbook(
         cookies: dict = Depends(set_cookies),
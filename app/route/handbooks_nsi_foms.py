@@ -3,8 +3,12 @@ from typing import Annotated
 from fastapi import APIRouter, Query, Depends, Request, HTTPException, status
 
 from app.core import HTTPXClient, get_http_service, HandbooksStorage, logger
+from app.core.handbook_query import handbook_summary
+from app.core.handbooks import to_storage_form
+from app.core.handbooks_reload import publish_handbook_refresh
 from app.core.mappings import nsi_handbooks_mapper
 from app.services.handbooks.nsi_ffoms import fetch_and_process_handbook
+from app.services.nsi_refresh.scheduler import nsi_refresh_scheduler
 
 router = APIRouter(prefix="/nsi_foms_handbooks", tags=["Справочники НСИ ФОМС"])
 
@@ -13,7 +17,8 @@ router = APIRouter(prefix="/nsi_foms_handbooks", tags=["Справочники 
     path="/get_handbook",
     summary="Обновить справочник НСИ ФОМС по коду",
     description="Инициирует загрузку/обновление справочника НСИ ФОМС по его коду. "
-                "Данные скачиваются, сохраняются на диск и обновляются в памяти приложения."
+                "Данные скачиваются, сохраняются на диск и обновляются в памяти приложения. "
+                "В ответе - краткие сведения о справочнике, записи - через /api/handbooks/{имя}/records."
 )
 async def get_or_update_nsi_handbook(
         request: Request,
@@ -37,11 +42,13 @@ async def get_or_update_nsi_handbook(
 
         # Если данные успешно получены, обновляем storage
         if processed_data is not None:
-            handbooks_storage.handbooks[storage_key] = processed_data
+            await handbooks_storage.replace_async({storage_key: await to_storage_form(storage_key, processed_data)})
             logger.info(f"НСИ '{storage_key}' обновлен в памяти.")
+            version = await publish_handbook_refresh(getattr(request.app.state, "redis_client", None), storage_key)
             return {
                 "message": f"Справочник '{storage_key}' (код {code}) обновлен.",
-                "data": processed_data
+                **handbook_summary(handbooks_storage, storage_key),
+                "cluster_version": version,
             }
         else:
             raise HTTPException(
@@ -57,3 +64,12 @@ async def get_or_update_nsi_handbook(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка обновления {code}"
         )
+
+
+@router.get(
+    path="/refresh_status",
+    summary="Состояние фонового обновления справочников НСИ",
+    description="Результат последней проверки по каждому коду: unchanged, updated, reloaded_from_disk, locked, failed."
+)
+async def get_nsi_refresh_status():
+    return nsi_refresh_scheduler.status()
@@ -0,0 +1,73 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status
+
+from app.core import HandbooksStorage, get_handbooks_storage
+from app.core.handbook_query import (
+    MAX_PAGE_SIZE,
+    CursorExpiredError,
+    get_handbook_record,
+    handbooks_overview,
+    query_handbook,
+)
+
+router = APIRouter(prefix="/handbooks", tags=["Просмотр справочников"])
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[list]:
+    return [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+
+
+@router.get(path="", summary="Список справочников")
+async def list_handbooks(
+        request: Request,
+        handbooks_storage: Annotated[HandbooksStorage, Depends(get_handbooks_storage)]
+):
+    """Справочники в памяти: состояние загрузки, число записей, индексы, время последнего обновления."""
+    return handbooks_overview(handbooks_storage, getattr(request.app.state, "expected_handbooks", None))
+
+
+@router.get(path="/{handbook_name}/records", summary="Записи справочника с поиском и пагинацией")
+async def list_handbook_records(
+        handbooks_storage: Annotated[HandbooksStorage, Depends(get_handbooks_storage)],
+        handbook_name: str = Path(..., description="Ключ справочника", example="medical_organizations"),
+        q: Optional[str] = Query(None, description="Строка поиска (без учета регистра)", example="кольская"),
+        field: Optional[str] = Query(None, description="Поле поиска; по умолчанию - ключ записи", example="NAM_MOK"),
+        match: str = Query("contains", description="prefix или contains"),
+        fields: Optional[str] = Query(None, description="Возвращаемые поля через запятую", example="NAM_MOK,IDMO"),
+        cursor: Optional[str] = Query(None, description="next_cursor из предыдущего ответа"),
+        limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Записей на странице"),
+):
+    """
+    Записи справочника страницами. Префиксный поиск по полям с индексом (by_name, by_code, ...) идет
+    по отсортированным значениям, остальные - просмотром записей. Следующая страница - с параметром cursor=next_cursor.
+    """
+    snapshot = await handbooks_storage.ensure_loaded(handbook_name)
+    try:
+        return query_handbook(
+            snapshot, handbook_name, q=q, field=field, match=match,
+            fields=_parse_fields(fields), cursor=cursor, limit=limit,
+        )
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Справочник '{handbook_name}' не найден")
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get(path="/{handbook_name}/records/{key:path}", summary="Запись справочника по ключу")
+async def get_handbook_record_by_key(
+        handbooks_storage: Annotated[HandbooksStorage, Depends(get_handbooks_storage)],
+        handbook_name: str = Path(..., description="Ключ справочника", example="medical_organizations"),
+        key: str = Path(..., description="Ключ записи (например, OID МО)"),
+        fields: Optional[str] = Query(None, description="Возвращаемые поля через запятую"),
+):
+    snapshot = await handbooks_storage.ensure_loaded(handbook_name)
+    try:
+        record = get_handbook_record(snapshot, handbook_name, key, _parse_fields(fields))
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Справочник '{handbook_name}' не найден")
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Запись '{key}' не найдена")
+    return {"handbook": handbook_name, "key": key, "data": record}
@@ -1,6 +1,28 @@
-from fastapi import APIRouter, Depends
+import asyncio
+from typing import Annotated, Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 
 from app.core import get_settings, HTTPXClient, get_http_service
+from app.core.dependencies import verify_profile_token
+from app.core.handbooks_reload import get_handbook_acks, handbook_reload_subscriber
+from app.core.handbook_query import sorted_index_keys_count
+from app.core.logger_setup import debug_sampler
+from app.core.memory_stats import handbooks_memory, process_memory, tasks_summary, tracemalloc_sampler
+from app.core.org_name_index import org_name_index
+from app.core.profiling import (
+    TEXT_REPORT_SORTS,
+    is_valid_profile_token,
+    list_profile_reports,
+    profile_report_path,
+    profile_report_text,
+)
+from app.core.referral_orgs import referral_org_table
+from app.core.request_context import in_flight_requests
+from app.core.tracing import trace_buffer, trace_waterfall
+from app.services.fias.address_cache import address_cache
+from app.services.fias.offline_index import offline_okato_resolver
 
 settings = get_settings()
 
@@ -18,3 +40,135 @@ async def test(http_service: HTTPXClient = Depends(get_http_service)):
     data = {"scode": "I11.9"}
     response = await http_service.fetch(url=url, method="POST", data=data)
     return [response["text"]]
+
+
+@router.get("/fias-cache", summary="Статистика кэша адресов ФИАС")
+async def fias_cache_stats():
+    """
+    Попадания/промахи кэша адресов ФИАС и доля запросов, обслуженных без обращения к ФИАС (hit_ratio),
+    а также статистика офлайн-индекса ОКАТО.
+    """
+    return {**address_cache.stats(), "offline_index": offline_okato_resolver.stats()}
+
+
+@router.get("/ready", summary="Готовность приложения (загрузка справочников)")
+async def readiness(request: Request):
+    """
+    Готово ли приложение обслуживать запросы: закончена ли стартовая загрузка справочников.
+    По каждому справочнику: "hot" - в памяти, "lazy" - загрузится при первом обращении, "missing" - нет.
+    Пока загрузка идет, отвечает 503.
+    """
+    storage = request.app.state.handbooks_storage
+    content = {
+        "ready": storage.is_ready,
+        "snapshot_version": storage.snapshot.version,
+        "handbooks": storage.status(getattr(request.app.state, "expected_handbooks", None)),
+    }
+    return JSONResponse(content=content, status_code=200 if storage.is_ready else 503)
+
+
+@router.get("/handbooks-reload", summary="Согласованность версий справочников между воркерами")
+async def handbooks_reload_status(request: Request):
+    """
+    Версии справочников в Redis и подтвержденные каждым воркером версии (acks),
+    а также состояние подписки текущего воркера.
+    """
+    storage = request.app.state.handbooks_storage
+    return {
+        "worker": handbook_reload_subscriber.status(),
+        "handbooks": await get_handbook_acks(request.app.state.redis_client, storage.status()),
+    }
+
+
+@router.get("/traces", summary="Самые медленные из последних запросов (трассы)",
+            dependencies=[Depends(verify_profile_token)])
+async def slowest_traces(
+        limit: int = Query(10, ge=1, le=100),
+        path: Optional[str] = Query(None, description="Только запросы с шаблоном роута, начинающимся с этой строки"),
+):
+    """
+    Последние трассы запросов текущего воркера, от самых медленных: спаны шагов сбора данных и внешних
+    вызовов (ЕВМИАС, ФИАС) со смещением от начала запроса, длительностью и текстовой полосой «водопада».
+    Доступ - с заголовком X-Profile-Token, как и к профилям: в спанах бывают тексты ошибок.
+    """
+    return {
+        "buffered": len(trace_buffer),
+        "traces": [trace_waterfall(trace) for trace in trace_buffer.slowest(limit, path)],
+    }
+
+
+@router.get("/traces/{trace_id}", summary="Трасса запроса по trace_id или X-Request-ID",
+            dependencies=[Depends(verify_profile_token)])
+async def get_trace(trace_id: str):
+    trace = trace_buffer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Трасса не найдена (или уже вытеснена)")
+    return trace_waterfall(trace)
+
+
+@router.get("/profiles", summary="Сохраненные профили запросов", dependencies=[Depends(verify_profile_token)])
+async def profiles():
+    """
+    Отчеты профилировщика (новые первыми). Профиль снимается с запроса, отправленного с заголовком
+    X-Profile-Token: <PROFILING_TOKEN>; id отчета приходит в заголовке ответа X-Profile-Id.
+    """
+    return await asyncio.to_thread(list_profile_reports)
+
+
+@router.get("/profiles/{report_id}", summary="Скачать профиль запроса", dependencies=[Depends(verify_profile_token)])
+async def profile_report(
+        report_id: str,
+        output: Literal["text", "prof"] = Query("text", alias="format",
+                                                description="text - топ функций pstats, prof - файл для snakeviz/pstats"),
+        sort: Literal[TEXT_REPORT_SORTS] = Query("cumulative"),
+):
+    if output == "prof":
+        path = profile_report_path(report_id)
+        if path is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Отчет не найден")
+        return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+    text = await asyncio.to_thread(profile_report_text, report_id, sort)
+    if text is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Отчет не найден")
+    return PlainTextResponse(text)
+
+
+@router.get("/memory", summary="Память воркера: справочники, кэши, запросы и задачи в работе")
+async def memory(
+        request: Request,
+        top: int = Query(20, ge=1, le=100),
+        tracemalloc: Optional[Literal["start", "diff", "stop"]] = Query(
+            None, description="start - включить tracemalloc, diff - топ мест аллокаций с прошлого снимка, stop - выключить"
+        ),
+        x_profile_token: Annotated[Optional[str], Header()] = None,
+):
+    """
+    Приблизительный размер каждого справочника и его индексов, число записей в кэшах, запросы и asyncio-задачи
+    в работе, RSS процесса. Управление tracemalloc замедляет воркер, поэтому требует X-Profile-Token.
+    """
+    if tracemalloc is not None and not is_valid_profile_token(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="tracemalloc доступен только с X-Profile-Token")
+
+    storage = request.app.state.handbooks_storage
+    content = {
+        "process": await asyncio.to_thread(process_memory),
+        "handbooks": await asyncio.to_thread(handbooks_memory, storage),
+        "caches": {
+            "fias_addresses": address_cache.stats()["memory_entries"],
+            "org_names": {key: org_name_index.status()[key] for key in ("entries", "cached")},
+            "referral_orgs": referral_org_table.status()["resolved"],
+            "handbook_query_sorted_keys": sorted_index_keys_count(),
+            "traces": len(trace_buffer),
+            "log_sampler": debug_sampler.stats(),
+        },
+        "in_flight": {"requests": in_flight_requests(), "tasks": tasks_summary(top)},
+    }
+    if tracemalloc == "start":
+        content["tracemalloc"] = tracemalloc_sampler.start(settings.MEMORY_TRACEMALLOC_FRAMES)
+    elif tracemalloc == "diff":
+        content["tracemalloc"] = await asyncio.to_thread(tracemalloc_sampler.diff, top)
+    elif tracemalloc == "stop":
+        content["tracemalloc"] = tracemalloc_sampler.stop()
+    else:
+        content["tracemalloc"] = tracemalloc_sampler.status()
+    return content
@@ -4,7 +4,7 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, Path, Body, Query, Request
 
 from app.core import HTTPXClient, get_http_service, get_settings, HandbooksStorage
-from app.core.mappings import referred_org_map
+from app.core.referral_orgs import referral_org_table
 from app.services import set_cookies, get_okato_code, get_patient_operations
 
 settings = get_settings()
@@ -189,16 +189,8 @@ async def get_patients_data_for_period(
 
     # Получаем сведения о направлениях на госпитализацию.
     handbooks_storage: HandbooksStorage = request.app.state.handbooks_storage
-    handbook_referred_organizations = handbooks_storage.handbooks.get("referred_organizations", None)
-    handbook_medical_organizations = handbooks_storage.handbooks.get("medical_organizations").get("data", None)
-    handbook_medical_organizations_params = handbooks_storage.handbooks.get("medical_organizations").get("params", None)
 
     hosp_outside = {}
-    org_names = []
-    with_found_code = []
-    without_found_code = {
-        "params": handbook_medical_organizations_params,
-    }
 
     for event_id, event_data in hospitalizations.items():
         url = BASE_URL
@@ -224,41 +216,18 @@ async def get_patients_data_for_period(
         referred_by_id = str(referral_data.get("PrehospDirect_id", None))
         referred_org_id = referral_data.get("Org_did")
 
-        referred_data = handbook_referred_organizations.get(referred_org_id, None)
-        try:
-            org_evmias_name = referred_data.get("name")
-            org_evmias_nick = referred_data.get("nick")
-            org_evmias_token = referred_data.get("token")
-            org_evmias_code = referred_data.get("code")
-            org_evmias_f003code = referred_data.get("f003code")
-            org_evmias_address = referred_data.get("address")
-        except Exception:
-            continue
-
-        org_names.append(org_evmias_name)
-
         if referred_by_id == "2":
-            if org_evmias_name in referred_org_map.keys():
-                org_map = referred_org_map.get(org_evmias_name)
-                event_data.update({
-                    "referred_by_id": referred_by_id,
-                    "org_name": org_map.get("name"),
-                    "org_nick": org_map.get("nick"),
-                    "org_code": org_map.get("code"),
-                    "org_code_8": org_map.get("code")[0:8],
-                    "org_token": org_map.get("token"),
-                })
-            elif org_evmias_name not in referred_org_map.keys():
-                org_handbook = handbook_medical_organizations.get(org_evmias_token)[0]
-                event_data.update({
-                    "referred_by_id": referred_by_id,
-                    "org_name": org_handbook.get("NAM_MOP"),
-                    "org_nick": org_handbook.get("NAM_MOK"),
-                    "org_code": org_handbook.get("IDMO"),
-                    "org_code_8": org_handbook.get("IDMO")[0:8],
-                    "org_token": org_evmias_token,
-
-                })
+            org = await referral_org_table.resolve(handbooks_storage, referred_org_id)
+            if org is None:
+                continue
+            event_data.update({
+                "referred_by_id": referred_by_id,
+                "org_name": org.get("name"),
+                "org_nick": org.get("nick"),
+                "org_code": org.get("full_code"),
+                "org_code_8": org.get("code"),
+                "org_token": org.get("token"),
+            })
 
     #         event_data.update({
     #             "referred_by_id": referred_by_id,
@@ -307,7 +276,8 @@ async def get_patients_data_for_period(
         #     "data": with_found_code,
         # },
         # "without_found_code": without_found_code,
-        "hosp_outside": hosp_outside
+        "hosp_outside": hosp_outside,
+        "unresolved_orgs": referral_org_table.unresolved(),
     }
 
 
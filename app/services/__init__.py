@@ -5,13 +5,16 @@ from .tools.tools import (
     is_zip_file,
     extract_zip_safely,
     save_handbook,
-    get_handbook_payload
+    get_handbook_payload,
+    iter_zip_xml_records,
+    build_keyed_handbook_from_zip,
+    parse_nsi_zip_streaming
 )
 from .gis_oms.gis_oms import fetch_and_filter, get_patient_operations
 from .gis_oms.event_polist_id import get_polis_id
 from .gis_oms.event_start_data import get_starter_patient_data
 from .gis_oms.event_additional_data import enrich_event_additional_patient_data
-from .gis_oms.event_okato import enrich_event_okato_codes_for_patient_address
+from .gis_oms.event_okato import enrich_event_okato_codes_for_patient_address, enrich_events_okato_codes
 from .gis_oms.event_insurance import enrich_insurance_data
 from .gis_oms.event_hospital_referral import enrich_event_hospital_referral
 from .gis_oms.collect_event_data import collect_event_data_by_card_number, collect_event_data_by_fio_and_card_number
@@ -37,10 +40,14 @@ __all__ = [
     "get_starter_patient_data",
     "enrich_event_additional_patient_data",
     "enrich_event_okato_codes_for_patient_address",
+    "enrich_events_okato_codes",
     "enrich_insurance_data",
     "enrich_event_hospital_referral",
     "sync_referred_by",
     "sync_referred_org",
     "get_patient_operations",
-    "get_handbook_payload"
+    "get_handbook_payload",
+    "iter_zip_xml_records",
+    "build_keyed_handbook_from_zip",
+    "parse_nsi_zip_streaming"
 ]
\ No newline at end of file
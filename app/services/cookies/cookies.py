@@ -12,6 +12,7 @@ from app.core import (
     HTTPXClient,
     get_redis_client
 )
+from app.core.server_timing import timed
 
 settings = get_settings()
 
@@ -244,38 +245,40 @@ async def set_cookies(
     Возвращает словарь с действительными cookies.
     Выбрасывает HTTPException при невозможности получить/обновить cookies.
     """
-    try:
-        # Передаем зависимости явно в check_existing_cookies
-        if await check_existing_cookies(redis_client=redis_client, http_service=http_service):
-            logger.debug("Используем существующие валидные cookies из Redis.")
-            # Передаем зависимость явно в load_cookies_from_redis
-            cookies = await load_cookies_from_redis(redis_client=redis_client)
-            # Доп. проверка на случай, если cookies исчезли между проверкой и загрузкой
-            if not cookies:
-                logger.warning("cookies исчезли из Redis после проверки валидности. Получаем новые.")
+    # Время проверки/получения сессии попадает в Server-Timing (метрика session)
+    with timed("session", "EVMIAS session (set_cookies)"):
+        try:
+            # Передаем зависимости явно в check_existing_cookies
+            if await check_existing_cookies(redis_client=redis_client, http_service=http_service):
+                logger.debug("Используем существующие валидные cookies из Redis.")
+                # Передаем зависимость явно в load_cookies_from_redis
+                cookies = await load_cookies_from_redis(redis_client=redis_client)
+                # Доп. проверка на случай, если cookies исчезли между проверкой и загрузкой
+                if not cookies:
+                    logger.warning("cookies исчезли из Redis после проверки валидности. Получаем новые.")
+                    cookies = await get_new_cookies(http_service=http_service, redis_client=redis_client)
+            else:
+                logger.info("Существующие cookies невалидны или отсутствуют. Получаем новые.")
+                # Передаем зависимости явно в get_new_cookies
                 cookies = await get_new_cookies(http_service=http_service, redis_client=redis_client)
-        else:
-            logger.info("Существующие cookies невалидны или отсутствуют. Получаем новые.")
-            # Передаем зависимости явно в get_new_cookies
-            cookies = await get_new_cookies(http_service=http_service, redis_client=redis_client)
 
-        if not cookies:
-            # Эта ситуация не должна произойти, если get_new_cookies работает правильно
-            logger.critical("Не удалось получить или загрузить cookies после всех попыток!")
+            if not cookies:
+                # Эта ситуация не должна произойти, если get_new_cookies работает правильно
+                logger.critical("Не удалось получить или загрузить cookies после всех попыток!")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Не удалось установить сессию ЕВМИАС"
+                )
+
+            return cookies
+
+        except HTTPException as e:
+            # Пробрасываем HTTP ошибки, которые могли возникнуть в check_existing или get_new
+            raise e
+        except Exception as e:
+            # Ловим остальные неожиданные ошибки на этом уровне
+            logger.critical(f"Критическая ошибка в set_cookies: {e}", exc_info=True)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Не удалось установить сессию ЕВМИАС"
+                detail="Внутренняя ошибка при управлении сессией"
             )
-
-        return cookies
-
-    except HTTPException as e:
-        # Пробрасываем HTTP ошибки, которые могли возникнуть в check_existing или get_new
-        raise e
-    except Exception as e:
-        # Ловим остальные неожиданные ошибки на этом уровне
-        logger.critical(f"Критическая ошибка в set_cookies: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Внутренняя ошибка при управлении сессией"
-        )
@@ -0,0 +1,214 @@
+"""
+Кэш результатов поиска адресов в ФИАС (адрес -> полный адрес + ОКАТО).
+
+Ключ - нормализованная строка адреса (регистр, пробелы, пунктуация и типовые сокращения свернуты),
+поэтому "г. Мурманск, ул. Ленина, д. 1" и "ГОРОД Мурманск, улица Ленина, дом 1" дают одну запись.
+Уровни: память процесса (LRU) -> Redis (общий для воркеров) -> снимок на диске для холодного старта.
+Отрицательные ответы ФИАС (404) кэшируются с более коротким TTL.
+"""
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.core import get_settings, logger
+from app.core.atomic_files import atomic_write
+
+settings = get_settings()
+
+# Синонимы типов адресных объектов -> каноническое сокращение
+_ADDRESS_ABBREVIATIONS = {
+    "город": "г", "гор": "г", "г": "г",
+    "улица": "ул", "ул": "ул",
+    "дом": "д", "д": "д",
+    "корпус": "к", "корп": "к", "к": "к",
+    "строение": "стр", "стр": "стр",
+    "квартира": "кв", "кв": "кв",
+    "область": "обл", "обл": "обл",
+    "район": "р-н", "р-н": "р-н", "р-он": "р-н", "рн": "р-н",
+    "поселок": "п", "пос": "п", "п": "п",
+    "пгт": "пгт",
+    "село": "с", "с": "с",
+    "деревня": "дер", "дер": "дер",
+    "проспект": "пр-кт", "пр-кт": "пр-кт", "пр-т": "пр-кт", "просп": "пр-кт",
+    "переулок": "пер", "пер": "пер",
+    "проезд": "пр-д", "пр-д": "пр-д",
+    "площадь": "пл", "пл": "пл",
+    "бульвар": "б-р", "б-р": "б-р", "бул": "б-р",
+    "набережная": "наб", "наб": "наб",
+    "шоссе": "ш", "ш": "ш",
+    "тупик": "туп", "туп": "туп",
+    "микрорайон": "мкр", "мкр": "мкр", "мкрн": "мкр",
+    "республика": "респ", "респ": "респ",
+    "край": "край",
+    "ао": "ао",
+}
+# Канонические обозначения типов адресных объектов (после нормализации)
+ADDRESS_TYPE_TOKENS = frozenset(_ADDRESS_ABBREVIATIONS.values())
+# Слова, не влияющие на результат поиска
+_ADDRESS_NOISE = {"россия", "рф", "российская", "федерация"}
+_POSTAL_CODE_RE = re.compile(r"^\d{6}$")
+_SEPARATORS_RE = re.compile(r"[,.;:()\"«»]+")
+_SPACES_RE = re.compile(r"\s+")
+# Слитное написание типа и номера: "д1", "кв5", "корп2"
+_GLUED_NUMBER_RE = re.compile(r"\b(дом|д|кв|корп|к|стр)(\d)")
+
+
+def normalize_address(address: str) -> str:
+    """Приводит строку адреса к каноническому виду для использования в качестве ключа кэша."""
+    text = address.lower().replace("ё", "е").replace("№", " ")
+    text = _SEPARATORS_RE.sub(" ", text)
+    text = _GLUED_NUMBER_RE.sub(r"\1 \2", text)
+    text = text.replace("поселок городского типа", "пгт").replace("автономный округ", "ао")
+    tokens = []
+    for token in _SPACES_RE.split(text.strip()):
+        if not token or token in _ADDRESS_NOISE or _POSTAL_CODE_RE.match(token):
+            continue
+        tokens.append(_ADDRESS_ABBREVIATIONS.get(token, token))
+    return " ".join(tokens)
+
+
+class AddressResolutionCache:
+    """Многоуровневый кэш результатов ФИАС с учетом попаданий."""
+
+    def __init__(self, ttl: int, negative_ttl: int, memory_size: int, redis_prefix: str, snapshot_path: Path):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory_size = memory_size
+        self.redis_prefix = redis_prefix
+        self.snapshot_path = snapshot_path
+        # normalized_address -> (expires_at, result | None)
+        self._memory: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._redis: Optional[redis.Redis] = None
+        self._stats = {"memory_hits": 0, "redis_hits": 0, "negative_hits": 0, "misses": 0, "stored": 0}
+
+    def bind_redis(self, redis_client: Optional[redis.Redis]) -> None:
+        self._redis = redis_client
+
+    def _remember(self, key: str, expires_at: float, result: Optional[Dict[str, Any]]) -> None:
+        self._memory[key] = (expires_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def get(self, address: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Ищет адрес в кэше. Возвращает (найдено_в_кэше, результат).
+        Результат None при найдено_в_кэше=True означает закэшированный отрицательный ответ ФИАС.
+        """
+        key = normalize_address(address)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if now < expires_at:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                if result is None:
+                    self._stats["negative_hits"] += 1
+                return True, result
+            del self._memory[key]
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(f"{self.redis_prefix}{key}")
+            except RedisError as e:
+                logger.warning(f"Ошибка Redis при чтении кэша адресов ФИАС: {e}")
+                raw = None
+            if raw is not None:
+                try:
+                    cached = json.loads(raw)
+                    result = cached.get("result")
+                    self._remember(key, float(cached.get("expires_at", now + self.negative_ttl)), result)
+                    self._stats["redis_hits"] += 1
+                    if result is None:
+                        self._stats["negative_hits"] += 1
+                    return True, result
+                except (UnicodeDecodeError, json.JSONDecodeError, AttributeError, TypeError, ValueError) as e:
+                    logger.warning(f"Поврежденная запись кэша адресов ФИАС для '{key[:60]}': {e}")
+
+        self._stats["misses"] += 1
+        return False, None
+
+    async def put(self, address: str, result: Optional[Dict[str, Any]]) -> None:
+        """Сохраняет результат ФИАС (None - адрес не найден, хранится negative_ttl секунд)."""
+        key = normalize_address(address)
+        ttl = self.ttl if result is not None else self.negative_ttl
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, result)
+        self._stats["stored"] += 1
+
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(
+                f"{self.redis_prefix}{key}",
+                json.dumps({"result": result, "expires_at": expires_at}, ensure_ascii=False),
+                ex=ttl
+            )
+        except RedisError as e:
+            logger.warning(f"Ошибка Redis при сохранении кэша адресов ФИАС: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий кэша и доля запросов, обслуженных без обращения к ФИАС."""
+        hits = self._stats["memory_hits"] + self._stats["redis_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "lookups": lookups,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _read_snapshot(self) -> Dict[str, Any]:
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("entries", {})
+
+    def _write_snapshot(self, entries: Dict[str, Tuple[float, Optional[Dict[str, Any]]]]) -> int:
+        now = time.time()
+        with atomic_write(self.snapshot_path, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": now, "entries": entries}, f, ensure_ascii=False)
+        return len(entries)
+
+    async def load_snapshot(self) -> None:
+        """Прогревает кэш в памяти из снимка на диске (если он есть)."""
+        try:
+            entries = await asyncio.to_thread(self._read_snapshot)
+            now = time.time()
+            loaded = 0
+            for key, (expires_at, result) in entries.items():
+                if now < expires_at:
+                    self._remember(key, expires_at, result)
+                    loaded += 1
+            logger.info(f"Кэш адресов ФИАС: загружено {loaded} записей из {self.snapshot_path}")
+        except FileNotFoundError:
+            logger.info(f"Снимок кэша адресов ФИАС {self.snapshot_path} не найден, старт с пустым кэшем.")
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Не удалось загрузить снимок кэша адресов ФИАС: {e}")
+
+    async def save_snapshot(self) -> None:
+        """Сохраняет актуальные записи кэша из памяти на диск (атомарно)."""
+        try:
+            now = time.time()
+            # Копию делаем в потоке event loop, чтобы запись на диск не конкурировала с изменениями кэша
+            entries = {key: entry for key, entry in self._memory.items() if now < entry[0]}
+            saved = await asyncio.to_thread(self._write_snapshot, entries)
+            logger.info(f"Кэш адресов ФИАС: сохранено {saved} записей в {self.snapshot_path}")
+        except OSError as e:
+            logger.error(f"Не удалось сохранить снимок кэша адресов ФИАС: {e}")
+
+
+address_cache = AddressResolutionCache(
+    ttl=settings.FIAS_ADDRESS_CACHE_TTL,
+    negative_ttl=settings.FIAS_ADDRESS_CACHE_NEGATIVE_TTL,
+    memory_size=settings.FIAS_ADDRESS_CACHE_MEMORY_SIZE,
+    redis_prefix=settings.REDIS_FIAS_ADDRESS_PREFIX,
+    snapshot_path=Path(settings.HANDBOOKS_DIR) / "fias_address_cache.json",
+)
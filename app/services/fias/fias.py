@@ -4,41 +4,18 @@
 """
 from typing import Annotated, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException
 
 from app.core import HTTPXClient, get_http_service, get_settings, logger
 from app.core.decorators import log_and_catch
+from app.services.fias.address_cache import address_cache
+from app.services.fias.fias_token import fias_token_manager, FIAS_TOKEN_REJECTED_STATUSES
+from app.services.fias.offline_index import offline_okato_resolver
 
 settings = get_settings()
 
-
-@log_and_catch(debug=settings.DEBUG_HTTP)
-async def get_fias_api_token(http_service: HTTPXClient) -> str:
-    """Получение токена для доступа к АПИ"""
-    url = settings.FIAS_TOKEN_URL
-    params = {
-        "url": "https://fias.nalog.ru/Search?objectId=0&addressType=2&fullName="
-    }
-    response = await http_service.fetch(
-        url=url,
-        method="GET",
-        params=params,
-        # raise_for_status=False
-    )
-    try:
-        token = response["json"]["Token"]
-        if not isinstance(token, str) or not token:
-            logger.error(f"Получен некорректный токен ФИАС: {token}")
-            raise ValueError("Некорректное значение токена ФИАС.")
-        logger.info(f"Токен ФИАС успешно получен (часть): {token[:10]}...")
-        return token
-    except (KeyError, TypeError, ValueError) as e:
-        logger.error(f"Ошибка извлечения токена ФИАС из ответа {response.get('json')}: {e}")
-        # Пробрасываем как HTTPException, чтобы роутер мог обработать
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Не удалось извлечь/валидировать токен ФИАС: {e}"
-        )
+# Признак того, что ФИАС ответил 404 (адреса нет) - такой ответ можно кэшировать, в отличие от сбоев
+FIAS_ADDRESS_NOT_FOUND: dict = {}
 
 
 @log_and_catch(debug=settings.DEBUG_HTTP)
@@ -49,7 +26,8 @@ async def process_getting_code(
 ) -> Optional[dict]:
     """
     Получение сведений по адресу из ФИАС.
-    Возвращает словарь {'full_address': str, 'okato_code': str} или None.
+    Возвращает словарь {'full_address': str, 'okato_code': str}, FIAS_ADDRESS_NOT_FOUND при ответе 404
+    или None при прочих ошибках.
     """
     if not address_string or not address_string.strip():
         logger.debug("Пустая строка адреса передана в _search_fias_address, пропускаем.")
@@ -78,7 +56,14 @@ async def process_getting_code(
 
     if response["status_code"] == 404:
         logger.info(f"ФИАС не нашел адрес (404): '{address_string[:60]}...'")
-        return None
+        return FIAS_ADDRESS_NOT_FOUND
+
+    if response["status_code"] in FIAS_TOKEN_REJECTED_STATUSES:
+        # Токен истек или отозван: отдаем статус наверх, чтобы get_okato_code обновил токен
+        raise HTTPException(
+            status_code=response["status_code"],
+            detail="ФИАС отклонил токен доступа"
+        )
 
     if response["status_code"] != 200:
         logger.warning(f"ФИАС вернул статус {response['status_code']} для адреса '{address_string[:50]}...'")
@@ -101,20 +86,47 @@ async def get_okato_code(
         http_service: Annotated[HTTPXClient, Depends(get_http_service)]
 ):
     """
-    Получает код ОКАТО и полный адрес по адресу из ФИАС. Управляет получением токена.
+    Получает код ОКАТО и полный адрес по адресу из ФИАС.
+    Порядок: офлайн-индекс ГАР (offline_okato_resolver) -> кэш адресов (address_cache) -> АПИ ФИАС.
+    Ответы ФИАС, включая 404, сохраняются в кэш адресов.
+    Токен берется из fias_token_manager; при отказе ФИАС (401/403) токен обновляется и запрос повторяется один раз.
     """
+    if not address_string or not address_string.strip():
+        return None
+
+    offline_answer = offline_okato_resolver.resolve(address_string)
+    if offline_answer is not None:
+        logger.debug("Адрес '{}...' найден в офлайн-индексе ОКАТО", address_string[:60])
+        return offline_answer
+
+    is_cached, cached_answer = await address_cache.get(address_string)
+    if is_cached:
+        logger.debug("Адрес '{}...' найден в кэше ФИАС", address_string[:60])
+        return cached_answer
+
     try:
-        # Подавляем ложное предупреждение PyCharm, т.к. get_fias_api_token - это awaitable wrapper
-        # noinspection PyCallingNonCallable
-        api_token = await get_fias_api_token(http_service)
-        logger.debug(f"TOKEN ФИАС: {api_token}")
-        # noinspection PyCallingNonCallable
-        answer = await process_getting_code(
-            address_string,
-            api_token,
-            http_service
-        )
-        return answer
+        for attempt in (1, 2):
+            api_token = await fias_token_manager.get_token(http_service)
+            try:
+                # Подавляем ложное предупреждение PyCharm, т.к. process_getting_code - это awaitable wrapper
+                # noinspection PyCallingNonCallable
+                answer = await process_getting_code(
+                    address_string,
+                    api_token,
+                    http_service
+                )
+                if answer is FIAS_ADDRESS_NOT_FOUND:
+                    await address_cache.put(address_string, None)
+                    return None
+                if answer is not None:
+                    await address_cache.put(address_string, answer)
+                return answer
+            except HTTPException as e:
+                if e.status_code not in FIAS_TOKEN_REJECTED_STATUSES or attempt == 2:
+                    raise
+                logger.info(f"ФИАС отклонил токен ({e.status_code}), получаем новый и повторяем запрос.")
+                await fias_token_manager.invalidate(api_token)
+        return None
     except HTTPException as e:
         logger.error(f"Не удалось получить ОКАТО из-за ошибки получения токена ФИАС: {e.detail}")
         return None
@@ -0,0 +1,182 @@
+"""
+Менеджер токена АПИ ФИАС.
+
+Токен из FIAS_TOKEN_URL кэшируется в памяти процесса и в Redis (общий для всех воркеров),
+обновляется один раз незадолго до истечения FIAS_TOKEN_TTL или после отказа ФИАС (401/403).
+Одновременные обновления объединяются: внутри процесса через asyncio.Lock, между воркерами через Redis lock.
+"""
+import asyncio
+import json
+import time
+from typing import Optional
+
+import redis.asyncio as redis
+from fastapi import HTTPException, status
+from redis.exceptions import RedisError, LockError
+
+from app.core import HTTPXClient, get_settings, logger
+from app.core.decorators import log_and_catch
+
+settings = get_settings()
+
+FIAS_TOKEN_REJECTED_STATUSES = (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+
+@log_and_catch(debug=settings.DEBUG_HTTP)
+async def get_fias_api_token(http_service: HTTPXClient) -> str:
+    """Получение токена для доступа к АПИ"""
+    url = settings.FIAS_TOKEN_URL
+    params = {
+        "url": "https://fias.nalog.ru/Search?objectId=0&addressType=2&fullName="
+    }
+    response = await http_service.fetch(
+        url=url,
+        method="GET",
+        params=params,
+        # raise_for_status=False
+    )
+    try:
+        token = response["json"]["Token"]
+        if not isinstance(token, str) or not token:
+            logger.error(f"Получен некорректный токен ФИАС: {token}")
+            raise ValueError("Некорректное значение токена ФИАС.")
+        logger.info(f"Токен ФИАС успешно получен (часть): {token[:10]}...")
+        return token
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Ошибка извлечения токена ФИАС из ответа {response.get('json')}: {e}")
+        # Пробрасываем как HTTPException, чтобы роутер мог обработать
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Не удалось извлечь/валидировать токен ФИАС: {e}"
+        )
+
+
+class FiasTokenManager:
+    """Кэширует токен ФИАС в памяти и в Redis и обновляет его не чаще, чем это нужно."""
+
+    def __init__(self, ttl: int, refresh_margin: int, redis_key: str):
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.redis_key = redis_key
+        self._token: Optional[str] = None
+        self._expires_at: float = 0.0
+        self._lock = asyncio.Lock()
+        self._redis: Optional[redis.Redis] = None
+
+    def bind_redis(self, redis_client: Optional[redis.Redis]) -> None:
+        """Подключает Redis для обмена токеном между воркерами (вызывается в lifespan)."""
+        self._redis = redis_client
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and time.time() < self._expires_at - self.refresh_margin
+
+    async def get_token(self, http_service: HTTPXClient) -> str:
+        """Возвращает действующий токен, при необходимости получая новый."""
+        if self._is_fresh():
+            return self._token
+
+        async with self._lock:
+            # Пока ждали блокировку, токен мог обновить другой запрос
+            if self._is_fresh():
+                return self._token
+            if await self._load_from_redis():
+                return self._token
+            return await self._refresh(http_service)
+
+    async def invalidate(self, rejected_token: str) -> None:
+        """Сбрасывает токен, отвергнутый ФИАС. Более новый токен (уже обновленный кем-то) не трогаем."""
+        async with self._lock:
+            if self._token == rejected_token:
+                self._token = None
+                self._expires_at = 0.0
+            if self._redis is None:
+                return
+            try:
+                cached = await self._read_redis()
+                if cached and cached.get("token") == rejected_token:
+                    await self._redis.delete(self.redis_key)
+            except RedisError as e:
+                logger.warning(f"Ошибка Redis при сбросе токена ФИАС: {e}")
+        logger.info("Токен ФИАС отвергнут АПИ и сброшен.")
+
+    async def _read_redis(self) -> Optional[dict]:
+        raw = await self._redis.get(self.redis_key)
+        if raw is None:
+            return None
+        try:
+            cached = json.loads(raw)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return None
+        return cached if isinstance(cached, dict) else None
+
+    async def _load_from_redis(self) -> bool:
+        if self._redis is None:
+            return False
+        try:
+            cached = await self._read_redis()
+        except RedisError as e:
+            logger.warning(f"Ошибка Redis при чтении токена ФИАС: {e}")
+            return False
+        if not cached or not cached.get("token"):
+            return False
+
+        expires_at = float(cached.get("expires_at", 0))
+        if time.time() >= expires_at - self.refresh_margin:
+            return False
+        self._token = cached["token"]
+        self._expires_at = expires_at
+        logger.debug("Токен ФИАС взят из Redis.")
+        return True
+
+    async def _refresh(self, http_service: HTTPXClient) -> str:
+        if self._redis is None:
+            return await self._fetch_and_store(http_service)
+
+        # Между воркерами токен обновляет только один; остальные дожидаются его и читают из Redis
+        lock = self._redis.lock(f"{self.redis_key}:lock", timeout=30, blocking_timeout=30)
+        try:
+            acquired = await lock.acquire()
+        except (RedisError, LockError) as e:
+            logger.warning(f"Не удалось согласовать обновление токена ФИАС через Redis: {e}. Обновляем локально.")
+            return await self._fetch_and_store(http_service)
+        if not acquired:
+            logger.warning("Не дождались блокировки обновления токена ФИАС. Обновляем локально.")
+            if await self._load_from_redis():
+                return self._token
+            return await self._fetch_and_store(http_service)
+
+        try:
+            if await self._load_from_redis():
+                return self._token
+            return await self._fetch_and_store(http_service)
+        finally:
+            # Ошибка снятия блокировки (например, истек ее timeout за время запроса) не должна
+            # приводить ко второму запросу токена: уже полученный токен остается в силе
+            try:
+                await lock.release()
+            except (RedisError, LockError) as e:
+                logger.warning(f"Не удалось снять блокировку обновления токена ФИАС: {e}")
+
+    async def _fetch_and_store(self, http_service: HTTPXClient) -> str:
+        # noinspection PyCallingNonCallable
+        token = await get_fias_api_token(http_service)
+        self._token = token
+        self._expires_at = time.time() + self.ttl
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(
+                    self.redis_key,
+                    json.dumps({"token": token, "expires_at": self._expires_at}),
+                    ex=self.ttl
+                )
+            except RedisError as e:
+                logger.warning(f"Ошибка Redis при сохранении токена ФИАС: {e}")
+        return token
+
+
+fias_token_manager = FiasTokenManager(
+    ttl=settings.FIAS_TOKEN_TTL,
+    refresh_margin=settings.FIAS_TOKEN_REFRESH_MARGIN,
+    redis_key=settings.REDIS_FIAS_TOKEN_KEY,
+)
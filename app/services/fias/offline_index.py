@@ -0,0 +1,226 @@
+"""
+Офлайн-определение ОКАТО по локальному индексу, построенному из выгрузки ФИАС/ГАР по региону.
+
+Индекс - таблица MmapTable "ключ адреса -> {'full_address', 'okato_code'}" (см. app.core.mmap_table).
+Ключ адреса - нормализованная строка без типов адресных объектов и без квартиры/помещения:
+"Мурманская обл, г Мурманск, ул Ленина, д 1, кв 5" -> "мурманская мурманск ленина 1".
+Каждый объект пишется в индекс дважды: с регионом и без него (в ЕВМИАС регион часто опущен).
+Ключи, под которые попадают разные адреса, из индекса исключаются (см. build_offline_index).
+
+Сборка индекса из распакованной выгрузки ГАР (папка региона, например "51"):
+    python -m app.services.fias.offline_index <папка_региона_ГАР> [путь_к_индексу]
+"""
+import json
+import sys
+import xml.etree.ElementTree as ET
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.core import get_settings, logger
+from app.core.mmap_table import MmapTable, write_table
+from app.services.fias.address_cache import normalize_address, ADDRESS_TYPE_TOKENS
+
+settings = get_settings()
+
+DEFAULT_INDEX_PATH = Path(settings.HANDBOOKS_DIR) / "fias_okato_index.mmt"
+
+# TYPEID параметра ГАР с кодом ОКАТО
+GAR_PARAM_OKATO = "6"
+# Типы домов и дополнительных номеров ГАР (AS_HOUSE_TYPES / AS_ADDHOUSE_TYPES)
+GAR_HOUSE_TYPES = {"1": "влд", "2": "д", "3": "двлд", "4": "г-ж", "5": "зд", "6": "шахта", "7": "стр",
+                   "8": "соор", "9": "литера", "10": "к", "11": "подв", "12": "кот", "13": "п-б", "14": "онс"}
+GAR_ADD_TYPES = {"1": "к", "2": "стр", "3": "соор", "4": "литера"}
+# Обозначения квартир/помещений: в ключ не входят (ОКАТО у них как у дома)
+_PREMISES_TOKENS = {"кв", "пом", "комн", "ком", "оф"}
+
+
+def address_key(address: str) -> str:
+    """Ключ адреса для офлайн-индекса: нормализованные имена без типов объектов и без квартиры."""
+    tokens = normalize_address(address).split()
+    result = []
+    skip_next = False
+    for token in tokens:
+        if skip_next:
+            skip_next = False
+            continue
+        if token in _PREMISES_TOKENS:
+            skip_next = True
+            continue
+        if token in ADDRESS_TYPE_TOKENS:
+            continue
+        result.append(token)
+    return " ".join(result)
+
+
+def _iter_gar_rows(directory: Path, file_prefix: str, tag: str) -> Iterator[Dict[str, str]]:
+    """
+    Потоково читает строки (атрибуты элементов tag) из файлов ГАР вида {file_prefix}_*.XML.
+    Разобранные элементы сразу удаляются из корня, поэтому память не зависит от размера файла.
+    """
+    for xml_path in sorted(directory.glob(f"{file_prefix}_2*.XML")) + sorted(directory.glob(f"{file_prefix}_2*.xml")):
+        logger.info(f"ГАР: чтение {xml_path.name}")
+        root = None
+        for event, element in ET.iterparse(xml_path, events=("start", "end")):
+            if root is None:
+                root = element
+            if event == "end" and element.tag == tag:
+                yield element.attrib
+                root.clear()
+
+
+def _is_current(row: Dict[str, str], today: str) -> bool:
+    return row.get("ISACTIVE", "1") == "1" and row.get("ISACTUAL", "1") == "1" and row.get("ENDDATE", "9999") > today
+
+
+def _house_label(row: Dict[str, str]) -> str:
+    parts = [GAR_HOUSE_TYPES.get(row.get("HOUSETYPE", ""), "д"), row.get("HOUSENUM", "")]
+    for num_field, type_field in (("ADDNUM1", "ADDTYPE1"), ("ADDNUM2", "ADDTYPE2")):
+        if row.get(num_field):
+            parts += [GAR_ADD_TYPES.get(row.get(type_field, ""), "к"), row[num_field]]
+    return " ".join(part for part in parts if part)
+
+
+def iter_gar_addresses(region_dir: Path) -> Iterator[Tuple[str, str, str]]:
+    """
+    Собирает из выгрузки ГАР региона адреса с кодами ОКАТО для адресных объектов и домов.
+    Первый элемент кортежа - полный адрес без региона, второй - с регионом, третий - ОКАТО.
+    ОКАТО дома берется из его параметров, а при отсутствии - от ближайшего родителя.
+    """
+    today = date.today().isoformat()
+
+    objects: Dict[str, Tuple[str, str]] = {}  # OBJECTID -> (полное имя компонента, уровень)
+    for row in _iter_gar_rows(region_dir, "AS_ADDR_OBJ", "OBJECT"):
+        if _is_current(row, today):
+            level = row.get("LEVEL", "")
+            # Регион пишем как принято в адресах: "Мурманская обл", остальное - "г Мурманск", "ул Ленина"
+            parts = (row.get("NAME", ""), row.get("TYPENAME", "")) if level == "1" else (
+                row.get("TYPENAME", ""), row.get("NAME", ""))
+            objects[row["OBJECTID"]] = (" ".join(part for part in parts if part), level)
+
+    houses: Dict[str, str] = {}
+    for row in _iter_gar_rows(region_dir, "AS_HOUSES", "HOUSE"):
+        if _is_current(row, today):
+            houses[row["OBJECTID"]] = _house_label(row)
+
+    okato: Dict[str, str] = {}
+    for prefix in ("AS_ADDR_OBJ_PARAMS", "AS_HOUSES_PARAMS"):
+        for row in _iter_gar_rows(region_dir, prefix, "PARAM"):
+            if row.get("TYPEID") == GAR_PARAM_OKATO and row.get("ENDDATE", "9999") > today and row.get("VALUE"):
+                okato[row["OBJECTID"]] = row["VALUE"]
+
+    for row in _iter_gar_rows(region_dir, "AS_ADM_HIERARCHY", "ITEM"):
+        if row.get("ISACTIVE", "1") != "1" or not row.get("PATH"):
+            continue
+        path: List[str] = row["PATH"].split(".")
+        object_id = path[-1]
+        if object_id not in objects and object_id not in houses:
+            continue
+
+        components = []
+        for ancestor_id in path:
+            if ancestor_id in objects:
+                components.append(objects[ancestor_id])
+            elif ancestor_id in houses:
+                components.append((houses[ancestor_id], "house"))
+        code = next((okato[ancestor_id] for ancestor_id in reversed(path) if ancestor_id in okato), None)
+        if not components or not code:
+            continue
+
+        full_address = ", ".join(name for name, _ in components)
+        without_region = ", ".join(name for name, level in components if level != "1")
+        yield without_region, full_address, code
+
+
+def build_offline_index(region_dir: Path, index_path: Path = DEFAULT_INDEX_PATH) -> int:
+    """
+    Строит офлайн-индекс ОКАТО из выгрузки ГАР. Возвращает количество ключей в индексе.
+    Ключ не содержит типов объектов, поэтому разные адреса могут дать один ключ ("ул Ленина 5" и
+    "пр-кт Ленина 5" в одном городе). Такие неоднозначные ключи в индекс не попадают - по ним
+    ОКАТО определяется через АПИ ФИАС.
+    """
+    records: Dict[str, bytes] = {}
+    ambiguous: Set[str] = set()
+    for without_region, full_address, code in iter_gar_addresses(region_dir):
+        value = json.dumps({"full_address": full_address, "okato_code": code}, ensure_ascii=False).encode("utf-8")
+        for address in (full_address, without_region):
+            if not address:
+                continue
+            key = address_key(address)
+            if key in ambiguous:
+                continue
+            if records.setdefault(key, value) != value:
+                del records[key]
+                ambiguous.add(key)
+
+    if ambiguous:
+        logger.info(f"Офлайн-индекс ОКАТО: {len(ambiguous)} неоднозначных ключей исключено (будут определяться через АПИ)")
+    meta = json.dumps({"source": str(region_dir), "built_at": date.today().isoformat(),
+                       "ambiguous_keys": len(ambiguous)}).encode("utf-8")
+    count = write_table(index_path, records.items(), meta=meta)
+    logger.info(f"Офлайн-индекс ОКАТО построен: {count} ключей, файл {index_path}")
+    return count
+
+
+class OfflineOkatoResolver:
+    """Поиск ОКАТО в офлайн-индексе. Если индекса нет, resolve всегда возвращает None."""
+
+    def __init__(self, index_path: Path):
+        self.index_path = index_path
+        self._table: Optional[MmapTable] = None
+        self.hits = 0
+        self.misses = 0
+
+    def open(self) -> bool:
+        """Открывает индекс (через mmap). Возвращает False, если файл индекса отсутствует или поврежден."""
+        self.close()
+        try:
+            self._table = MmapTable(self.index_path)
+        except FileNotFoundError:
+            logger.info(f"Офлайн-индекс ОКАТО {self.index_path} не найден, используется только АПИ ФИАС.")
+            return False
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось открыть офлайн-индекс ОКАТО {self.index_path}: {e}")
+            return False
+        logger.info(f"Офлайн-индекс ОКАТО открыт: {len(self._table)} ключей")
+        return True
+
+    def close(self) -> None:
+        if self._table is not None:
+            self._table.close()
+            self._table = None
+
+    @property
+    def is_available(self) -> bool:
+        return self._table is not None
+
+    def resolve(self, address: str) -> Optional[dict]:
+        """Возвращает {'full_address', 'okato_code'} или None, если адреса нет в индексе."""
+        if self._table is None or not address:
+            return None
+        raw = self._table.get(address_key(address))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def stats(self) -> dict:
+        return {
+            "available": self.is_available,
+            "keys": len(self._table) if self._table is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+offline_okato_resolver = OfflineOkatoResolver(
+    Path(settings.FIAS_OFFLINE_INDEX_PATH) if settings.FIAS_OFFLINE_INDEX_PATH else DEFAULT_INDEX_PATH
+)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    build_offline_index(Path(sys.argv[1]), Path(sys.argv[2]) if len(sys.argv) > 2 else offline_okato_resolver.index_path)
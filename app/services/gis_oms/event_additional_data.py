@@ -59,7 +59,7 @@ async def enrich_event_additional_patient_data(
                 event.personal.registration_address = AddressData(address=reg_addr_str)
             else:
                 event.personal.registration_address.address = reg_addr_str
-            logger.debug(f"Установлен адрес регистрации: '{reg_addr_str[:60]}...'")
+            logger.debug("Установлен адрес регистрации: '{}...'", reg_addr_str[:60])
         else:
             logger.debug("Адрес регистрации отсутствует в ответе loadPersonData.")
             event.personal.registration_address = None  # Убедимся, что он None, если строка пустая
@@ -71,7 +71,7 @@ async def enrich_event_additional_patient_data(
                 event.personal.actual_address = AddressData(address=actual_addr_str)
             else:
                 event.personal.actual_address.address = actual_addr_str
-            logger.debug(f"Установлен фактический адрес: '{actual_addr_str[:60]}...'")
+            logger.debug("Установлен фактический адрес: '{}...'", actual_addr_str[:60])
         else:
             logger.debug("Фактический адрес отсутствует в ответе loadPersonData.")
             event.personal.actual_address = None  # Убедимся, что он None
@@ -81,7 +81,7 @@ async def enrich_event_additional_patient_data(
         # Если данные о страховой компании и ее территории существуют, создаем объект и заполняем его данными
         event.insurance = InsuranceData.model_validate(additional_data)
 
-        logger.debug(f"Создан и заполнен InsuranceData для event {event.hospitalization.id}")
+        logger.debug("Создан и заполнен InsuranceData для event {}", event.hospitalization.id)
 
         logger.info(f"Дополнительные данные для пациента {person_id} успешно получены.")
         return event
@@ -0,0 +1,55 @@
+"""
+Необязательный кэш готовых ответов /get_event в Redis.
+
+Собранный Event хранится уже сериализованным (JSON-байты), поэтому повторный запрос по тем же ФИО и
+номеру карты отдается без сбора данных в ЕВМИАС и без сериализации. Включается REDIS_EVENT_CACHE_TTL > 0.
+"""
+import hashlib
+from typing import Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.core import get_settings, logger
+from app.models import EventSearch
+
+settings = get_settings()
+
+
+def event_cache_enabled() -> bool:
+    return settings.REDIS_EVENT_CACHE_TTL > 0
+
+
+def _event_key(event_search_data: EventSearch) -> str:
+    parts = (
+        event_search_data.card_number,
+        event_search_data.last_name,
+        event_search_data.first_name,
+        event_search_data.middle_name,
+        event_search_data.birthday,
+    )
+    normalized = "|".join(" ".join(str(part or "").split()).casefold() for part in parts)
+    return f"{settings.REDIS_EVENT_CACHE_PREFIX}{hashlib.sha1(normalized.encode()).hexdigest()}"
+
+
+async def get_cached_event_bytes(redis_client: redis.Redis, event_search_data: EventSearch) -> Optional[bytes]:
+    """JSON-байты ранее собранного Event или None (кэш выключен/нет записи/ошибка Redis)."""
+    if not event_cache_enabled():
+        return None
+    try:
+        payload = await redis_client.get(_event_key(event_search_data))
+    except RedisError as e:
+        logger.error(f"Ошибка Redis при чтении кэша Event: {e}")
+        return None
+    if payload is not None:
+        logger.info(f"Event для карты № {event_search_data.card_number} взят из кэша.")
+    return payload
+
+
+async def cache_event_bytes(redis_client: redis.Redis, event_search_data: EventSearch, payload: bytes) -> None:
+    if not event_cache_enabled():
+        return
+    try:
+        await redis_client.set(_event_key(event_search_data), payload, ex=settings.REDIS_EVENT_CACHE_TTL)
+    except RedisError as e:
+        logger.error(f"Ошибка Redis при сохранении Event в кэш: {e}")
@@ -6,8 +6,9 @@ from fastapi import status, HTTPException
 from httpx import HTTPStatusError, RequestError
 
 from app.core import HTTPXClient, get_settings, logger, HandbooksStorage
-# маппер направивших на госпитализацию медицинских организаций, которые нельзя однозначно получить из справочника
-from app.core.mappings import referred_org_map, current_org_map
+from app.core.mappings import current_org_map
+# направившие организации (Org_did -> итоговые сведения), собираются при загрузке/обновлении справочников
+from app.core.referral_orgs import referral_org_table
 from app.models import Event
 from app.services import get_handbook_payload
 
@@ -84,7 +85,7 @@ async def _get_and_set_referral_type_name(event: Event, handbooks_storage: Handb
             f"Event {event_id}: ID типа направления отсутствует или 'None'. Имя типа не будет установлено.")
         return
 
-    referral_type_handbook = get_handbook_payload(handbooks_storage, "referred_by", event_id)
+    referral_type_handbook = await get_handbook_payload(handbooks_storage, "referred_by", event_id)
     if isinstance(referral_type_handbook, dict):
         referral_type_entry = referral_type_handbook.get(referral_type_id)
         if isinstance(referral_type_entry, dict):  # Проверяем, что это словарь
@@ -131,33 +132,19 @@ async def _get_and_set_medical_care_condition(event: Event, handbooks_storage: H
             f"('{event.hospitalization.department_name}') для события {event.service.event_id}")
         return
 
-    try:
-        medical_care_handbook = handbooks_storage.handbooks.get("medical_care_conditions", {}).get('data', {})
-        condition_entry = medical_care_handbook.get(condition)
-
-        if isinstance(condition_entry, list) and condition_entry:
-            condition_detail = condition_entry[0]
-            if isinstance(condition_detail, dict):
-                condition_id = condition_detail.get("IDUMP")
-                if condition_id is not None:
-                    event.referral.medical_care_condition_id = str(condition_id)
-                    event.referral.medical_care_condition_name = str(condition)
-                    logger.info(
-                        f"Event {event_id}: Установлено условие оказания медпомощи: ID='{condition_id}', Имя='{condition}'")
-                else:
-                    logger.warning(f"Event {event_id}: В справочнике V006 для '{condition}' отсутствуют данные.")
-            else:
-                logger.warning(f"Event {event_id}: Запись для '{condition}' в V006 не словарь.")
-        else:
-            logger.warning(f"Event {event_id}: Условие '{condition}' не найдено в V006 или запись пуста.")
+    condition_detail = await handbooks_storage.lookup("medical_care_conditions", "by_name", condition)
+    if condition_detail is None:
+        logger.warning(f"Event {event_id}: Условие '{condition}' не найдено в V006.")
+        return
 
-    except AttributeError as e:  # Ловим ошибку, если где-то в цепочке был None там, где не ожидали
-        logger.error(
-            f"Event {event_id}: Ошибка доступа к данным справочника V006 для условия '{condition}': {e}", exc_info=True)
-    except Exception as e:  # Общий обработчик на случай других непредвиденных ошибок
-        logger.error(
-            f"Event {event_id}: Неожиданная ошибка при получении условия медпомощи для '{condition}': {e}",
-            exc_info=True)
+    condition_id = condition_detail.get("IDUMP")
+    if condition_id is not None:
+        event.referral.medical_care_condition_id = str(condition_id)
+        event.referral.medical_care_condition_name = str(condition)
+        logger.info(
+            f"Event {event_id}: Установлено условие оказания медпомощи: ID='{condition_id}', Имя='{condition}'")
+    else:
+        logger.warning(f"Event {event_id}: В справочнике V006 для '{condition}' отсутствуют данные.")
 
 
 async def _get_and_set_referring_organization_details(
@@ -177,43 +164,21 @@ async def _get_and_set_referring_organization_details(
 
     # если направила другая МО
     if referral_type_id == REFERRED_BY_OTHER_MO:
-        # справочник направивших на госпитализацию организаций (ЕВМИАС)
-        referred_organizations_handbook = get_handbook_payload(
-            handbooks_storage, "referred_organizations", event_id
-        )
         referred_org_id = raw_referred_data.get("Org_did")
-        if isinstance(referred_organizations_handbook, dict) and referred_org_id is not None:
-            referred_data = referred_organizations_handbook.get(referred_org_id)
-
-        # справочник МО (от фонда)
-        medical_organizations_handbook = get_handbook_payload(
-            handbooks_storage, "medical_organizations", event_id
-        )
-        if isinstance(referred_organizations_handbook, dict):
-            handbook_keys = medical_organizations_handbook.keys()
-
-        org_evmias_name = referred_data.get("name")
-        org_evmias_token = referred_data.get("token")
-        map_keys = referred_org_map.keys()
-
-        if org_evmias_name in map_keys:
-            org_map = referred_org_map.get(org_evmias_name)
-            event.referral.org_name = org_map.get("name")
-            event.referral.org_nick = org_map.get("nick")
-            event.referral.org_code = org_map.get("code")[:8]
-            event.referral.org_token = org_map.get("token")
-
-        elif (org_evmias_name not in map_keys) and (org_evmias_token in handbook_keys):
-            org_handbook = medical_organizations_handbook.get(org_evmias_token)[0]
-            event.referral.org_name = org_handbook.get("NAM_MOP")
-            event.referral.org_nick = org_handbook.get("NAM_MOK")
-            event.referral.org_code = org_handbook.get("IDMO")[:8]
-            event.referral.org_token = org_evmias_token
-
+        org = await referral_org_table.resolve(handbooks_storage, referred_org_id)
+        if org:
+            event.referral.org_name = org.get("name")
+            event.referral.org_nick = org.get("nick")
+            event.referral.org_code = org.get("code")
+            event.referral.org_token = org.get("token")
+            if org.get("source") == "name":
+                logger.info(
+                    f"Event {event_id}: направившая организация Org_did={referred_org_id} найдена по названию "
+                    f"(сходство {org.get('score')}): {org.get('nick')}")
         else:
             logger.warning(
-                f"Не удалось найти справочную информацию о направившей организации: "
-                f"{org_evmias_name} ({org_evmias_token}).")
+                f"Event {event_id}: Не удалось найти справочную информацию о направившей организации "
+                f"(Org_did={referred_org_id}).")
 
     elif referral_type_id == REFERRED_BY_DEPARTMENT:
         # если направило отделение материнской организации
@@ -249,30 +214,19 @@ async def _get_and_set_medical_care_form(
 
     event.referral.medical_care_form_id = medical_care_form_id
 
-    medical_care_form_handbook = get_handbook_payload(
-        handbooks_storage, "medical_care_forms", event_id
-    )
+    details = await handbooks_storage.lookup("medical_care_forms", "by_code", medical_care_form_id)
+    if details is None:
+        logger.warning(f"Event {event_id}: ID формы '{medical_care_form_id}' не найден в V014.")
+        return
 
-    if isinstance(medical_care_form_handbook, dict):
-        handbook_entry = medical_care_form_handbook.get(medical_care_form_id)
-        if isinstance(handbook_entry, list) and handbook_entry:
-            details = handbook_entry[0]
-            if isinstance(details, dict):  # Шаг 4: Проверка, что это словарь
-                name = details.get("FRMMPNAME")
-                if name is not None:
-                    event.referral.medical_care_form_name = str(name)
-                    logger.info(
-                        f"Event {event_id}: Установлена форма медпомощи: ID='{medical_care_form_id}', Имя='{name}'")
-                else:
-                    logger.warning(
-                        f"Event {event_id}: В V014 для ID '{medical_care_form_id}' отсутствуют данные.")
-            else:
-                logger.warning(f"Event {event_id}: Запись для ID '{medical_care_form_id}' в V014 не словарь.")
-        else:
-            logger.warning(
-                f"Event {event_id}: ID формы '{medical_care_form_id}' не найден в V014 или запись не список/пуста.")
+    name = details.get("FRMMPNAME")
+    if name is not None:
+        event.referral.medical_care_form_name = str(name)
+        logger.info(
+            f"Event {event_id}: Установлена форма медпомощи: ID='{medical_care_form_id}', Имя='{name}'")
     else:
-        logger.warning(f"Event {event_id}: Справочник V014 ('medical_care_forms') не словарь или не загружен.")
+        logger.warning(
+            f"Event {event_id}: В V014 для ID '{medical_care_form_id}' отсутствуют данные.")
 
 
 async def _get_raw_movement_data(event_id: str, cookies: dict[str, str], http_service: HTTPXClient) -> dict[str, str]:
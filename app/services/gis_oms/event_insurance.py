@@ -1,7 +1,6 @@
 from app.core import HandbooksStorage, get_settings, logger
 from app.core.decorators import log_and_catch
 from app.models import Event
-from app.services import get_handbook_payload
 
 settings = get_settings()
 
@@ -12,8 +11,11 @@ async def enrich_insurance_data(
         handbooks_storage: HandbooksStorage,
 ) -> Event:
     company_name = event.insurance.company_name
-    insurance_company_handbook = get_handbook_payload(handbooks_storage, 'insurance_companies')
-    company_data = insurance_company_handbook.get(company_name, {})[0]
+    # индекс по нормализованному nam_smop (регистр и лишние пробелы не важны)
+    company_data = await handbooks_storage.lookup('insurance_companies', 'by_name', company_name)
+    if company_data is None:
+        logger.warning(f"Страховая компания '{company_name}' не найдена в справочнике F002.")
+        return event
     event.insurance.territory_code = company_data.get('TF_OKATO', '')
     event.insurance.code = company_data.get('smocod', '')
     return event
@@ -1,97 +1,72 @@
 import asyncio
-from typing import Optional
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
 
-from app.core import HTTPXClient, logger
+from app.core import HTTPXClient, logger, get_settings
 from app.models import Event, AddressData
 
+from app.services.fias.address_cache import normalize_address
 from app.services.fias.fias import get_okato_code
 
-async def _fetch_and_update_address_data(
-        address_obj: Optional[AddressData],
-        http_service: HTTPXClient,
-        address_type_log: str  # 'регистрации', 'фактический', 'общий'
-) -> Optional[AddressData]:
-    """
-    Получает данные из ФИАС для одного адреса (если он задан в address_obj)
-    и обновляет поля full_address и okato_code этого объекта.
+settings = get_settings()
+
 
-    Возвращает обновленный объект или исходный (может быть None), если адрес невалиден или ФИАС не ответил.
+def _collect_distinct_addresses(events: Iterable[Event]) -> Dict[str, List[AddressData]]:
     """
-    if not address_obj or not address_obj.address or not address_obj.address.strip():
-        logger.debug(f"Адрес {address_type_log} отсутствует или пуст, пропуск запроса к ФИАС.")
-        return address_obj  # Возвращаем как есть (может быть None)
+    Группирует объекты адресов (регистрации и фактические) всех событий по нормализованной строке адреса.
+    Пустые адреса пропускаются.
+    """
+    groups: Dict[str, List[AddressData]] = defaultdict(list)
+    for event in events:
+        for address_obj in (event.personal.registration_address, event.personal.actual_address):
+            if address_obj and address_obj.address and address_obj.address.strip():
+                groups[normalize_address(address_obj.address)].append(address_obj)
+    return groups
 
-    address_str = address_obj.address
-    logger.debug(f"Запрос ОКАТО для адреса {address_type_log}: '{address_str[:60]}...'")
-    fias_data = await get_okato_code(address_str, http_service)
 
-    if fias_data:
-        okato_code = fias_data.get("okato_code")
-        full_address = fias_data.get("full_address")
-        logger.info(f"ФИАС ОКАТО для адреса {address_type_log}: {okato_code}")
-        # Обновляем объект напрямую
-        address_obj.full_address = full_address
-        address_obj.okato_code = okato_code
-    else:
-        logger.warning(f"Не удалось получить ОКАТО для адреса {address_type_log}: '{address_str[:60]}...'")
-        # Не меняем поля full_address и okato_code, если ФИАС ничего не вернул
+async def enrich_events_okato_codes(
+        events: Iterable[Event],
+        http_service: HTTPXClient,
+        concurrency: Optional[int] = None,
+) -> Dict[str, Optional[dict]]:
+    """
+    Добавляет коды ОКАТО и полные адреса из ФИАС сразу для пачки событий.
+
+    Каждый уникальный (после нормализации) адрес пачки запрашивается один раз, не более `concurrency`
+    запросов одновременно; результат раздается всем объектам AddressData с этим адресом.
+    Возвращает словарь "нормализованный адрес -> ответ ФИАС (или None)".
+    """
+    groups = _collect_distinct_addresses(events)
+    if not groups:
+        logger.debug("В пачке событий нет адресов, запросы к ФИАС не выполнялись.")
+        return {}
+
+    semaphore = asyncio.Semaphore(concurrency or settings.FIAS_RESOLVE_CONCURRENCY)
+    total_objects = sum(len(address_objs) for address_objs in groups.values())
+    logger.info(f"ОКАТО: {len(groups)} уникальных адресов на {total_objects} адресов в пачке")
+
+    async def _resolve(address_objs: List[AddressData]) -> Optional[dict]:
+        address_str = address_objs[0].address
+        async with semaphore:
+            fias_data = await get_okato_code(address_str, http_service)
+
+        if fias_data:
+            for address_obj in address_objs:
+                address_obj.full_address = fias_data.get("full_address")
+                address_obj.okato_code = fias_data.get("okato_code")
+        else:
+            # Не меняем поля full_address и okato_code, если ФИАС ничего не вернул
+            logger.warning(f"Не удалось получить ОКАТО для адреса: '{address_str[:60]}...'")
+        return fias_data
 
-    return address_obj
+    results = await asyncio.gather(*(_resolve(address_objs) for address_objs in groups.values()))
+    return dict(zip(groups.keys(), results))
 
 
 async def enrich_event_okato_codes_for_patient_address(event: Event, http_service: HTTPXClient):
     """
     Добавляет коды ОКАТО и полные адреса из ФИАС в модель Event.
+    Совпадающие адреса регистрации и фактический запрашиваются один раз.
     """
-    reg_address_obj = event.personal.registration_address
-    actual_address_obj = event.personal.actual_address
-
-    # Извлекаем строки адресов для сравнения
-    address_registration_str = reg_address_obj.address if reg_address_obj else None
-    address_actual_str = actual_address_obj.address if actual_address_obj else None
-
-    # Проверяем, совпадают ли непустые строки адресов
-    are_addresses_valid_and_equal = (
-            address_registration_str and address_registration_str.strip() and
-            address_actual_str and address_actual_str.strip() and
-            address_registration_str.strip() == address_actual_str.strip()
-    )
-
-    if are_addresses_valid_and_equal:
-        # --- Случай 1: Адреса совпадают и не пустые ---
-        logger.info("Адреса совпадают. Один запрос к ФИАС.")
-        # Обновляем объект адреса регистрации
-        updated_reg_obj = await _fetch_and_update_address_data(
-            reg_address_obj,
-            http_service,
-            address_type_log="общий (регистрации)"
-        )
-
-        # Если обновление прошло успешно (ОКАТО получен) и фактический адрес тоже существует (он должен)
-        if updated_reg_obj and actual_address_obj and updated_reg_obj.okato_code:
-            # Копируем данные в объект фактического адреса
-            actual_address_obj.full_address = updated_reg_obj.full_address
-            actual_address_obj.okato_code = updated_reg_obj.okato_code
-            logger.debug("Данные ОКАТО скопированы для фактического адреса.")
-        elif actual_address_obj and not (updated_reg_obj and updated_reg_obj.okato_code):
-            # Если ОКАТО не получили для общего адреса
-            logger.warning("Не удалось получить ОКАТО для общего адреса, фактический адрес не обновлен.")
-            # Оставляем поля фактического адреса как есть (скорее всего None)
-
-    else:
-        # --- Случай 2: Адреса разные или один/оба пустые/None ---
-        logger.info("Адреса различаются или один из них пуст. Проверяем каждый отдельно.")
-        # Запускаем получение данных для обоих адресов параллельно (если они есть)
-        tasks = []
-        if reg_address_obj:
-            tasks.append(_fetch_and_update_address_data(reg_address_obj, http_service, "регистрации"))
-        if actual_address_obj:
-            tasks.append(_fetch_and_update_address_data(actual_address_obj, http_service, "фактический"))
-
-        if tasks:
-            await asyncio.gather(*tasks)  # Выполняем запросы параллельно
-            logger.debug("Запросы к ФИАС для разных адресов завершены.")
-        else:
-            logger.debug("Оба объекта адресов отсутствуют, запросы к ФИАС не выполнялись.")
-
-    return event
\ No newline at end of file
+    await enrich_events_okato_codes([event], http_service)
+    return event
@@ -1,24 +1,60 @@
+from typing import Optional
+
+import redis.asyncio as redis
 from fastapi import HTTPException, status
 from httpx import HTTPStatusError, RequestError
 
 from app.core import logger, get_settings, HTTPXClient
 from app.models import Event, EventSearch
+from app.services.gis_oms.search_rows_cache import get_cached_search_row
 
 settings = get_settings()
 
 
+async def _get_starter_event_from_cache(
+        redis_client: redis.Redis,
+        event_search_data: EventSearch,
+) -> Optional[Event]:
+    """
+    Собирает стартовый Event из строки поиска, сохраненной /get_patient.
+    Возвращает None, если строки нет в кэше или она относится к другой карте.
+    """
+    card_number = event_search_data.card_number
+    row = await get_cached_search_row(redis_client, event_search_data.search_handle)
+    if row is None:
+        return None
+
+    if str(row.get("EvnPS_NumCard")) != str(card_number):
+        logger.warning(
+            f"Строка поиска {event_search_data.search_handle} относится к карте {row.get('EvnPS_NumCard')}, "
+            f"а не к карте {card_number}. Выполняем обычный поиск."
+        )
+        return None
+
+    event = Event.model_validate(row)
+    logger.info(f"Стартовые данные для карты {card_number} взяты из кэша поиска.")
+    return event
+
+
 async def get_starter_patient_data(
         cookies: dict[str, str],
         http_service: HTTPXClient,
         event_search_data: EventSearch,
+        redis_client: Optional[redis.Redis] = None,
 ) -> Event:
     """
     Выполняет поиск в ЕВМИАС по номеру карты для получения стартовых данных госпитализации.
     Возвращает первый найденный результат.
+    Если в запросе есть search_handle и строка еще в кэше, повторный поиск в ЕВМИАС не выполняется.
     Выбрасывает HTTPException при ошибках API, неверном формате ответа или если данные не найдены.
     """
     card_number = event_search_data.card_number
-    logger.debug(f"Запрос стартовых данных по номеру карты: {card_number}")
+    if event_search_data.search_handle and redis_client is not None:
+        event = await _get_starter_event_from_cache(redis_client, event_search_data)
+        if event is not None:
+            return event
+
+    logger.debug("Запрос стартовых данных по номеру карты: {}", card_number)
     url = settings.BASE_URL
     headers = {"Origin": settings.BASE_HEADERS_ORIGIN_URL, "Referer": settings.BASE_HEADERS_REFERER_URL}
     params = {"c": "Search", "m": "searchData"}
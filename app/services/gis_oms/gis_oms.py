@@ -1,10 +1,12 @@
-import json
 from datetime import datetime
 from typing import Dict, List, Any, Optional
+
+import redis.asyncio as redis
 from fastapi import HTTPException, status
 
 from app.core import HTTPXClient, logger, get_settings
-from app.models import PatientSearch
+from app.models import PatientSearch, SearchRow, summarize_search_rows, search_rows_as_dicts
+from app.services.gis_oms.search_rows_cache import cache_search_rows
 
 settings = get_settings()
 
@@ -32,7 +34,7 @@ async def get_patient_operations(
         logger.warning("Попытка получить операции без event_id")
         return None
 
-    logger.debug(f"Запрос операций пациента {event_id} начат")
+    logger.debug("Запрос операций пациента {} начат", event_id)
     url = BASE_URL
     headers = HEADERS
     params = {"c": "EvnUsluga", "m": "loadEvnUslugaGrid"}
@@ -78,11 +80,14 @@ async def get_patient_operations(
 async def fetch_and_filter(
         patient_search_data: PatientSearch,
         cookies: dict,
-        http_service: HTTPXClient
+        http_service: HTTPXClient,
+        redis_client: Optional[redis.Redis] = None
 ) -> List[Dict[str, Any]]:
     """
         Ищет госпитализации пациента по ФИО/дате рождения и возвращает список данных
         ТОЛЬКО тех госпитализаций, в которых подтверждено наличие операций.
+        Возвращает компактные строки (см. SearchRow) с ключами ЕВМИАС.
+        Если передан redis_client, полная строка кэшируется, а компактная получает поле 'search_handle' для /get_event.
         """
     url = BASE_URL
     headers = HEADERS
@@ -103,7 +108,7 @@ async def fetch_and_filter(
         **({"Person_Birthday": birthday} if (birthday := patient_search_data.birthday) else {}),
     }
 
-    logger.debug(f"Поиск госпитализаций пациента с параметрами: {data}")
+    logger.debug("Поиск госпитализаций пациента с параметрами: {}", data)
     # Выполняем первый запрос (поиск пациента/госпитализаций)
     # Ошибки здесь будут пойманы декоратором @route_handler
     response = await http_service.fetch(
@@ -166,6 +171,12 @@ async def fetch_and_filter(
             detail="Найдены госпитализации, но ни в одной из них не подтверждено наличие операций (или произошли ошибки при проверке)"
         )
 
-    # 3. Возвращаем отфильтрованный список госпитализаций
-    logger.debug(print(json.dumps(final_hospitalization_list, indent=4, ensure_ascii=False)))
-    return final_hospitalization_list
\ No newline at end of file
+    # 3. Кэшируем полные строки для /get_event, клиенту отдаем компактные строки с search_handle
+    handles = (
+        await cache_search_rows(redis_client, final_hospitalization_list)
+        if redis_client is not None else [None] * len(final_hospitalization_list)
+    )
+    search_rows = [SearchRow.from_row(row, handle) for row, handle in zip(final_hospitalization_list, handles)]
+
+    logger.opt(lazy=True).debug("Результат поиска: {}", lambda: summarize_search_rows(search_rows))
+    return search_rows_as_dicts(search_rows)
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Кратковременный кэш сырых строк поиска ЕВМИАС (Search/searchData).
+
+/get_patient кладет каждую найденную госпитализацию (полную строку) в Redis под непрозрачным ключом (handle)
+и отдает его клиенту в компактной строке результата (app.models.SearchRow). /get_event по этому ключу
+собирает стартовый Event без повторного запроса Search/searchData.
+"""
+import json
+import uuid
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.core import get_settings, logger
+
+settings = get_settings()
+
+
+def _row_key(handle: str) -> str:
+    return f"{settings.REDIS_SEARCH_ROWS_PREFIX}{handle}"
+
+
+async def cache_search_rows(redis_client: redis.Redis, rows: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """
+    Сохраняет строки поиска в Redis (TTL REDIS_SEARCH_ROWS_TTL) и возвращает их handle (по порядку строк).
+    При ошибке Redis возвращаются None: /get_event в этом случае выполнит обычный поиск.
+    """
+    handles = [uuid.uuid4().hex for _ in rows]
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for handle, row in zip(handles, rows):
+                pipe.set(_row_key(handle), json.dumps(row, ensure_ascii=False), ex=settings.REDIS_SEARCH_ROWS_TTL)
+            await pipe.execute()
+    except RedisError as e:
+        logger.error(f"Ошибка Redis при сохранении строк поиска: {e}", exc_info=True)
+        return [None] * len(rows)
+
+    logger.debug("В кэш поиска сохранено строк: {} (TTL: {}s)", len(rows), settings.REDIS_SEARCH_ROWS_TTL)
+    return handles
+
+
+async def get_cached_search_row(redis_client: redis.Redis, handle: str) -> Optional[Dict[str, Any]]:
+    """Возвращает сырую строку поиска по handle или None, если она истекла/не найдена/повреждена."""
+    try:
+        raw_row = await redis_client.get(_row_key(handle))
+    except RedisError as e:
+        logger.error(f"Ошибка Redis при чтении строки поиска {handle}: {e}", exc_info=True)
+        return None
+
+    if raw_row is None:
+        logger.info(f"Строка поиска {handle} не найдена в кэше (истек TTL?)")
+        return None
+
+    try:
+        row = json.loads(raw_row)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        logger.error(f"Не удалось разобрать строку поиска {handle} из Redis: {e}")
+        return None
+
+    return row if isinstance(row, dict) else None
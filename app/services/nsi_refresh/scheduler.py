@@ -0,0 +1,233 @@
+"""
+Фоновое обновление справочников НСИ ФОМС.
+
+Раз в NSI_REFRESH_INTERVAL секунд для каждого кода из nsi_handbooks_mapper:
+1. Если файл справочника на диске новее опубликованного в памяти (его обновил другой воркер) -
+   справочник перечитывается с диска, без обращения к НСИ.
+2. Если задан NSI_ARCHIVE_URL (адрес архива справочника), версия проверяется по данным последней загрузки
+   архива (файл-спутник <архив>.meta.json, см. HTTPXClient.download): условный HEAD-запрос
+   (If-None-Match / If-Modified-Since), а если сервер не ответил 304 - архив скачивается заново и
+   сравнивается по sha256 с прежним. Справочник пересобирается только из изменившегося архива.
+   Без NSI_ARCHIVE_URL или до первой загрузки архива справочник обновляется, когда его файл старше
+   NSI_REFRESH_MAX_AGE (или файла нет).
+3. Новая версия разбирается и сохраняется (из скачанного архива или через fetch_and_process_handbook),
+   индексы нового снимка строятся в пуле потоков, и снимок атомарно подменяется в HandbooksStorage;
+   запросы в это время работают с прежним.
+   Остальные воркеры получают событие через Redis pub/sub (app.core.handbooks_reload) и перечитывают файл.
+Одновременно один и тот же код обновляет только один воркер (блокировка в Redis).
+"""
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.core import HTTPXClient, HandbooksStorage, get_settings, logger
+from app.core.handbooks import handbook_file_mtime, read_handbook, to_storage_form
+from app.core.handbooks_reload import publish_handbook_refresh
+from app.core.httpx_client import read_download_meta
+from app.core.mappings import nsi_handbooks_mapper
+from app.services.handbooks.nsi_ffoms import fetch_and_process_handbook
+from app.services.tools.tools import parse_nsi_zip_streaming, save_handbook
+
+settings = get_settings()
+
+REDIS_NSI_REFRESH_LOCK_PREFIX = "nsi:refresh:lock:"
+
+
+def nsi_archive_url(code: str) -> Optional[str]:
+    """Адрес архива справочника по шаблону NSI_ARCHIVE_URL или None, если шаблон не задан."""
+    return settings.NSI_ARCHIVE_URL.format(code=code) if settings.NSI_ARCHIVE_URL else None
+
+
+def nsi_download_path(code: str) -> Path:
+    """Куда скачивается архив справочника НСИ (рядом HTTPXClient.download пишет <архив>.meta.json)."""
+    return Path(settings.TEMP_DIR) / "nsi" / f"{code}.zip"
+
+
+async def check_nsi_update(code: str, meta: Dict[str, Any], http_service: HTTPXClient) -> Optional[bool]:
+    """
+    Условная проверка новой версии справочника по валидаторам последней загрузки архива.
+    Returns:
+        True - на сервере новая версия, False - не изменился, None - проверить нельзя (нет валидаторов/ошибка).
+    """
+    url, etag, last_modified = meta.get("url"), meta.get("etag"), meta.get("last_modified")
+    if not url or not (etag or last_modified):
+        return None
+
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        response = await http_service.fetch(url=url, method="HEAD", headers=headers, raise_for_status=False)
+    except Exception as e:
+        logger.warning(f"НСИ {code}: не удалось проверить версию: {e}")
+        return None
+
+    status_code = response.get("status_code")
+    if status_code == 304:
+        return False
+    if status_code != 200:
+        logger.warning(f"НСИ {code}: проверка версии вернула статус {status_code}")
+        return None
+    # Сервер мог проигнорировать условные заголовки - сравниваем валидаторы сами
+    response_headers = {key.lower(): value for key, value in response.get("headers", {}).items()}
+    new_etag, new_last_modified = response_headers.get("etag"), response_headers.get("last-modified")
+    if not (new_etag or new_last_modified):
+        return None
+    return (new_etag or None) != (etag or None) or (new_last_modified or None) != (last_modified or None)
+
+
+class NsiRefreshScheduler:
+    """Периодическая проверка и обновление справочников НСИ в фоне."""
+
+    def __init__(self, interval: int, max_age: int, initial_delay: int):
+        self.interval = interval
+        self.max_age = max_age
+        self.initial_delay = initial_delay
+        self._task: Optional[asyncio.Task] = None
+        self._run_lock = asyncio.Lock()
+        self.last_run_at: Optional[float] = None
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def start(self, http_service: HTTPXClient, handbooks_storage: HandbooksStorage,
+              redis_client: Optional[redis.Redis] = None) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(http_service, handbooks_storage, redis_client))
+            logger.info(f"Планировщик обновления НСИ запущен (интервал {self.interval} с)")
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            logger.info("Планировщик обновления НСИ остановлен")
+        self._task = None
+
+    async def _loop(self, http_service: HTTPXClient, handbooks_storage: HandbooksStorage,
+                    redis_client: Optional[redis.Redis]) -> None:
+        await handbooks_storage.wait_ready()
+        await asyncio.sleep(self.initial_delay)
+        while True:
+            try:
+                await self.run_once(http_service, handbooks_storage, redis_client)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка планового обновления НСИ: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, http_service: HTTPXClient, handbooks_storage: HandbooksStorage,
+                       redis_client: Optional[redis.Redis] = None) -> Dict[str, Dict[str, Any]]:
+        """Один проход по всем кодам НСИ. Возвращает результат по каждому коду."""
+        async with self._run_lock:
+            for code in nsi_handbooks_mapper:
+                started = time.perf_counter()
+                try:
+                    action = await self._refresh_code(code, http_service, handbooks_storage, redis_client)
+                except Exception as e:
+                    logger.error(f"НСИ {code}: ошибка обновления: {e}", exc_info=True)
+                    action = "error"
+                self.results[code] = {
+                    "action": action,
+                    "checked_at": time.time(),
+                    "duration": round(time.perf_counter() - started, 3),
+                }
+            self.last_run_at = time.time()
+        return self.results
+
+    async def _refresh_code(self, code: str, http_service: HTTPXClient, handbooks_storage: HandbooksStorage,
+                            redis_client: Optional[redis.Redis]) -> str:
+        storage_key = nsi_handbooks_mapper[code]["handbook_storage_key"]
+        snapshot = handbooks_storage.snapshot
+
+        # 1. Другой воркер уже обновил файл - просто перечитываем его
+        file_mtime = handbook_file_mtime(storage_key)
+        published_at = snapshot.updated_at.get(storage_key)
+        if file_mtime is not None and published_at is not None and file_mtime > published_at:
+            data = await asyncio.to_thread(read_handbook, storage_key)
+            await handbooks_storage.replace_async({storage_key: data})
+            logger.info(f"НСИ {code}: справочник '{storage_key}' перечитан с диска (обновлен другим процессом)")
+            return "reloaded_from_disk"
+
+        # 2. Проверка версии: по валидаторам прошлой загрузки архива, а без них - по возрасту файла
+        url = nsi_archive_url(code)
+        previous = read_download_meta(nsi_download_path(code)) if url else {}
+        if previous and file_mtime is not None:
+            if await check_nsi_update(code, previous, http_service) is False:
+                return "unchanged"
+        elif file_mtime is not None and time.time() - file_mtime <= self.max_age:
+            return "unchanged"
+
+        # 3. Скачивание и пересборка - только одним воркером
+        lock = redis_client.lock(f"{REDIS_NSI_REFRESH_LOCK_PREFIX}{code}", timeout=1800,
+                                 blocking_timeout=0) if redis_client is not None else None
+        try:
+            if lock is not None and not await lock.acquire():
+                logger.info(f"НСИ {code}: обновление уже выполняет другой воркер")
+                return "locked"
+        except RedisError as e:
+            logger.warning(f"НСИ {code}: блокировка Redis недоступна ({e}), обновляем без нее")
+            lock = None
+
+        try:
+            if url is None:
+                logger.info(f"НСИ {code}: справочник '{storage_key}' устарел, обновляем")
+                data = await fetch_and_process_handbook(code, http_service)
+            else:
+                data = await self._download_and_build(code, url, previous, http_service)
+                if data is None:
+                    return "unchanged"
+            if not data:
+                logger.error(f"НСИ {code}: обновление не вернуло данных, остается прежняя версия")
+                return "failed"
+            await handbooks_storage.replace_async({storage_key: await to_storage_form(storage_key, data)})
+            await publish_handbook_refresh(redis_client, storage_key)
+            return "updated"
+        finally:
+            if lock is not None:
+                try:
+                    await lock.release()
+                except RedisError as e:
+                    logger.warning(f"НСИ {code}: не удалось снять блокировку Redis: {e}")
+
+    @staticmethod
+    async def _download_and_build(code: str, url: str, previous: Dict[str, Any],
+                                  http_service: HTTPXClient) -> Optional[Dict[str, Any]]:
+        """
+        Скачивает архив справочника и, если он отличается от прошлого (по sha256), разбирает и сохраняет его.
+        Returns:
+            Новый справочник, None - архив не изменился, {} - в архиве нет записей.
+        """
+        details = nsi_handbooks_mapper[code]
+        result = await http_service.download(url, nsi_download_path(code))
+        if previous.get("sha256") == result["sha256"] and handbook_file_mtime(details["handbook_storage_key"]):
+            logger.info(f"НСИ {code}: архив не изменился (sha256), пересборка не нужна")
+            return None
+        logger.info(f"НСИ {code}: найдена новая версия, обновляем '{details['handbook_storage_key']}'")
+        data = await parse_nsi_zip_streaming(result["path"], details["root_key"], details["key_field"])
+        if not data.get("data"):
+            return {}  # пустой архив не публикуем
+        await save_handbook(data, details["filename"])
+        return data
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval": self.interval,
+            "last_run_at": self.last_run_at,
+            "results": self.results,
+        }
+
+
+nsi_refresh_scheduler = NsiRefreshScheduler(
+    interval=settings.NSI_REFRESH_INTERVAL,
+    max_age=settings.NSI_REFRESH_MAX_AGE,
+    initial_delay=settings.NSI_REFRESH_INITIAL_DELAY,
+)
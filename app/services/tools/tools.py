@@ -1,66 +1,43 @@
+import asyncio
 import json
 import zipfile
+import xml.etree.ElementTree as ET
 import aiofiles
 
-from typing import List, Dict, Optional, Any, Union
+from typing import List, Dict, Optional, Any, Union, Iterator, Tuple
 from pathlib import Path as SyncPath
 from aiopath import Path as AsyncPath
 from fastapi import HTTPException, status
 
 from app.core import get_settings, HandbooksStorage
+from app.core.atomic_files import atomic_write
+from app.core.handbooks import write_handbook_table
 from app.core.logger_setup import logger
 
 settings = get_settings()
 
 HANDBOOKS_DIR = SyncPath(settings.HANDBOOKS_DIR)
+# Заголовок файлов НСИ ФФОМС (версия, дата справочника)
+NSI_HEADER_TAG = "zglv"
 
 
 
-def get_handbook_payload(
+async def get_handbook_payload(
         handbooks_storage: HandbooksStorage,
         handbook_name: str,
         event_id: Optional[str] = None,
 ) -> Optional[Union[Dict[str, Any], Any]]:
     """
-    Безопасно извлекает "полезную нагрузку" из конкретного справочника.
-    Если справочник содержит ключ 'data' и его значение - словарь, возвращает этот словарь.
-    В противном случае возвращает все содержимое справочника "как есть" (если оно не None).
+    Возвращает "полезную нагрузку" справочника из текущего снимка HandbooksStorage:
+    значение 'data', если справочник его содержит, иначе содержимое "как есть".
+    Нагрузка извлекается один раз при публикации снимка, поэтому вызов - просто поиск по словарю
+    (ленивый справочник при первом обращении загружается в пуле потоков).
     """
-    log_prefix = f"Event {event_id}: " if event_id else ""
-    if not handbooks_storage or not hasattr(handbooks_storage, 'handbooks') or not isinstance(
-            handbooks_storage.handbooks, dict):
-        logger.warning(
-            f"{log_prefix}HandbooksStorage не инициализирован или некорректен. Справочник '{handbook_name}' не загружен.")
-        return None
-
-    handbook_content = handbooks_storage.handbooks.get(handbook_name)
-
-    if handbook_content is None:
+    payload = await handbooks_storage.get_payload(handbook_name)
+    if payload is None:
+        log_prefix = f"Event {event_id}: " if event_id else ""
         logger.warning(f"{log_prefix}Справочник '{handbook_name}' не найден в HandbooksStorage.")
-        return None
-
-    if isinstance(handbook_content, dict):
-        if 'data' in handbook_content:  # Проверяем наличие ключа 'data'
-            data_payload = handbook_content.get('data')
-            if data_payload is not None:
-                if not isinstance(data_payload, dict):
-                    logger.warning(
-                        f"{log_prefix}Полезная нагрузка 'data' в справочнике '{handbook_name}' не является словарем "
-                        f"(тип: {type(data_payload)}).")
-                    return None
-                return data_payload
-            else:
-                logger.warning(f"{log_prefix}Справочник '{handbook_name}' содержит ключ 'data', но его значение None.")
-                return None
-        else:
-            logger.debug(
-                f"{log_prefix}Справочник '{handbook_name}' не имеет ключа 'data', возвращаем его содержимое как есть.")
-            return handbook_content
-    else:
-        logger.warning(
-            f"{log_prefix}Содержимое справочника '{handbook_name}' не является словарем (тип: {type(handbook_content)}). "
-            f"Возвращаем как есть.")
-        return handbook_content
+    return payload
 
 
 async def save_file(file_path: str, content: bytes) -> None:
@@ -140,12 +117,110 @@ def extract_zip_safely(zip_path: str, extract_to: SyncPath) -> SyncPath:
         )
 
 
+def _xml_element_to_dict(element: ET.Element) -> Any:
+    """Преобразует XML-элемент в словарь (как xmltodict: текст листьев, повторы тегов - списки, атрибуты - '@имя')."""
+    children = list(element)
+    if not children and not element.attrib:
+        text = (element.text or "").strip()
+        return text or None
+
+    result: Dict[str, Any] = {f"@{name}": value for name, value in element.attrib.items()}
+    for child in children:
+        value = _xml_element_to_dict(child)
+        if child.tag in result:
+            if not isinstance(result[child.tag], list):
+                result[child.tag] = [result[child.tag]]
+            result[child.tag].append(value)
+        else:
+            result[child.tag] = value
+    return result
+
+
+def iter_zip_xml_records(
+        zip_path: Union[str, SyncPath],
+        record_tag: str,
+        header_tag: str = NSI_HEADER_TAG,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Потоково читает записи из единственного XML-файла ZIP-архива, не распаковывая его на диск.
+    Выдает пары ("header", заголовок) и ("record", запись) по мере разбора;
+    разобранные элементы сразу удаляются из дерева, поэтому память не зависит от размера файла.
+    """
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            file_list = zip_ref.namelist()
+            if len(file_list) == 0:
+                raise ValueError(f"Архив {zip_path} пуст")
+            if len(file_list) > 1:
+                raise ValueError(f"Архив {zip_path} содержит более одного файла: {file_list}")
+
+            with zip_ref.open(file_list[0]) as member:
+                root = None
+                for event, element in ET.iterparse(member, events=("start", "end")):
+                    if root is None:
+                        root = element
+                    if event != "end":
+                        continue
+                    if element.tag == record_tag:
+                        yield "record", _xml_element_to_dict(element)
+                        root.clear()
+                    elif element.tag == header_tag:
+                        yield "header", _xml_element_to_dict(element)
+                        root.clear()
+    except zipfile.BadZipFile:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Архив повреждён или не является ZIP"
+        )
+    except ET.ParseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Некорректный XML в архиве справочника: {e}"
+        )
+
+
+def build_keyed_handbook_from_zip(zip_path: Union[str, SyncPath], root_key: str, key_field: str) -> Dict[str, Any]:
+    """
+    Собирает справочник {'params': заголовок, 'data': {значение key_field: [записи]}} за один проход по архиву.
+    Записи без key_field пропускаются.
+    """
+    params: Dict[str, Any] = {}
+    data: Dict[str, List[Dict[str, Any]]] = {}
+    skipped = 0
+    for kind, item in iter_zip_xml_records(zip_path, root_key):
+        if kind == "header":
+            params = item if isinstance(item, dict) else {}
+            continue
+        key = item.get(key_field) if isinstance(item, dict) else None
+        if key is None:
+            skipped += 1
+            continue
+        data.setdefault(str(key).strip(), []).append(item)
+
+    logger.info(
+        f"Архив {SyncPath(zip_path).name}: {sum(len(v) for v in data.values())} записей '{root_key}', "
+        f"{len(data)} ключей '{key_field}', пропущено без ключа: {skipped}"
+    )
+    return {"params": params, "data": data}
+
+
+async def parse_nsi_zip_streaming(zip_path: Union[str, SyncPath], root_key: str, key_field: str) -> Dict[str, Any]:
+    """Асинхронная обертка build_keyed_handbook_from_zip: разбор идет в пуле потоков, event loop не блокируется."""
+    return await asyncio.to_thread(build_keyed_handbook_from_zip, zip_path, root_key, key_field)
+
+
 async def save_handbook(data: List[Dict] | dict, filename: str) -> None:
-    """Асинхронно сохраняет обработанные данные в JSON-файл."""
+    """
+    Асинхронно сохраняет обработанные данные в компактный JSON-файл
+    и в бинарную таблицу (<имя>.mmt), из которой справочник читается при старте.
+    Оба файла записываются атомарно: через временный файл с уникальным именем и замену (см. atomic_write).
+    """
     output_path = HANDBOOKS_DIR / filename
-    await AsyncPath(HANDBOOKS_DIR).mkdir(parents=True, exist_ok=True)
-    async with aiofiles.open(output_path, "w", encoding="utf-8") as f:
-        await f.write(json.dumps(data, ensure_ascii=False, indent=2))
-
 
+    def _write_json() -> None:
+        with atomic_write(output_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
 
+    await asyncio.to_thread(_write_json)
+    # Таблица пишется после JSON, чтобы быть не старше его (см. load_handbook)
+    await asyncio.to_thread(write_handbook_table, output_path.stem, data)
@@ -0,0 +1,93 @@
+"""
+Сравнение скорости построения Event из плоских строк searchData:
+прежний валидатор (пять полных копий строки) против общей строки для всех блоков без копий.
+На малых объемах разница теряется в шуме, поэтому по умолчанию строк 20000.
+
+Запуск из корня проекта:
+    python -m benchmarks.event_build                # 20000 синтетических строк
+    python -m benchmarks.event_build --rows 50000 --repeats 7
+"""
+import argparse
+import gc
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from pydantic import model_validator
+
+from app.models.event import Event
+
+
+class LegacyEvent(Event):
+    """Event с прежним валидатором: каждый блок получает копию всей строки."""
+
+    @model_validator(mode='before')  # noqa
+    @classmethod
+    def group_flat_data(cls, data: Any) -> Dict[str, Any]:
+        return {
+            "personal": data.copy(),
+            "hospitalization": data.copy(),
+            "service": data.copy(),
+            "insurance": data.copy(),
+            "referral": data.copy(),
+            "operations": data.get("operations", []),
+            "diagnoses": data.get("diagnoses", []),
+        }
+
+
+def _make_rows(count: int) -> List[Dict[str, Any]]:
+    """Строки в стиле ответа Search/searchData: поля Event плюс десятки полей, которые модель не читает."""
+    rows = []
+    for i in range(count):
+        row = {
+            "Person_id": str(3010101000000000 + i), "Person_Surname": "Иванов", "Person_Firname": "Иван",
+            "Person_Secname": "Иванович", "Person_Birthday": "01.01.1970", "Sex_id": "1",
+            "EvnPS_id": str(3010101196000000 + i), "EvnPS_NumCard": f"{i}/С", "EvnPS_setDate": "01.02.2025",
+            "EvnPS_disDate": "10.02.2025", "LpuSection_Name": "Хирургическое отделение", "Diag_Name": "K35.8",
+            "EvnPS_KoikoDni": "9", "PayType_Name": "ОМС", "LeaveType_Name": "Выписан", "EvnSection_KSG": "st12.001",
+            "PersonEvn_id": str(3010101197000000 + i), "Server_id": "301", "OrgSmo_Name": "СК Согаз-Мед",
+            "Polis_Num": f"51{i:014d}", "PolisType_id": "4",
+        }
+        row.update({f"Extra_Field_{j}": f"value {j}" for j in range(60)})
+        rows.append(row)
+    return rows
+
+
+def _measure(cases: Dict[str, Callable[[], object]], repeats: int) -> Dict[str, float]:
+    """Медианное время каждого способа; способы чередуются в каждом повторе, чтобы дрейф машины делился поровну."""
+    timings: Dict[str, List[float]] = {name: [] for name in cases}
+    for _ in range(repeats):
+        for name, func in cases.items():
+            gc.collect()
+            started = time.perf_counter()
+            func()
+            timings[name].append(time.perf_counter() - started)
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = _make_rows(args.rows)
+    legacy = [LegacyEvent.model_validate(row).model_dump() for row in rows[:50]]
+    current = [Event.model_validate(row).model_dump() for row in rows[:50]]
+    if legacy != current:
+        raise SystemExit("Результаты прежнего и нового построения Event не совпадают")
+
+    cases = {
+        "прежний (5 копий)": lambda: [LegacyEvent.model_validate(row) for row in rows],
+        "без копий": lambda: [Event.model_validate(row) for row in rows],
+    }
+    results = _measure(cases, args.repeats)
+    baseline = None
+    print(f"{'способ':<24}{'мс':>10}{'мкс/строка':>12}{'x':>7}")
+    for name, elapsed in results.items():
+        baseline = baseline or elapsed
+        print(f"{name:<24}{elapsed * 1000:>10.1f}{elapsed / args.rows * 1e6:>12.1f}{baseline / elapsed:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
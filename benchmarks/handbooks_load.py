@@ -0,0 +1,93 @@
+"""
+Сравнение времени загрузки справочников при старте: JSON (текущий путь) против бинарной таблицы .mmt.
+
+Запуск из корня проекта:
+    python -m benchmarks.handbooks_load                  # все *.json из HANDBOOKS_DIR
+    python -m benchmarks.handbooks_load --synthetic 20000  # синтетический справочник в стиле F032
+
+Для каждого справочника печатается размер файлов и медианное время загрузки.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import app.core.handbooks as handbooks
+
+
+def _measure(func: Callable[[], object], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _load_json(path: Path) -> object:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.loads(f.read())
+
+
+def _make_synthetic(directory: Path, records: int) -> List[str]:
+    """Создает справочник, похожий на F032 (medical_organizations), в JSON с indent=2 и в .mmt."""
+    data = {
+        f"1.2.643.5.1.13.13.12.2.51.{i}": [{
+            "OID_MO": f"1.2.643.5.1.13.13.12.2.51.{i}",
+            "IDMO": f"51{i:06d}00",
+            "NAM_MOP": f"Государственное областное бюджетное учреждение здравоохранения № {i}",
+            "NAM_MOK": f"ГОБУЗ № {i}",
+            "INN": f"{5100000000 + i}",
+            "ADDR_J": f"183000, Мурманская обл, г Мурманск, ул Ленина, д {i % 300}",
+            "DATEBEG": "01.01.2020",
+        }]
+        for i in range(records)
+    }
+    handbook = {"params": {"code": "F032", "version": "synthetic"}, "data": data}
+    with open(directory / "synthetic_f032.json", "w", encoding="utf-8") as f:
+        f.write(json.dumps(handbook, ensure_ascii=False, indent=2))
+    return ["synthetic_f032"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="число записей синтетического справочника")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    temp_dir = None
+    if args.synthetic:
+        temp_dir = tempfile.TemporaryDirectory()
+        handbooks.HANDBOOKS_DIR = Path(temp_dir.name)
+        names = _make_synthetic(handbooks.HANDBOOKS_DIR, args.synthetic)
+    else:
+        names = sorted(path.stem for path in handbooks.HANDBOOKS_DIR.glob("*.json"))
+
+    print(f"{'справочник':<28}{'json, КБ':>10}{'mmt, КБ':>10}{'json, мс':>10}{'mmt, мс':>10}{'x':>7}")
+    for name in names:
+        json_path = handbooks.HANDBOOKS_DIR / f"{name}.json"
+        table_path = handbooks.handbook_table_path(name)
+        source = _load_json(json_path)
+        handbooks.write_handbook_table(name, source)
+        # Для справочников с проекцией (nsi_handbooks_mapper "fields") в .mmt хранятся только ее поля
+        stored = handbooks.project_handbook(name, handbooks.read_handbook_table(table_path))
+        if stored != handbooks.project_handbook(name, source):
+            print(f"{name}: содержимое .mmt не совпадает с JSON, пропуск")
+            continue
+
+        json_time = _measure(lambda: _load_json(json_path), args.repeats)
+        table_time = _measure(lambda: handbooks.read_handbook_table(table_path), args.repeats)
+        print(
+            f"{name:<28}{json_path.stat().st_size / 1024:>10.0f}{table_path.stat().st_size / 1024:>10.0f}"
+            f"{json_time * 1000:>10.1f}{table_time * 1000:>10.1f}{json_time / table_time:>7.2f}"
+        )
+
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
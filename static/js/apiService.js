@@ -19,6 +19,28 @@ export function prepareSearchPayload(formData) {
     return payload;
 }
 
+/**
+ * Выводит в консоль разбивку времени запроса из заголовка Server-Timing
+ * (сессия ЕВМИАС, вызовы по методам ЕВМИАС, ФИАС, справочники, роут).
+ * @param {Response} response - Ответ fetch.
+ */
+function logServerTiming(response) {
+    const header = response.headers.get('Server-Timing');
+    if (!header) return;
+    const timings = header.split(',').map(entry => {
+        const [name, ...params] = entry.trim().split(';');
+        const row = { metric: name };
+        params.forEach(param => {
+            const [key, value = ''] = param.split('=');
+            row[key] = key === 'dur' ? Number(value) : value.replace(/^"|"$/g, '');
+        });
+        return row;
+    });
+    console.groupCollapsed(`Server-Timing ${response.url} (X-Request-ID: ${response.headers.get('X-Request-ID')})`);
+    console.table(timings);
+    console.groupEnd();
+}
+
 /**
  * Выполняет основной запрос поиска госпитализаций к API.
  * @param {object} payload - Подготовленные данные для поиска.
@@ -38,6 +60,7 @@ export async function performSearchRequest(payload) {
         });
 
         console.log("API Response Status:", response.status); // Отладка внутри сервиса
+        logServerTiming(response);
 
         if (response.ok) { // 2xx
             return { success: true, data: await response.json() };
@@ -57,5 +80,6 @@ export async function performSearchRequest(payload) {
     }
 }
 
-// Можно сюда же добавить в будущем функцию для получения деталей госпитализации
-// export async function getHospitalizationDetails(eventId) { ... }
\ No newline at end of file
+// Можно сюда же добавить в будущем функцию для получения деталей госпитализации:
+// POST /api/evmias-oms/get_event с search_handle из записи /get_patient, чтобы сервер не повторял поиск
+// export async function getHospitalizationDetails(selectedEvent) { ... }
@@ -0,0 +1,42 @@
+import asyncio
+
+from app.models import AddressData, Event
+from app.services.gis_oms import event_okato
+
+
+def _row(event_id, person_id):
+    return {
+        "Person_id": person_id, "Person_Surname": "Иванов", "Person_Firname": "Иван",
+        "EvnPS_id": event_id, "EvnPS_NumCard": f"{event_id}/2024", "EvnPS_setDate": "01.01.2024",
+        "PersonEvn_id": f"{person_id}0", "Server_id": "1",
+    }
+
+
+def test_duplicate_addresses_across_events_resolved_once(monkeypatch):
+    calls = []
+
+    async def fake_get_okato_code(address, http_service):
+        calls.append(address)
+        return {"full_address": f"ФИАС: {address.strip()}", "okato_code": str(len(calls))}
+
+    monkeypatch.setattr(event_okato, "get_okato_code", fake_get_okato_code)
+
+    events = [Event.model_validate(_row(str(i), f"{i}0")) for i in range(1, 4)]
+    # Один и тот же адрес в разном написании у двух пациентов и совпадающие адреса у третьего
+    events[0].personal.registration_address = AddressData(address="г. Мурманск, ул. Ленина, д. 1")
+    events[1].personal.registration_address = AddressData(address="  Г. МУРМАНСК,  ул. Ленина, д. 1")
+    events[1].personal.actual_address = AddressData(address="г. Кола, ул. Победы, д. 5")
+    events[2].personal.registration_address = AddressData(address="г. Кола, ул. Победы, д. 5")
+    events[2].personal.actual_address = AddressData(address="г. Кола, ул. Победы, д. 5")
+
+    results = asyncio.run(event_okato.enrich_events_okato_codes(events, http_service=None, concurrency=2))
+
+    assert len(calls) == 2
+    assert len(results) == 2
+    lenina = {events[0].personal.registration_address.okato_code,
+              events[1].personal.registration_address.okato_code}
+    kola = {events[1].personal.actual_address.okato_code,
+            events[2].personal.registration_address.okato_code,
+            events[2].personal.actual_address.okato_code}
+    assert len(lenina) == 1 and len(kola) == 1 and lenina != kola
+    assert events[0].personal.actual_address is None
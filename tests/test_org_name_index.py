@@ -0,0 +1,44 @@
+from app.core.handbooks import HandbooksStorage
+from app.core.org_name_index import OrgNameIndex
+
+
+# Коды МГП № 1 и № 2 совпадают с ручным маппером referred_org_map, который тоже попадает в индекс
+def _f032(idmo, name, nick):
+    return {"IDMO": idmo, "NAM_MOP": name, "NAM_MOK": nick, "OID_MO": f"1.2.643.{idmo}"}
+
+
+def _index():
+    storage = HandbooksStorage()
+    snapshot = storage.replace({"medical_organizations": {"data": {
+        "1": [_f032("00559100000000000", "ГОБУЗ Мурманская городская поликлиника №1", "ГОБУЗ МГП №1")],
+        "2": [_f032("00559200000000000", "ГОБУЗ Мурманская городская поликлиника №2", "ГОБУЗ МГП №2")],
+        "3": [_f032("00557300000000000", "ГОБУЗ Мурманская областная клиническая больница", "ГОБУЗ МОКБ")],
+    }}})
+    index = OrgNameIndex(threshold=0.8, cache_size=16)
+    index.rebuild(snapshot)
+    return index
+
+
+def test_number_must_match():
+    index = _index()
+    org, _ = index.resolve("ГОБУЗ Мурманская городская поликлиника № 1")
+    assert org["code"] == "00559100000000000"
+    org, _ = index.resolve("ГОБУЗ МГП №1")
+    assert org["code"] == "00559100000000000"
+
+
+def test_number_missing_from_index_is_unresolved():
+    index = _index()
+    assert index.resolve("ГОБУЗ Мурманская городская поликлиника №3") is None
+    assert index.resolve("ГОБУЗ МГП №7") is None
+
+
+def test_short_name_matches_longer_one():
+    index = _index()
+    org, score = index.resolve("ГОБУЗ кольская ЦРБ")
+    assert org["code"].startswith("005561")
+    assert score >= 0.8
+
+
+def test_legal_form_alone_is_unresolved():
+    assert _index().resolve("ГОБУЗ") is None